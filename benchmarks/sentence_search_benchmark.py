@@ -0,0 +1,82 @@
+"""Regression benchmark of the text editor sentence search
+
+Compares the original search pattern with Model.search_sentence on inputs that
+make the original pattern backtrack: long text without sentence terminators,
+long runs of punctuation and many word boundaries without a keyword. Every
+result is checked against the original pattern, then the time of both is
+printed for doubling input sizes. The original grows quadratically while the
+new search grows linearly.
+
+Run from the repository root:
+    python -m benchmarks.sentence_search_benchmark
+"""
+import re
+import sys
+import time
+
+from text_editor.txt_models import Model
+
+# Sizes in repetitions of the case's unit, doubled up to the last one
+SIZES = [1000, 2000, 4000, 8000, 16000]
+# The original pattern is no longer timed once a run takes longer than this
+LEGACY_LIMIT = 5.0
+
+CASES = [
+    # (name, unit repeated to build the text, text after it, search entry)
+    ("no terminators, no match", "lorem ipsum dolor ", "\n", "zebra"),
+    ("no terminators, match at the end", "lorem ipsum dolor ", "zebra \n", "zebra"),
+    ("punctuation runs", "word ,;:-- ", "\n", "zebra"),
+    ("many keywords, no match", "lorem ipsum dolor ", "\n", "alpha beta gamma delta epsilon zeta eta theta"),
+    ("short sentences", "lorem ipsum. dolor zebra? ", "\n", "zebra"),
+    ("200 keywords, short sentences", "lorem word150 ipsum. dolor words? ", "\n", " ".join(f"word{n}" for n in range(200))),
+]
+
+
+def legacy_search(text_input: str, text_entry: str, option_value: str) -> list:
+    """The original search pattern of Model.search_sentence"""
+    clean_editor = re.sub('[ \n]+', ' ', text_input)
+    # Keywords are literal and the empty ones left by extra spaces are ignored
+    lst_entry = [keyword for keyword in re.sub(' +', ' ', text_entry).split(' ') if keyword]
+    keywords = r'\b[^.?!\w]*(?:' + '|'.join(map(re.escape, lst_entry)) + r')(?=[\s@*&^%$#.,;:\/\'-\?!]|$)'
+    flags = re.IGNORECASE if option_value == "Ignore Case" else 0
+    pattern = re.compile(r'\b[^.?!]*\b{0}\b[^.?!]*[ .?!]'.format(keywords), flags)
+    return pattern.findall(clean_editor)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    failures = 0
+    print(f"{'case':<34}{'size':>8}{'original':>12}{'new':>10}{'new, repeated':>15}")
+    for name, unit, tail, entry in CASES:
+        legacy_timed = True
+        for size in SIZES:
+            text = unit * size + tail
+
+            model = Model()
+            result, new_time = timed(model.search_sentence, text, entry, "Ignore Case")
+            # Second search of the same text reuses the sentence index
+            _, indexed_time = timed(model.search_sentence, text, entry, "Ignore Case")
+
+            legacy_text = "skipped"
+            if legacy_timed:
+                expected, legacy_time = timed(legacy_search, text, entry, "Ignore Case")
+                legacy_text = f"{legacy_time:.3f}s"
+                legacy_timed = legacy_time < LEGACY_LIMIT
+                if result != expected:
+                    failures += 1
+                    legacy_text += " DIFF"
+
+            print(f"{name:<34}{size:>8}{legacy_text:>12}{new_time:>9.3f}s{indexed_time:>14.3f}s")
+
+    if failures:
+        print(f"{failures} result(s) differ from the original pattern")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
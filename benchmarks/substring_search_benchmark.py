@@ -0,0 +1,88 @@
+"""Benchmark of the substring and fuzzy searches with and without the trigram index
+
+Builds a corpus of generated sentences, then times every query scanning all
+the sentences and verifying only the candidates of the trigram index. Both
+must find the same matches. Also times building, storing and loading the index.
+
+Run from the repository root:
+    python -m benchmarks.substring_search_benchmark
+"""
+import random
+import sys
+import tempfile
+import time
+
+from text_editor.trigram_index import TrigramStore
+from text_editor.txt_models import FUZZY, SUBSTRING, Model
+
+# Size of the corpus in characters
+SIZE = 100 << 20
+# (entry, option) of the timed searches
+QUERIES = [
+    ("zanzibar", SUBSTRING),
+    ("ation", SUBSTRING),
+    ("quixotic labyrinth", SUBSTRING),
+    ("zanzibra", FUZZY),
+    ("quixotik", FUZZY),
+]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def corpus(size: int) -> str:
+    """Sentences of common words with a few rare ones"""
+    random.seed(0)
+    common = ("information station nation the of and to in is that for it with as was on be at by this "
+              "data editor search index sentence word text file folder database").split()
+    rare = ["zanzibar", "quixotic", "labyrinth"]
+    parts = []
+    length = 0
+    while length < size:
+        words = [random.choice(common) for _ in range(random.randint(5, 25))]
+        if random.random() < 0.0005:
+            words[random.randrange(len(words))] = random.choice(rare)
+        sentence = " ".join(words).capitalize() + random.choice(".\n", ) + " "
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+
+def main():
+    failures = 0
+    text = corpus(SIZE)
+    print(f"corpus of {len(text) / (1 << 20):.0f} MB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        model = Model()
+        model.trigram_store = TrigramStore(directory)
+        _, build_time = timed(model.build_index, text)
+        print(f"{'segment, index, store':<32}{build_time:>9.2f}s")
+        print(f"{'index size':<32}{len(model.trigram_index.to_bytes()) / (1 << 20):>9.1f}MB")
+
+        loaded = Model()
+        loaded.trigram_store = TrigramStore(directory)
+        _, load_time = timed(loaded.build_index, text)
+        print(f"{'segment and load stored index':<32}{load_time:>9.2f}s")
+
+        # The same sentences without a trigram index are all scanned
+        scanning = Model()
+        scanning.sentence_index = model.sentence_index
+
+        print(f"{'query':<32}{'scan':>10}{'index':>10}{'matches':>10}")
+        for entry, option in QUERIES:
+            expected, scan_time = timed(scanning.search, text, entry, option)
+            found, index_time = timed(model.search, text, entry, option)
+            print(f"{f'{entry} ({option})':<32}{scan_time:>9.3f}s{index_time:>9.3f}s{len(found[0]):>10}")
+            failures += found != expected
+
+    if failures:
+        print(f"{failures} result(s) differ from the scan")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
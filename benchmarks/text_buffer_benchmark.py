@@ -0,0 +1,100 @@
+"""Micro-benchmark of the text editor model buffer
+
+Compares a plain string, where every edit copies the whole text, with the rope
+behind Model.text on typing, deleting and saving documents of growing size.
+The final text of both is checked to be the same. Edits to the string grow
+linearly with the size of the document while edits to the rope stay flat.
+
+Run from the repository root:
+    python -m benchmarks.text_buffer_benchmark
+"""
+import os
+import random
+import sys
+import time
+
+from text_editor.rope import Rope
+
+# Sizes of the documents in characters
+SIZES = [1 << 20, 4 << 20, 16 << 20]
+# Edits timed per operation
+EDITS = 1000
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def type_string(text: str, positions: list) -> str:
+    for position in positions:
+        text = text[:position] + 'x' + text[position:]
+    return text
+
+
+def type_rope(rope: Rope, positions: list) -> Rope:
+    for position in positions:
+        rope = rope.replace(position, position, 'x')
+    return rope
+
+
+def delete_string(text: str, positions: list) -> str:
+    for position in positions:
+        text = text[:position] + text[position + 1:]
+    return text
+
+
+def delete_rope(rope: Rope, positions: list) -> Rope:
+    for position in positions:
+        rope = rope.replace(position, position + 1, '')
+    return rope
+
+
+def save_string(text: str):
+    with open(os.devnull, 'w') as file:
+        file.write(text)
+
+
+def save_rope(rope: Rope):
+    with open(os.devnull, 'w') as file:
+        for chunk in rope.chunks():
+            file.write(chunk)
+
+
+def main():
+    failures = 0
+    random.seed(0)
+    print(f"{'operation':<24}{'size':>10}{'string':>10}{'rope':>10}")
+    for size in SIZES:
+        line = "lorem ipsum dolor sit amet, consectetur adipiscing elit.\n"
+        text = (line * (size // len(line) + 1))[:size]
+        rope, build_time = timed(Rope.from_text, text)
+
+        positions = [random.randrange(size) for _ in range(EDITS)]
+        typed_text, string_time = timed(type_string, text, positions)
+        typed_rope, rope_time = timed(type_rope, rope, positions)
+        print(f"{f'type {EDITS} characters':<24}{size:>10}{string_time:>9.3f}s{rope_time:>9.3f}s")
+        failures += typed_rope.text() != typed_text
+
+        positions = [random.randrange(size - EDITS) for _ in range(EDITS)]
+        deleted_text, string_time = timed(delete_string, text, positions)
+        deleted_rope, rope_time = timed(delete_rope, rope, positions)
+        print(f"{f'delete {EDITS} characters':<24}{size:>10}{string_time:>9.3f}s{rope_time:>9.3f}s")
+        failures += deleted_rope.text() != deleted_text
+
+        # The original version stays valid after the edits, it is the snapshot a search reads
+        failures += rope.text() != text
+
+        _, string_time = timed(save_string, typed_text)
+        _, rope_time = timed(save_rope, typed_rope)
+        print(f"{'save':<24}{size:>10}{string_time:>9.3f}s{rope_time:>9.3f}s")
+        print(f"{'build rope':<24}{size:>10}{'':>10}{build_time:>9.3f}s")
+
+    if failures:
+        print(f"{failures} result(s) differ from the string")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
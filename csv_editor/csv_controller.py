@@ -1,5 +1,6 @@
 import re
 import os
+import threading
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk
@@ -10,7 +11,9 @@ from tkinterdnd2 import TkinterDnD
 
 from csv_editor.csv_models import ModelCSV
 from csv_editor.csv_views import CSVView
-from database.csv_database import CSVdatabase
+from database.csv_database import CSVdatabase, RowPageStream
+from database.bulk_import import BulkImporter
+from database.db_worker import DBWorker
 
 class CSV_Controller(TkinterDnD.Tk):
     """Controller object for CSV editor
@@ -28,25 +31,24 @@ class CSV_Controller(TkinterDnD.Tk):
         
 
         # Assign properties for Views and Models
-        self.view = CSVView(self, self)
         self.model = ModelCSV()
+        self.view = CSVView(self, self)
         self.table = self.view.data_table
 
         # Database reference
         self.database = CSVdatabase()
+        # Runs the database calls in the background so the editor never waits on the server
+        self.db_worker = DBWorker(self, self.db_error_msg)
+        # Task fetching the next or previous page of the table opened from database
+        self.page_task = None
         
-        # Flag to check if connected to db
-        self.cnx = self.database.connect()
+        # Flag to check if connected to db, set when the connection comes up
+        self.cnx = False
 
-        # Create database if there is connection
-        if self.cnx:
-            self.database.create_db()
-            self.view.status_bar.config(fg='darkgreen')
-            self.view.status_bar.config(text="Connected to Database       ")
-        else:
-            self.view.status_bar.config(fg='red')
-            self.view.status_bar.config(text="Error: Not connected to Database       ")
-            self.view.connect_popup() 
+        # Connect and create database in the background
+        self.view.status_bar.config(fg='black')
+        self.view.status_bar.config(text="Connecting to Database...       ")
+        self.db_worker.submit(self.database.open_database, on_done=self.on_connected)
         
         # flag to check if a file is opened
         self.open_status_name = False
@@ -93,19 +95,97 @@ class CSV_Controller(TkinterDnD.Tk):
             command=self.db_read, 
             state=state
         )
+        self.database_menu.add_command(
+            label="Import folder...",
+            command=self.db_import_folder,
+            state=state
+        )
         self.database_menu.add_separator()
         self.database_menu.add_command(
             label="Delete current file",
             command=self.del_curr_from_db, 
             state=state
         )
+        self.database_menu.add_separator()
+        self.database_menu.add_command(
+            label="Cancel running operations",
+            command=self.cancel_db_operations, 
+            state=state
+        )
 
         self.menubar_csv.add_cascade(label="File", menu=self.file_menu)
         self.menubar_csv.add_cascade(label="Database", menu=self.database_menu)
 
+        # Stops the database worker when the window is closed
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
     def run(self):
         self.mainloop()   
 
+    def on_closing(self):
+        self.close_row_stream()
+        self.db_worker.shutdown()
+        self.destroy()
+
+    def on_connected(self, connected):
+        """Updates the status bar when the connection at startup is done
+
+        Args:
+            connected (bool): True if connected to the database
+        """
+        self.cnx = connected
+        if self.cnx:
+            self.view.status_bar.config(fg='darkgreen')
+            self.view.status_bar.config(text="Connected to Database       ")
+        else:
+            self.view.status_bar.config(fg='red')
+            self.view.status_bar.config(text="Error: Not connected to Database       ")
+            self.view.connect_popup() 
+
+    def db_error_msg(self, err):
+        """Error message when a database call fails"""
+        self.view.status_bar.config(fg='red')
+        self.view.status_bar.config(text="Error: Database operation failed       ")
+        messagebox.showinfo(title="Database Error", message=f"{err}")
+
+    def db_import_folder(self):
+        """Imports every CSV and TXT file of a folder to database in the background"""
+        if self.cnx:
+            directory = fd.askdirectory(title="Import folder")
+            if directory:
+                importer = BulkImporter(self.database)
+                self.db_worker.submit(
+                    importer.run, directory,
+                    pass_task=True,
+                    on_progress=self.on_import_progress,
+                    on_done=self.on_imported
+                )
+        else:
+            self.cnx_error_msg()
+
+    def on_import_progress(self, progress):
+        """Shows the number of files imported so far"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Importing... {progress}       ")
+
+    def on_imported(self, report):
+        """Shows the throughput and failures of a finished import"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Imported {report.imported} file(s)       ")
+        messagebox.showinfo(title="Import finished", message=report.summary())
+
+    def cancel_db_operations(self):
+        """Cancels the database calls that are queued or running"""
+        count = self.db_worker.cancel_all()
+        self.page_task = None
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Cancelled {count} database operation(s)       ")
+
+    def on_rows_progress(self, row_count):
+        """Shows the number of rows written by a running database call"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Writing rows... {row_count}       ")
+
     def cnx_error_msg(self):
         """Error message when not connected to database"""
         messagebox.showinfo(title="Message", message=f"Not connected to database.")
@@ -113,6 +193,10 @@ class CSV_Controller(TkinterDnD.Tk):
     def no_opened_file(self):
         messagebox.showinfo(title="Message", message=f"No opened file")
 
+    def read_only_msg(self):
+        """Error message when editing a file opened from the cache while offline"""
+        messagebox.showinfo(title="Message", message=f"Not connected to database. The file was opened read-only from the local cache.")
+
     def submit(self):
         usr_cred = [self.view.host_entry.get(), self.view.user_entry.get(), self.view.password_entry.get()]
 
@@ -120,10 +204,15 @@ class CSV_Controller(TkinterDnD.Tk):
         self.database.user = usr_cred[1]
         self.database.password = usr_cred[2]
 
-        self.cnx = self.database.connect()
+        self.view.status_bar.config(fg='black')
+        self.view.status_bar.config(text="Connecting to Database...       ")
+        self.db_worker.submit(self.database.open_database, on_done=self.on_submit_done)
+
+    def on_submit_done(self, connected):
+        """Closes the credentials popup if the connection with the submitted credentials is up"""
+        self.cnx = connected
         if self.cnx:
             self.wm_attributes("-topmost", True)
-            self.database.create_db()
             self.view.connect_popup_root.destroy()
             self.view.status_bar.config(fg='darkgreen')
             self.view.status_bar.config(text="Connected to Database       ")
@@ -139,7 +228,6 @@ class CSV_Controller(TkinterDnD.Tk):
         if self.cnx:
             # Check flag of local and current filename to save
             if self.open_status_name or self.database.current_fname:
-                fnames = self.database.get_fnames()
                 # If local filename is active, sets it as file to save
                 if self.open_status_name:
                     file_path = self.open_status_name
@@ -148,15 +236,14 @@ class CSV_Controller(TkinterDnD.Tk):
                 # If database filename is active, sets it as file to save
                 elif self.database.current_fname:
                     file_name = self.database.current_fname
-                # Checks if the list of fname is empty
-                if not bool(fnames):
-                    self.db_save(file_name)
-                else:
+
+                def on_checked(exists):
                     # Checks if filename already exists
-                    if file_name not in fnames:
+                    if not exists:
                         self.db_save(file_name)
                     else:
                         self.view.db_save_popup()
+                self.db_worker.submit(self.database.file_exists, file_name, on_done=on_checked)
             else:
                 self.no_opened_file()
         else:
@@ -167,13 +254,16 @@ class CSV_Controller(TkinterDnD.Tk):
         if self.cnx:
             # Get columns and rows from treeview to be stored in database 
             columns = str([self.table.heading(column)["text"] for column in self.table["columns"]])
-            rows = str([self.table.item(item)["values"] for item in self.table.get_children()])
-            self.database.save_to_db(fname, columns, rows)
-
-            messagebox.showinfo(
+            rows = self.all_rows()
+            self.db_worker.submit(
+                self.database.save_to_db, fname, columns, rows,
+                pass_task=True,
+                on_progress=self.on_rows_progress,
+                on_done=lambda result: messagebox.showinfo(
                     title = "Saved Successfully!",
                     message = f"Saved {fname} to Database 'CSV Editor'."
                 )
+            )
         else:
             self.cnx_error_msg()
 
@@ -203,7 +293,9 @@ class CSV_Controller(TkinterDnD.Tk):
 
     def db_save_changes_cmd(self):
         # Database: save changes command for menu
-        if self.database.current_fname:
+        if self.database.current_fname and self.database.read_only:
+            self.read_only_msg()
+        elif self.database.current_fname:
             self.db_save_changes()
         else:
             messagebox.showinfo(
@@ -212,82 +304,284 @@ class CSV_Controller(TkinterDnD.Tk):
             )
     
     def db_save_changes(self):
-        # Updates the changes to the file on database
-        columns = str([self.table.heading(column)["text"] for column in self.table["columns"]])
-        rows = str([self.table.item(item)["values"] for item in self.table.get_children()])
-        
+        # Updates only the rows modified since the file was opened
         fname = self.database.current_fname
-        self.database.update_csv(fname, columns, rows)
-        messagebox.showinfo(
+        if not self.model.edited_rows:
+            messagebox.showinfo(
                     title = "Message",
-                    message = f"Saved changes to {fname}"
+                    message = f"No changes to save in {fname}"
+            )
+        else:
+            edited_rows = dict(self.model.edited_rows)
+
+            def on_saved(saved):
+                if saved is None:
+                    self.cnx_error_msg()
+                elif saved:
+                    # Keep rows that were modified again while saving
+                    for row_num, row in edited_rows.items():
+                        if self.model.edited_rows.get(row_num) is row:
+                            del self.model.edited_rows[row_num]
+                    messagebox.showinfo(
+                            title = "Message",
+                            message = f"Saved changes to {fname}"
+                    )
+                else:
+                    messagebox.showinfo(
+                            title = "Error",
+                            message = f"Cannot save changes: {fname} was changed by another user since it was opened. Reopen the file to get the latest version."
+                    )
+            self.db_worker.submit(
+                self.database.update_rows, fname, edited_rows, self.database.current_version,
+                on_done=on_saved
             )
         
     def db_read(self):
-        """Triggers when opening file from database menu"""
-        if self.cnx:
-            # List of filenames from database to be displayed
-            fname_lst_db = self.database.get_fnames()
-            
-            # Check if database is not empty
-            if fname_lst_db:
-                self.view.open_popup(fname_lst_db)
-            else:
-                messagebox.showinfo(
-                    title = "Empty",
-                    message = f"Database is empty."
-                )
-        else:
+        """Triggers when opening file from database menu. When not connected the
+        files in the local cache are listed instead"""
+        # List of filenames from database to be displayed
+        self.db_worker.submit(self.database.get_file_info, on_done=self.on_fnames_read)
+
+    def on_fnames_read(self, fname_lst_db):
+        """Opens the popup with the filenames, sizes and modification times read from database"""
+        # Check if database is not empty
+        if fname_lst_db:
+            self.view.open_popup(fname_lst_db)
+        elif not self.cnx:
             self.cnx_error_msg()
+        else:
+            messagebox.showinfo(
+                title = "Empty",
+                message = f"Database is empty."
+            )
 
     def get_selected_val(self): # Button command // views
         """Gets filename value from option menu"""
-        if self.cnx:
-            fname = self.view.db_fname.get()
-            self.view.popup_root.destroy()
-            self.insert_db_csv(fname)
-        else:
-            self.cnx_error_msg()
+        fname = self.view.db_files[self.view.db_fname.get()]
+        self.view.popup_root.destroy()
+        self.insert_db_csv(fname)
         
     def insert_db_csv(self, fname):
-        """Inserts the content of the csv using filename from database"""
-        res = self.database.get_val_from_fname(fname)
-        col_content = eval(res[0])
-        row_content = eval(res[1])
-        df = pd.DataFrame(row_content, columns=col_content)
-        self.set_datatable(df)
+        """Reads the columns and row count of the csv in the background then opens it"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Opening {fname}...       ")
+
+        def read_table():
+            return self.database.get_columns(fname), self.database.count_rows(fname)
+        self.db_worker.submit(read_table, on_done=lambda result: self.on_db_csv_read(fname, *result))
+
+    def on_db_csv_read(self, fname, columns, total_rows):
+        """Streams the content of the csv using filename from database. The first page
+        is drawn right away and the following pages are fetched when scrolling"""
+        self.close_row_stream()
+        self.model.db_columns = columns
+        self.model.total_rows = total_rows
+        self.model.row_stream = RowPageStream(self.database.iter_row_pages(fname, self.model.page_size))
+        self.model.first_page = 0
+        self.model.next_page = 0
+        self.model.search_active = False
+        self.model.edited_rows = {}
+
+        # Draw the headings then the first page
+        self.set_datatable(self.model.page_frame([], 0))
 
         # Update dataframe flag
         self.open_status_name = False
         self.database.current_fname = fname
-        self.title("DATABASE: " + fname)
+        if self.database.read_only:
+            self.title("DATABASE: " + fname + " (read-only)")
+        else:
+            self.title("DATABASE: " + fname)
+
+        self.load_next_page()
+
+    def close_row_stream(self):
+        """Closes the stream of rows and drops the page being fetched. The stream is
+        closed on its own thread, which waits for a page being read from it and that
+        cancelling the tasks of the database worker cannot skip"""
+        if self.page_task is not None:
+            self.page_task.cancel()
+            self.page_task = None
+        if self.model.row_stream is not None:
+            threading.Thread(target=self.model.row_stream.close, daemon=True).start()
+            self.model.row_stream = None
+
+    def fetch_page(self, fname: str, row_stream, page: int) -> list:
+        """Get the rows of a page, reading from the row stream when it is positioned on
+        the page. Runs on the database worker"""
+        if row_stream is not None:
+            rows = row_stream.read(page)
+            if rows is not None:
+                return rows
+        start = page * self.model.page_size
+        return self.database.get_row_page(fname, start, self.model.page_size)
+
+    def request_page(self, page: int, on_done):
+        """Fetches a page in the background unless a page is already being fetched"""
+        if self.page_task is not None:
+            return
+        def on_fetched(rows):
+            self.page_task = None
+            on_done(rows)
+        self.page_task = self.db_worker.submit(
+            self.fetch_page, self.database.current_fname, self.model.row_stream, page,
+            on_done=on_fetched
+        )
+
+    def load_next_page(self):
+        """Fetches the page after the window"""
+        if self.model.page_rows(self.model.next_page):
+            self.request_page(self.model.next_page, self.append_page)
+
+    def append_page(self, rows: list):
+        """Appends the page after the window to the treeview, dropping the first page
+        of the window when it holds more than the maximum number of pages"""
+        page = self.model.next_page
+        page_df = self.model.page_frame(rows, page)
+        for row_num, row in zip(page_df.index, self.model.row_content(page_df)):
+            self.table.insert("", "end", iid=row_num, values=row)
+        self.model.stored_dataframe = pd.concat([self.model.stored_dataframe, page_df.astype(str)])
+        self.model.next_page += 1
+
+        if self.model.next_page - self.model.first_page > self.model.max_pages:
+            self._drop_page(self.model.first_page)
+            self.model.first_page += 1
+        self._page_status()
+
+    def load_prev_page(self):
+        """Fetches the page before the window"""
+        if self.model.first_page > 0:
+            self.request_page(self.model.first_page - 1, self.prepend_page)
+
+    def prepend_page(self, rows: list):
+        """Prepends the page before the window to the treeview, dropping the last page
+        of the window when it holds more than the maximum number of pages"""
+        page = self.model.first_page - 1
+        # Row to keep in view after the rows are inserted above it
+        anchor = self.table.get_children()[0]
+        page_df = self.model.page_frame(rows, page)
+        for position, (row_num, row) in enumerate(zip(page_df.index, self.model.row_content(page_df))):
+            self.table.insert("", position, iid=row_num, values=row)
+        self.model.stored_dataframe = pd.concat([page_df.astype(str), self.model.stored_dataframe])
+        self.model.first_page -= 1
+
+        if self.model.next_page - self.model.first_page > self.model.max_pages:
+            self.model.next_page -= 1
+            self._drop_page(self.model.next_page)
+        self.table.see(anchor)
+        self._page_status()
+
+    def _drop_page(self, page: int):
+        """Removes the rows of a page from the treeview and the stored dataframe"""
+        row_nums = self.model.page_rows(page)
+        self.table.delete(*[row_num for row_num in row_nums if self.table.exists(row_num)])
+        self.model.stored_dataframe = self.model.stored_dataframe.drop(index=row_nums, errors="ignore")
+
+    def _page_status(self):
+        """Shows the rows of the window in the status bar"""
+        first_row = self.model.first_page * self.model.page_size + 1
+        last_row = min(self.model.next_page * self.model.page_size, self.model.total_rows)
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Rows {first_row}-{last_row} of {self.model.total_rows}       ")
+
+    def on_table_scroll(self, first: float, last: float):
+        """Loads the next or previous page when the treeview is scrolled to either end
+
+        Args:
+            first (float): fraction of the rows above the visible rows
+            last (float): fraction of the rows up to the last visible row
+        """
+        if not self.database.current_fname or self.model.search_active:
+            return
+        if last >= 1.0 and self.model.page_rows(self.model.next_page):
+            self.after_idle(self.load_next_page)
+        elif first <= 0.0 and self.model.first_page > 0:
+            self.after_idle(self.load_prev_page)
+
+    def all_rows(self):
+        """Returns the rows of the opened table. Tables opened from the database are
+        streamed again by the returned generator, which is run on the database worker,
+        with modified rows taking the place of their stored values"""
+        if self.database.current_fname:
+            return self._stream_db_rows(self.database.current_fname, dict(self.model.edited_rows))
+        return [self.table.item(item)["values"] for item in self.table.get_children()]
+
+    def _stream_db_rows(self, fname: str, edited_rows: dict):
+        """Yields every row of a table in database, replacing modified rows"""
+        row_num = 0
+        for page in self.database.iter_row_pages(fname, self.model.page_size):
+            for row in page:
+                yield edited_rows.get(row_num, row)
+                row_num += 1
+
+    def track_edit(self, row_num: int, column_name: str, new_text: str):
+        """Records the full row of a modified cell of the table opened from database,
+        the row is read in the background when it is not in the window"""
+        def apply_edit(row):
+            row = list(row)
+            row[self.model.db_columns.index(column_name)] = new_text
+            self.model.edited_rows[row_num] = row
+
+        if row_num in self.model.edited_rows:
+            apply_edit(self.model.edited_rows[row_num])
+        elif row_num in self.model.stored_dataframe.index:
+            apply_edit(self.model.stored_dataframe.loc[row_num].tolist())
+        else:
+            self.db_worker.submit(
+                self.database.get_row_page, self.database.current_fname, row_num, 1,
+                on_done=lambda rows: apply_edit(rows[0])
+            )
+
+    def iter_table_frames(self, rows):
+        """Yields the rows of a table opened from the database as string dataframes,
+        one page at a time
+
+        Args:
+            rows (generator): rows of the table from all_rows
+        """
+        page = []
+        start = 0
+        for row in rows:
+            page.append(row)
+            if len(page) == self.model.page_size:
+                yield pd.DataFrame(page, columns=self.model.db_columns, index=range(start, start + len(page))).astype(str)
+                start += len(page)
+                page = []
+        if page:
+            yield pd.DataFrame(page, columns=self.model.db_columns, index=range(start, start + len(page))).astype(str)
     
     def del_curr_from_db(self):
         """Deletes current file from database"""
         # Check connection
         if self.cnx:
             curr_fname = self.database.current_fname
-            fnames = self.database.get_fnames()
-            if bool(fnames):
-                # Check if there is an opened file
-                if curr_fname:
-                    if messagebox.askyesno(title="Delete?", message=f"Do you really want to delete \"{curr_fname}\" from database?"):
-                        # Deletes current file from db
-                        self.database.del_from_tbl(curr_fname)
-                        self.database.current_fname = False
-                        self.open_status_name = False
-                        self.model.stored_dataframe = pd.DataFrame()
-                        self.reset_table()
-                        self.title("CSV Editor")
-                        # Confirmation message that the file is deleted
-                        messagebox.showinfo(title="Message", message=f"Successfuly deleted \"{curr_fname}\" from database.")
+
+            def on_fnames(fnames):
+                if bool(fnames):
+                    # Check if there is an opened file
+                    if curr_fname:
+                        if messagebox.askyesno(title="Delete?", message=f"Do you really want to delete \"{curr_fname}\" from database?"):
+                            # Deletes current file from db
+                            self.close_row_stream()
+                            self.db_worker.submit(self.database.del_from_tbl, curr_fname, on_done=on_deleted)
+                    else:
+                        messagebox.showinfo(title="Message", message=f"File does not exist in database.")
                 else:
-                    messagebox.showinfo(title="Message", message=f"File does not exist in database.")
-            else:
-                messagebox.showinfo(
-                    title = "Empty",
-                    message = f"Database is empty."
-                )
+                    messagebox.showinfo(
+                        title = "Empty",
+                        message = f"Database is empty."
+                    )
+
+            def on_deleted(result):
+                self.database.current_fname = False
+                self.open_status_name = False
+                self.model.stored_dataframe = pd.DataFrame()
+                self.reset_table()
+                self.title("CSV Editor")
+                # Confirmation message that the file is deleted
+                messagebox.showinfo(title="Message", message=f"Successfuly deleted \"{curr_fname}\" from database.")
+
+            self.db_worker.submit(self.database.get_fnames, on_done=on_fnames)
         else:
             self.cnx_error_msg()
 
@@ -321,15 +615,10 @@ class CSV_Controller(TkinterDnD.Tk):
             if self.open_status_name:
                 self.view.status_bar.config(fg="black")
                 self.view.status_bar.config(text=f"Saved: {self.open_status_name}       ")
-                csv_writer = self.model.save_csv(self.open_status_name)
                 # List of headings of the treeview
                 header = [self.table.heading(column)["text"] for column in self.table["columns"]]
-                csv_writer.writerow(header)
                 # List treeview values
-                contents = [self.table.item(item)["values"] for item in self.table.get_children()]
-                
-                for row in contents:
-                    csv_writer.writerow(row)
+                self.model.save_csv(self.open_status_name, header, self.all_rows())
             elif self.database.current_fname:
                 self.save_csv_as()
         else:
@@ -347,25 +636,28 @@ class CSV_Controller(TkinterDnD.Tk):
             )
             # Check if user selected filename
             if csv_file:
-                # Create csv writer using csv write from models
-                csv_writer = self.model.save_csv(csv_file)
                 # List of headings of the treeview
                 header = [self.table.heading(column)["text"] for column in self.table["columns"]]
+                # List treeview values, tables opened from database are streamed
+                rows = self.all_rows()
 
-                csv_writer.writerow(header)
+                def on_saved(result):
+                    self.view.status_bar.config(fg="black")
+                    self.view.status_bar.config(text=f"Saved: {csv_file}       ")
 
-                # List treeview values
-                contents = [self.table.item(item)["values"] for item in self.table.get_children()]
-                
-                for row in contents:
-                    csv_writer.writerow(row)
+                if self.database.current_fname:
+                    self.view.status_bar.config(fg="black")
+                    self.view.status_bar.config(text=f"Saving: {csv_file}...       ")
+                    self.db_worker.submit(self.model.save_csv, csv_file, header, rows, pass_task=True, on_done=on_saved)
+                else:
+                    self.model.save_csv(csv_file, header, rows)
+                    on_saved(None)
 
                 # Update flag to current filename
                 self.open_status_name = csv_file
                 self.database.current_fname = False
+                self.close_row_stream()
                 self.title("CSV Editor")
-                self.view.status_bar.config(fg="black")
-                self.view.status_bar.config(text=f"Saved: {self.open_status_name}       ")
         else:
             self.no_opened_file()
 
@@ -427,6 +719,11 @@ class CSV_Controller(TkinterDnD.Tk):
         # Interact with tree and cell only
         if region_clicked not in ("tree", "cell"): 
             return
+
+        # Files opened from the cache while offline cannot be modified
+        if self.database.current_fname and self.database.read_only:
+            self.read_only_msg()
+            return
         
         # Which item was double-clicked returns #0, #1, #2 ...
         column = self.table.identify_column(event.x)
@@ -494,10 +791,15 @@ class CSV_Controller(TkinterDnD.Tk):
         current_values[column_index] = new_text
         self.table.item(selected_iid, values=current_values)
         
-        # Update stored dataframe for searching; store new treeview to the 'stored_dataframe' property
-        tree_columns = [self.table.heading(column)["text"] for column in self.table["columns"]]
-        tree_rows = [self.table.item(item)["values"] for item in self.table.get_children()]
-        self.model.stored_dataframe = pd.DataFrame(tree_rows, columns=tree_columns)
+        # Update stored dataframe for searching; the treeview iid is the row index in the 'stored_dataframe' property
+        row_num = int(selected_iid)
+        column_name = self.table["columns"][column_index]
+        if row_num in self.model.stored_dataframe.index:
+            self.model.stored_dataframe.at[row_num, column_name] = new_text
+
+        # Track the full row of modified database rows so only those are saved
+        if self.database.current_fname:
+            self.track_edit(row_num, column_name, new_text)
 
         event.widget.destroy()
    
@@ -537,9 +839,9 @@ class CSV_Controller(TkinterDnD.Tk):
         global df_rows
         df_rows = self.model.row_content(dataframe)
               
-        # Insert the rows based on the format of df_rows
-        for row in df_rows:
-            self.table.insert("", "end", values=row)
+        # Insert the rows based on the format of df_rows, the dataframe index is used as iid of the row
+        for row_num, row in zip(dataframe.index, df_rows):
+            self.table.insert("", "end", iid=row_num, values=row)
             
         return None
     
@@ -549,14 +851,56 @@ class CSV_Controller(TkinterDnD.Tk):
         Args:
             pairs (dict): pairs of column search in the entry widget {country: PH, year: 2020}
         """
-        # Column values inside the entry box / use when user selects "Display inputted columns"
-        columns_input = pairs.keys()
-    
         # Value inside option menu   
         option_value = self.view.search_val.get()
-        
-        new_df = self.model.stored_dataframe
-        
+
+        # Tables opened from database are searched in the background
+        if self.database.current_fname:
+            self.view.status_bar.config(fg="black")
+            self.view.status_bar.config(text="Searching...       ")
+            self.db_worker.submit(
+                self._search_pages, self.all_rows(), pairs, option_value,
+                pass_task=True,
+                on_done=self._draw_search_results
+            )
+        else:
+            self._draw_search_results(self._query_frame(self.model.stored_dataframe, pairs, option_value))
+
+    def _search_pages(self, rows, pairs: dict, option_value: str, task=None):
+        """Searches a table opened from database page by page, keeping matches up to the
+        size of the window. Runs on the database worker"""
+        max_matches = self.model.page_size * self.model.max_pages
+        matches = []
+        match_count = 0
+        for page_df in self.iter_table_frames(rows):
+            task.check()
+            match = self._query_frame(page_df, pairs, option_value)
+            matches.append(match)
+            match_count += len(match)
+            if match_count >= max_matches:
+                break
+        return pd.concat(matches)[:max_matches]
+
+    def _draw_search_results(self, new_df_copy):
+        """Draws the dataframe of search results in the treeview"""
+        self.model.search_active = True
+        self._draw_table(new_df_copy)
+        if self.database.current_fname:
+            self._page_status()
+
+    def _query_frame(self, new_df, pairs: dict, option_value: str):
+        """Queries the dataframe for every pair in entry widget
+
+        Args:
+            new_df (DataFrame): string dataframe to search
+            pairs (dict): pairs of column search in the entry widget {country: PH, year: 2020}
+            option_value (str): value of the option menu whether to display all or inputted columns
+
+        Returns:
+            DataFrame: rows of the dataframe that match the pairs
+        """
+        columns_input = pairs.keys()
+
         # Get the columns in their actual case for displaying
         columns = []
         for column in new_df.columns:
@@ -587,11 +931,11 @@ class CSV_Controller(TkinterDnD.Tk):
             new_df_copy.columns = columns
         else:
             new_df_copy.columns = new_df.columns
-        # Draws the dataframe in the treeview 
-        self._draw_table(new_df_copy)
+        return new_df_copy
     
     def reset_table(self):
         # Resets the treeview by drawing the stored dataframe
+        self.model.search_active = False
         self._draw_table(self.model.stored_dataframe)
 
     def drop_inside_list_box(self, event):
@@ -631,6 +975,8 @@ class CSV_Controller(TkinterDnD.Tk):
         # Update flags
         self.open_status_name = path
         self.database.current_fname = False
+        self.close_row_stream()
+        self.model.search_active = False
         self.title("CSV Editor")
         self.view.status_bar.config(fg="black")
         self.view.status_bar.config(text=f"{self.open_status_name}       ")
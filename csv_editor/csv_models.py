@@ -10,17 +10,65 @@ class ModelCSV():
         # Empty Dataframe object for to reset modified dataframe
         self.stored_dataframe= pd.DataFrame()
 
+        # Paging of tables opened from the database
+        # Rows fetched per page and the number of pages kept in the treeview at once
+        self.page_size = 500
+        self.max_pages = 10
+        # RowPageStream of the rows streamed from the database
+        self.row_stream = None
+        # Pages currently drawn in the treeview are [first_page, next_page)
+        self.first_page = 0
+        self.next_page = 0
+        # Column names and row count of the table opened from the database
+        self.db_columns = []
+        self.total_rows = 0
+        # Flag to check if the treeview shows search results instead of the page window
+        self.search_active = False
+        # {row number: row} of the rows modified since the table was opened from the database
+        self.edited_rows = {}
+
     def open_csv_file(self, path):
         """reads dataframe from path"""
         df = pd.read_csv(path)
         return df
 
-    def save_csv(self, filename: str): # TODO write treeview
-        """create csv writer to save file"""
-        file = open(filename, 'w', newline='')
-        csv_writer = csv.writer(file)
-        return csv_writer
+    def save_csv(self, filename: str, header: list, rows, task=None):
+        """writes the header and rows to the csv file
+
+        Args:
+            filename (str): path of the csv file
+            header (list): column names
+            rows (iterable): rows of the table, can be a generator streaming from database
+            task (DBTask, optional): task to check for cancellation when run on the database worker
+        """
+        with open(filename, 'w', newline='') as file:
+            csv_writer = csv.writer(file)
+            csv_writer.writerow(header)
+            for row_num, row in enumerate(rows):
+                if task is not None and row_num % self.page_size == 0:
+                    task.check()
+                csv_writer.writerow(row)
     
+    def page_frame(self, rows: list, page: int):
+        """Creates a dataframe of a page of database rows indexed by row number
+
+        Args:
+            rows (list): rows of the page
+            page (int): page number of the rows
+
+        Returns:
+            DataFrame: dataframe of the page
+        """
+        start = page * self.page_size
+        # Rows modified since the table was opened replace their stored values
+        rows = [self.edited_rows.get(row_num, row) for row_num, row in enumerate(rows, start)]
+        return pd.DataFrame(rows, columns=self.db_columns, index=range(start, start + len(rows)))
+
+    def page_rows(self, page: int) -> range:
+        """Returns the row numbers that belong to a page"""
+        start = page * self.page_size
+        return range(start, min(start + self.page_size, self.total_rows))
+
     def delete_csv(self, path):
         os.remove(path)
 
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk
 from tkinterdnd2 import DND_FILES
 
+from database.content_stats import describe_file
+
 class CSVView(tk.Frame):
     """Frame object which contains widgets for the CSV editor"""
     def __init__(self, parent, controller):
@@ -62,15 +64,19 @@ class CSVView(tk.Frame):
         save_btn = tk.Button(main_frame, text="Enter filename", command=self.controller.db_save_as)
         save_btn.pack()
     
-    def open_popup(self, options):
+    def open_popup(self, files):
         """popup window to select filename to be opened from database
 
         Args:
-            options (list): list of filenames in database
+            files (list): (filename, byte_size, row_count, updated_at) of the files in database
         """
+        # Labels with the size and modification time of the files mapped to their filenames
+        self.db_files = {describe_file(info, "rows"): info[0] for info in files}
+        options = list(self.db_files)
+
         self.popup_root = tk.Tk()
         self.popup_root.title("Open from database")
-        self.popup_root.geometry("200x100")
+        self.popup_root.geometry("420x100")
         self.popup_root.wm_attributes("-topmost", True)
         main_frame = tk.Frame(self.popup_root)
         main_frame.pack(fill=tk.BOTH)
@@ -147,14 +153,25 @@ class DataTable(ttk.Treeview):
         self.bind("<Double-1>", controller.on_double_click)
 
         self.master = parent
+        self.controller = controller
         # Horizontal and vertical scrollbars
-        scroll_Y = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scroll_Y = tk.Scrollbar(self, orient="vertical", command=self.yview)
         scroll_X = tk.Scrollbar(self, orient="horizontal", command=self.xview)
-        self.configure(yscrollcommand=scroll_Y.set, xscrollcommand=scroll_X.set)
-        scroll_Y.pack(side="right", fill="y")
+        self.configure(yscrollcommand=self.on_scroll, xscrollcommand=scroll_X.set)
+        self.scroll_Y.pack(side="right", fill="y")
         scroll_X.pack(side="bottom", fill="x")
 
         # Change style of treeview
         style = ttk.Style(self)
         style.theme_use("default")
-        style.map("Treeview")
\ No newline at end of file
+        style.map("Treeview")
+
+    def on_scroll(self, first, last):
+        """Moves the vertical scrollbar and lets the controller load pages at either end of the view
+
+        Args:
+            first (str): fraction of the rows above the visible rows
+            last (str): fraction of the rows up to the last visible row
+        """
+        self.scroll_Y.set(first, last)
+        self.controller.on_table_scroll(float(first), float(last))
\ No newline at end of file
@@ -0,0 +1,293 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import pandas as pd
+
+from database.content_stats import ContentStats
+from database.csv_database import CSVdatabase
+from database.txt_database import TXTdatabase
+from text_editor.text_decoder import read_text
+
+# Extensions of the files imported from a directory
+IMPORT_EXTENSIONS = (".csv", ".txt")
+
+
+def import_name(path: str) -> tuple:
+    """Get the (table, filename) a file is imported as
+
+    CSV files keep their name without the extension, text files keep their full
+    name like the text editor saves them.
+    """
+    name = os.path.basename(path)
+    if name.lower().endswith(".csv"):
+        return "CSV_Data", name[:-4]
+    return "Text_Data", name
+
+
+def parse_file(path: str) -> dict:
+    """Reads and serializes a file for import, run in a worker process
+
+    CSV files are read like the CSV editor opens them, the filename is given by import_name.
+
+    Args:
+        path (str): path of a .csv or .txt file
+
+    Returns:
+        dict: filename, table, file size, content and ContentStats values of the file
+    """
+    table, filename = import_name(path)
+    if table == "CSV_Data":
+        df = pd.read_csv(path)
+        columns = str(list(df.columns))
+        stats = ContentStats.of_csv_columns(columns)
+        rows = []
+        for row in df.to_numpy().tolist():
+            row_content = json.dumps(row, default=str)
+            stats.add_row(row_content)
+            rows.append(row_content)
+        content = {"columns": columns, "rows": rows}
+    else:
+        text, _ = read_text(path)
+        stats = ContentStats.of_text(text)
+        content = {"text": text}
+
+    byte_size, row_count, content_hash = stats.values()
+    return {
+        "filename": filename,
+        "table": table,
+        "file_size": os.path.getsize(path),
+        "byte_size": byte_size,
+        "row_count": row_count,
+        "content_hash": content_hash,
+        **content
+    }
+
+
+class ImportReport():
+    """Counts of a bulk import shown when it finishes"""
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.bytes_read = 0
+        self.elapsed = 0.0
+        # (path, error message) of the files that could not be imported
+        self.failures = []
+
+    @property
+    def files_read(self) -> int:
+        return self.imported + self.skipped
+
+    def files_per_second(self) -> float:
+        return self.files_read / self.elapsed if self.elapsed else 0.0
+
+    def mb_per_second(self) -> float:
+        return self.bytes_read / 1048576 / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        """Text of the report with throughput and failures"""
+        lines = [
+            f"Imported {self.imported} file(s), skipped {self.skipped} already stored, {len(self.failures)} failed.",
+            f"{self.elapsed:.1f} s, {self.files_per_second():.1f} files/s, {self.mb_per_second():.2f} MB/s"
+        ]
+        if self.failures:
+            lines.append("")
+            lines.append("Failed files:")
+            lines.extend(f"{path}: {error}" for path, error in self.failures)
+        return "\n".join(lines)
+
+
+class BulkImporter():
+    """Imports every CSV and TXT file of a directory into "CSV_Data" and "Text_Data"
+
+    Files are parsed in worker processes while the parsed ones are written in
+    transactions of "batch_files" files, the rows of every batch being sent with
+    executemany. At most two files per worker are parsed ahead of the writes, so
+    the memory used does not grow with the directory. Files whose content hash is
+    already stored are skipped, and a file whose name in the database is the one
+    of another file of the directory fails instead of overwriting it.
+
+    Args:
+        database (CSVdatabase | TXTdatabase): database whose credentials are used
+        workers (int, optional): number of parsing processes. Defaults to the number of CPUs.
+    """
+    def __init__(self, database, workers=None):
+        self.csv_database = CSVdatabase()
+        self.txt_database = TXTdatabase()
+        for db in (self.csv_database, self.txt_database):
+            db.host = database.host
+            db.user = database.user
+            db.password = database.password
+        self.workers = workers
+        # Files written per transaction and rows per executemany call
+        self.batch_files = 20
+        self.batch_rows = self.csv_database.batch_size
+
+    def find_files(self, directory: str, report=None) -> list:
+        """Get the paths of the files to import under the directory
+
+        Args:
+            directory (str): directory to walk
+            report (ImportReport, optional): receives as failures the files whose name in the
+                database is the one of a file found before them, which are left out
+
+        Returns:
+            list: paths of the files, each with its own name in the database
+        """
+        paths = []
+        # {(table, folded filename): path}, names are compared like the server's collation does
+        names = {}
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.lower().endswith(IMPORT_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                table, filename = import_name(path)
+                key = (table, filename.casefold())
+                if key in names:
+                    if report is not None:
+                        report.failures.append((path, f"\"{filename}\" in {table} is already imported from {names[key]}"))
+                    continue
+                names[key] = path
+                paths.append(path)
+        return paths
+
+    def run(self, directory: str, task=None) -> ImportReport:
+        """Imports the files of the directory
+
+        Args:
+            directory (str): directory to walk
+            task (DBTask, optional): task to check for cancellation and report the files done
+
+        Returns:
+            ImportReport: counts, throughput and failures of the import
+        """
+        report = ImportReport()
+        start = time.perf_counter()
+        paths = self.find_files(directory, report)
+
+        # Creates the tables if neither editor has connected to this server yet
+        self.csv_database.create_db()
+        self.txt_database.create_database()
+
+        cnx = self.csv_database.connect(self.csv_database.slow_timeout)
+        if not cnx:
+            report.failures.append((directory, "Not connected to database."))
+            return report
+        cursor = cnx.cursor()
+        cursor.execute("USE data_editor")
+        stored = {table: self._stored_hashes(cursor, table) for table in ("CSV_Data", "Text_Data")}
+
+        batch = []
+        try:
+            # Spawned instead of forked since the editors run the import from a thread of the Tk process
+            context = multiprocessing.get_context("spawn")
+            in_flight = (self.workers or os.cpu_count() or 1) * 2
+            remaining = iter(paths)
+            done = 0
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                # {future: path} of the files being parsed, a file leaves it once it is in the batch
+                futures = {}
+                try:
+                    while True:
+                        for path in islice(remaining, in_flight - len(futures)):
+                            futures[executor.submit(parse_file, path)] = path
+                        if not futures:
+                            break
+                        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            path = futures.pop(future)
+                            done += 1
+                            if task is not None:
+                                task.check()
+                                task.report(f"{done}/{len(paths)} files")
+                            try:
+                                parsed = future.result()
+                            except Exception as err:
+                                report.failures.append((path, str(err)))
+                                continue
+
+                            report.bytes_read += parsed["file_size"]
+                            hashes = stored[parsed["table"]]
+                            if parsed["content_hash"] in hashes:
+                                report.skipped += 1
+                                continue
+                            hashes.add(parsed["content_hash"])
+                            batch.append((path, parsed))
+                            if len(batch) == self.batch_files:
+                                self._write_batch(cnx, cursor, batch, report)
+                                batch = []
+                except BaseException:
+                    # Drops the files that are not parsed yet
+                    for future in futures:
+                        future.cancel()
+                    raise
+            if batch:
+                self._write_batch(cnx, cursor, batch, report)
+        finally:
+            cursor.close()
+            cnx.close()
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def _stored_hashes(self, cursor, table: str) -> set:
+        """Get the content hashes stored in a table, read from its hash index"""
+        cursor.execute(f"SELECT content_hash FROM {table} WHERE content_hash IS NOT NULL")
+        return {row[0] for row in cursor.fetchall()}
+
+    def _write_batch(self, cnx, cursor, batch: list, report: ImportReport):
+        """Writes the parsed files in one transaction. Files with the name of a stored
+        file replace it. When the transaction fails the files are retried one by one
+        so that a single bad file only fails itself"""
+        try:
+            for path, parsed in batch:
+                self._write_file(cursor, parsed)
+            cnx.commit()
+            report.imported += len(batch)
+        except Exception:
+            cnx.rollback()
+            for path, parsed in batch:
+                try:
+                    self._write_file(cursor, parsed)
+                    cnx.commit()
+                    report.imported += 1
+                except Exception as err:
+                    cnx.rollback()
+                    report.failures.append((path, str(err)))
+
+        for path, parsed in batch:
+            if parsed["table"] == "CSV_Data":
+                self.csv_database.cache.clear_rows(parsed["filename"])
+
+    def _write_file(self, cursor, parsed: dict):
+        """Inserts or replaces one parsed file"""
+        fname = parsed["filename"]
+        metadata = (parsed["byte_size"], parsed["row_count"], parsed["content_hash"])
+        if parsed["table"] == "Text_Data":
+            self.txt_database.chunks.write(cursor, "Text_Data", fname, parsed["text"])
+            query = (
+                "INSERT INTO Text_Data (filename, content, byte_size, row_count, content_hash) VALUES (%s, '', %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE content = '', byte_size = VALUES(byte_size), "
+                "row_count = VALUES(row_count), content_hash = VALUES(content_hash), version = version + 1"
+            )
+            cursor.execute(query, (fname,) + metadata)
+        else:
+            query = (
+                "INSERT INTO CSV_Data (filename, col_content, row_content, byte_size, row_count, content_hash) "
+                "VALUES (%s, %s, '', %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE col_content = VALUES(col_content), row_content = '', byte_size = VALUES(byte_size), "
+                "row_count = VALUES(row_count), content_hash = VALUES(content_hash), version = version + 1"
+            )
+            cursor.execute(query, (fname, parsed["columns"]) + metadata)
+            cursor.execute("DELETE FROM CSV_Rows WHERE filename = %s", (fname,))
+
+            query = "INSERT INTO CSV_Rows (filename, row_num, row_content) VALUES (%s, %s, %s)"
+            rows = parsed["rows"]
+            for start in range(0, len(rows), self.batch_rows):
+                values = [(fname, row_num, row) for row_num, row in enumerate(rows[start:start + self.batch_rows], start)]
+                cursor.executemany(query, values)
@@ -0,0 +1,373 @@
+import hashlib
+import re
+import zlib
+
+from database.schema import add_column
+from text_editor.word_index import WORD, fold
+
+# Longest word kept in the word index of the chunks
+MAX_WORD = 64
+# Matches up to the last character that cannot be part of a word
+LAST_NON_WORD = re.compile(r'.*\W', re.DOTALL)
+
+class ChunkStore():
+    """Content-addressed storage of text documents on the server
+
+    Documents are split into chunks at line ends chosen from the content itself, so
+    an edit only changes the chunks around it and identical parts of different
+    documents produce identical chunks. Chunks are stored once in "Chunks" keyed by
+    their SHA-256 hash, zlib-compressed when that makes them smaller, and
+    "Doc_Chunks" keeps the ordered hashes of every document. A save only sends the
+    chunks the server does not have yet and the positions whose chunk changed, and
+    a read streams the chunks in order. "Chunk_Words" indexes the words of every
+    chunk, folded like the editor's word index, so documents can be found by word
+    without reading them.
+    """
+    def __init__(self):
+        # A chunk ends after a line once it has min_size characters and the hash of the
+        # line matches the mask, and is cut at max_size characters in any case
+        self.min_size = 2048
+        self.max_size = 16384
+        self.mask = 0x7
+        # Hashes per "IN" lookup
+        self.lookup_size = 500
+        # Chunks sent per batch when a document is written from a stream, and read per batch
+        self.batch_size = 200
+        # New chunks are stored compressed when it makes them smaller
+        self.compress = True
+        self.compress_level = 6
+
+    def create_tables(self, cursor):
+        """Creates the chunk tables in the current database"""
+        cursor.execute("CREATE TABLE IF NOT EXISTS Chunks(hash char(64) PRIMARY KEY, data mediumtext)")
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS Doc_Chunks(tbl varchar(64), filename varchar(255), seq int, chunk_hash char(64), "
+            "PRIMARY KEY (tbl, filename, seq), INDEX idx_chunk_hash (chunk_hash))"
+        )
+        # Words are compared as folded bytes, whatever the default collation of the server
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS Chunk_Words(word varchar(64), chunk_hash char(64), "
+            "PRIMARY KEY (word, chunk_hash), INDEX idx_words_chunk (chunk_hash)) "
+            "CHARACTER SET utf8mb4 COLLATE utf8mb4_bin"
+        )
+        # Chunks stored before the word index are indexed by index_pending
+        add_column(cursor, "Chunks", "words_indexed", "tinyint NOT NULL DEFAULT 0")
+        # Compressed chunks keep their bytes in "body" instead of "data", see encode
+        add_column(cursor, "Chunks", "body", "mediumblob")
+        add_column(cursor, "Chunks", "codec", "varchar(8)")
+
+    def split(self, text: str) -> list:
+        """Splits the text into content-defined chunks
+
+        Args:
+            text (str): content of the document
+
+        Returns:
+            list: chunks of the text in order, joining them gives the text back
+        """
+        return list(self.split_stream([text]))
+
+    def split_stream(self, parts):
+        """Splits text arriving in parts into the chunks split gives for the whole text
+
+        Args:
+            parts (iterable): consecutive parts of the content of a document
+
+        Yields:
+            str: chunks in order
+        """
+        current = []
+        size = 0
+        for line in self._lines(parts):
+            # Lines longer than a chunk are cut after their last non-word character before the
+            # limit, so every word of the line is whole in one chunk and in its word index
+            while size + len(line) > self.max_size:
+                cut = self.max_size - size
+                boundary = LAST_NON_WORD.match(line, 0, cut)
+                if boundary is not None:
+                    cut = boundary.end()
+                elif size:
+                    # The word at the start of the line does not fit, it starts the next chunk
+                    yield "".join(current)
+                    current = []
+                    size = 0
+                    continue
+                # Otherwise the word is longer than a chunk, far past MAX_WORD, and is never indexed
+                current.append(line[:cut])
+                yield "".join(current)
+                current = []
+                size = 0
+                line = line[cut:]
+            current.append(line)
+            size += len(line)
+            if size >= self.min_size and zlib.crc32(line.encode("utf-8")) & self.mask == 0:
+                yield "".join(current)
+                current = []
+                size = 0
+        if current:
+            yield "".join(current)
+
+    def _lines(self, parts):
+        """Get the lines of text arriving in parts, with their line ends"""
+        pending = ''
+        for part in parts:
+            lines = (pending + part).splitlines(keepends=True)
+            # The last line may go on in the next part, or be a "\r" before its "\n"
+            pending = lines.pop() if lines else ''
+            yield from lines
+        if pending:
+            yield pending
+
+    def chunk_hash(self, chunk: str) -> str:
+        return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+    def encode(self, chunk: str) -> tuple:
+        """Get the stored form of a chunk
+
+        Returns:
+            tuple: (data, body, codec, bytes sent), the text in "data" or its compressed
+                bytes in "body" with the codec "zlib"
+        """
+        raw = chunk.encode("utf-8")
+        if self.compress:
+            body = zlib.compress(raw, self.compress_level)
+            if len(body) < len(raw):
+                return None, body, "zlib", len(body)
+        return chunk, None, None, len(raw)
+
+    def decode(self, data, body, codec) -> str:
+        """Get the text of a chunk from its "data", "body" and "codec" columns"""
+        if body is None:
+            return data
+        if codec == "zlib":
+            body = zlib.decompress(body)
+        return bytes(body).decode("utf-8")
+
+    def _existing(self, cursor, hashes: list) -> set:
+        """Get the hashes the server already has"""
+        existing = set()
+        for start in range(0, len(hashes), self.lookup_size):
+            part = hashes[start:start + self.lookup_size]
+            placeholders = ", ".join(["%s"] * len(part))
+            # Shared locks keep the chunks from being dropped by a delete until this save commits
+            cursor.execute(f"SELECT hash FROM Chunks WHERE hash IN ({placeholders}) LOCK IN SHARE MODE", part)
+            existing.update(row[0] for row in cursor.fetchall())
+        return existing
+
+    def write(self, cursor, table: str, fname: str, text: str) -> int:
+        """Stores the chunks of a document, replacing its previous chunk list
+
+        Args:
+            cursor (cursor): cursor of the open connection, the caller commits
+            table (str): "Text_Data" or "Exports"
+            fname (str): filename of the document
+            text (str): content of the document
+
+        Returns:
+            int: number of bytes of chunk data sent to the server
+        """
+        return self.write_stream(cursor, table, fname, [text])
+
+    def write_stream(self, cursor, table: str, fname: str, parts, stats=None) -> int:
+        """Stores the chunks of a document produced in parts, sent in batches of chunks, so
+        the whole document is never held in memory
+
+        Args:
+            cursor (cursor): cursor of the open connection, the caller commits
+            table (str): "Text_Data" or "Exports"
+            fname (str): filename of the document
+            parts (iterable): consecutive parts of the content of the document
+            stats (ContentStats, optional): receives every chunk of the document
+
+        Returns:
+            int: number of bytes of chunk data sent to the server
+        """
+        old_hashes = self._hashes(cursor, table, fname)
+
+        hashes = set()
+        sent = 0
+        seq = 0
+        batch = []
+        chunk = ''
+        for chunk in self.split_stream(parts):
+            if stats is not None:
+                stats.add(chunk, chunk.count("\n"))
+            batch.append(chunk)
+            if len(batch) == self.batch_size:
+                sent += self._write_batch(cursor, table, fname, seq, batch, hashes, old_hashes)
+                seq += len(batch)
+                batch = []
+        if batch:
+            sent += self._write_batch(cursor, table, fname, seq, batch, hashes, old_hashes)
+            seq += len(batch)
+        if stats is not None and chunk and not chunk.endswith("\n"):
+            # Rows are lines, like ContentStats.of_text counts them
+            stats.row_count += 1
+
+        if seq < len(old_hashes):
+            cursor.execute("DELETE FROM Doc_Chunks WHERE tbl = %s AND filename = %s AND seq >= %s", (table, fname, seq))
+        self._drop_unused(cursor, set(old_hashes) - hashes)
+        return sent
+
+    def _write_batch(self, cursor, table: str, fname: str, seq: int, chunks: list, hashes: set, old_hashes: list) -> int:
+        """Sends the chunks of a batch the server does not have and the positions of the
+        chunk list whose chunk changed
+
+        Args:
+            seq (int): position of the first chunk of the batch in the document
+            hashes (set): hashes of the document so far, updated in place
+            old_hashes (list): hashes of the document before the save, in order
+
+        Returns:
+            int: number of bytes of chunk data sent
+        """
+        batch_hashes = [self.chunk_hash(chunk) for chunk in chunks]
+        existing = self._existing(cursor, list(set(batch_hashes)))
+        new_chunks = {}
+        for chunk_hash, chunk in zip(batch_hashes, chunks):
+            if chunk_hash not in existing:
+                new_chunks[chunk_hash] = chunk
+        sent = 0
+        if new_chunks:
+            rows = []
+            for chunk_hash, chunk in new_chunks.items():
+                data, body, codec, size = self.encode(chunk)
+                rows.append((chunk_hash, data, body, codec))
+                sent += size
+            # Another save can store the same chunk at the same time
+            query = "INSERT IGNORE INTO Chunks (hash, data, body, codec, words_indexed) VALUES (%s, %s, %s, %s, 1)"
+            cursor.executemany(query, rows)
+            self._insert_words(cursor, new_chunks)
+
+        changed = [
+            (table, fname, seq + number, chunk_hash)
+            for number, chunk_hash in enumerate(batch_hashes)
+            if seq + number >= len(old_hashes) or old_hashes[seq + number] != chunk_hash
+        ]
+        if changed:
+            query = (
+                "INSERT INTO Doc_Chunks (tbl, filename, seq, chunk_hash) VALUES (%s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE chunk_hash = VALUES(chunk_hash)"
+            )
+            cursor.executemany(query, changed)
+        hashes.update(batch_hashes)
+        return sent
+
+    def read(self, cursor, table: str, fname: str):
+        """Get the content of a document from its chunks
+
+        Returns:
+            str: content of the document or None if it is not stored in chunks
+        """
+        parts = [part for part, _ in self.read_stream(cursor, table, fname)]
+        if not parts:
+            return None
+        return "".join(parts)
+
+    def read_stream(self, cursor, table: str, fname: str):
+        """Get the content of a document a batch of chunks at a time, in order, as the
+        server sends them
+
+        Args:
+            cursor (cursor): unbuffered cursor of the open connection, the rows are
+                fetched as they are used
+
+        Yields:
+            tuple: (text of the batch, fraction of the chunks read), nothing if the
+                document is not stored in chunks
+        """
+        cursor.execute("SELECT COUNT(*) FROM Doc_Chunks WHERE tbl = %s AND filename = %s", (table, fname))
+        count = cursor.fetchone()[0]
+        if not count:
+            return
+        query = (
+            "SELECT c.data, c.body, c.codec FROM Doc_Chunks d JOIN Chunks c ON c.hash = d.chunk_hash "
+            "WHERE d.tbl = %s AND d.filename = %s ORDER BY d.seq"
+        )
+        cursor.execute(query, (table, fname))
+        done = 0
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            done += len(rows)
+            yield "".join(self.decode(*row) for row in rows), done / count
+
+    def words(self, chunk: str) -> set:
+        """Get the folded words of a chunk that fit the word index"""
+        return {word for word in map(fold, WORD.findall(chunk)) if len(word) <= MAX_WORD}
+
+    def _insert_words(self, cursor, chunks: dict):
+        """Indexes the words of {hash: chunk}"""
+        rows = [(word, chunk_hash) for chunk_hash, chunk in chunks.items() for word in self.words(chunk)]
+        if rows:
+            cursor.executemany("INSERT IGNORE INTO Chunk_Words (word, chunk_hash) VALUES (%s, %s)", rows)
+
+    def index_pending(self, cursor, batch_size: int = 200) -> int:
+        """Indexes the words of the chunks stored before the word index, the caller commits
+
+        Returns:
+            int: number of chunks indexed
+        """
+        indexed = 0
+        while True:
+            cursor.execute("SELECT hash, data, body, codec FROM Chunks WHERE words_indexed = 0 LIMIT %s", (batch_size,))
+            chunks = {chunk_hash: self.decode(data, body, codec) for chunk_hash, data, body, codec in cursor.fetchall()}
+            if not chunks:
+                return indexed
+            self._insert_words(cursor, chunks)
+            placeholders = ", ".join(["%s"] * len(chunks))
+            cursor.execute(f"UPDATE Chunks SET words_indexed = 1 WHERE hash IN ({placeholders})", list(chunks))
+            indexed += len(chunks)
+
+    def find(self, cursor, words: list) -> set:
+        """Get the (table, filename) of the documents with a chunk that contains any of the words
+
+        Args:
+            cursor (cursor): cursor of the open connection
+            words (list): words, folded with the same fold as the index
+
+        Returns:
+            set: (table, filename) pairs
+        """
+        found = set()
+        for start in range(0, len(words), self.lookup_size):
+            part = words[start:start + self.lookup_size]
+            placeholders = ", ".join(["%s"] * len(part))
+            query = (
+                "SELECT DISTINCT d.tbl, d.filename FROM Chunk_Words w JOIN Doc_Chunks d ON d.chunk_hash = w.chunk_hash "
+                f"WHERE w.word IN ({placeholders})"
+            )
+            cursor.execute(query, part)
+            found.update(cursor.fetchall())
+        return found
+
+    def delete(self, cursor, table: str, fname: str):
+        """Removes the chunk list of a document and the chunks no other document uses"""
+        old_hashes = self._hashes(cursor, table, fname)
+        cursor.execute("DELETE FROM Doc_Chunks WHERE tbl = %s AND filename = %s", (table, fname))
+        self._drop_unused(cursor, set(old_hashes))
+
+    def _hashes(self, cursor, table: str, fname: str) -> list:
+        cursor.execute("SELECT chunk_hash FROM Doc_Chunks WHERE tbl = %s AND filename = %s ORDER BY seq", (table, fname))
+        return [row[0] for row in cursor.fetchall()]
+
+    def _drop_unused(self, cursor, hashes: set):
+        """Deletes the chunks of the hashes that are no longer in any document, lookup_size at a time"""
+        hashes = list(hashes)
+        for start in range(0, len(hashes), self.lookup_size):
+            part = hashes[start:start + self.lookup_size]
+            placeholders = ", ".join(["%s"] * len(part))
+            # Locking reads wait for saves that are reusing the chunks and see their rows
+            cursor.execute(f"SELECT hash FROM Chunks WHERE hash IN ({placeholders}) FOR UPDATE", part)
+            cursor.fetchall()
+            cursor.execute(
+                f"DELETE FROM Chunk_Words WHERE chunk_hash IN ({placeholders}) "
+                "AND NOT EXISTS (SELECT 1 FROM Doc_Chunks d WHERE d.chunk_hash = Chunk_Words.chunk_hash)",
+                part
+            )
+            cursor.execute(
+                f"DELETE FROM Chunks WHERE hash IN ({placeholders}) "
+                "AND NOT EXISTS (SELECT 1 FROM Doc_Chunks d WHERE d.chunk_hash = Chunks.hash)",
+                part
+            )
@@ -0,0 +1,89 @@
+import hashlib
+
+class ContentStats():
+    """Byte size, row count and SHA-256 hash of a document, stored next to its content
+
+    Text documents are hashed as their UTF-8 bytes. CSV files are hashed as their
+    columns followed by every row in the JSON form stored in "CSV_Rows", one per
+    line, so the hash can be computed while the rows are streamed.
+    """
+    def __init__(self):
+        self.byte_size = 0
+        self.row_count = 0
+        self._hash = hashlib.sha256()
+
+    def add(self, data: str, rows: int = 0):
+        """Adds a part of the document
+
+        Args:
+            data (str): text of the part
+            rows (int, optional): number of rows in the part. Defaults to 0.
+        """
+        encoded = data.encode("utf-8")
+        self.byte_size += len(encoded)
+        self.row_count += rows
+        self._hash.update(encoded)
+
+    @property
+    def content_hash(self) -> str:
+        return self._hash.hexdigest()
+
+    def values(self) -> tuple:
+        """Get (byte_size, row_count, content_hash) in the order of the metadata columns"""
+        return self.byte_size, self.row_count, self.content_hash
+
+    @classmethod
+    def of_text(cls, text: str):
+        """Stats of a text document, rows are its lines"""
+        stats = cls()
+        rows = text.count("\n")
+        if text and not text.endswith("\n"):
+            rows += 1
+        stats.add(text, rows)
+        return stats
+
+    @classmethod
+    def of_csv_columns(cls, columns: str):
+        """Starts the stats of a csv with its columns, rows are added with add_row"""
+        stats = cls()
+        stats.add(columns + "\n")
+        return stats
+
+    def add_row(self, row_content: str):
+        """Adds a row of a csv in its stored JSON form"""
+        self.add(row_content + "\n", 1)
+
+
+def format_size(byte_size) -> str:
+    """Formats a byte size for display, e.g. 2048 -> "2.0 KB" """
+    if byte_size is None:
+        return "?"
+    size = float(byte_size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            if unit == "B":
+                return f"{int(size)} B"
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def describe_file(info, unit: str = "rows") -> str:
+    """Label of a file in the open popups
+
+    Args:
+        info (tuple): (filename, byte_size, row_count, updated_at) as listed from database
+        unit (str, optional): name of the rows of the file. Defaults to "rows".
+
+    Returns:
+        str: e.g. "notes  (2.0 KB, 40 lines, 2024-01-31 12:00)", only the filename when
+        the metadata is unknown
+    """
+    fname, byte_size, row_count, updated_at = info
+    if byte_size is None and updated_at is None:
+        return fname
+    details = [format_size(byte_size)]
+    if row_count is not None:
+        details.append(f"{row_count} {unit}")
+    if updated_at is not None:
+        details.append(updated_at.strftime("%Y-%m-%d %H:%M"))
+    return f"{fname}  ({', '.join(details)})"
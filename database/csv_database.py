@@ -1,20 +1,82 @@
+import json
+import threading
+
 import mysql.connector
 from mysql.connector import errorcode
 
+from database.content_stats import ContentStats
+from database.db_worker import OperationCancelled
+from database.doc_cache import DocumentCache
+from database.schema import add_column, add_metadata_columns
+
+class RowPageStream():
+    """Pages of rows from CSVdatabase.iter_row_pages, read in order from any thread
+
+    The stream knows the page it yields next, so a page is only read from it
+    when it is that one. A lock keeps the stream from being closed while a page
+    is read, the close then waits for the read to finish.
+
+    Args:
+        pages (generator): pages of rows from CSVdatabase.iter_row_pages
+    """
+    def __init__(self, pages):
+        self.pages = pages
+        # Page the stream yields next
+        self.position = 0
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def read(self, page: int):
+        """Get the rows of the page, None if the stream is closed or is not on the page"""
+        with self.lock:
+            if self.closed or page != self.position:
+                return None
+            self.position += 1
+            return next(self.pages, [])
+
+    def close(self):
+        """Closes the stream and its connection"""
+        with self.lock:
+            self.closed = True
+            self.pages.close()
+
 class CSVdatabase():
     def __init__(self):
         # Flag to check if a file is opened
         self.current_fname = False
+        # Version and update time of the opened file, the version is compared on save to
+        # detect edits from another instance and both are compared with the local cache
+        self.current_version = 0
+        self.current_updated_at = None
+        self.current_columns = []
+        # Local copy of the files read from database
+        self.cache = DocumentCache(server=lambda: (self.host, self.user))
+        # Flag set when the opened file was read from the cache because the server is unreachable
+        self.read_only = False
         self.host = ""
         self.user = ""
         self.password = ""
+        # Seconds to wait for the server to connect or answer before it is taken as unreachable
+        self.timeout = 5
+        # Seconds the slow operations wait for an answer: migrations, bulk imports and chunk writes.
+        # The pure Python driver uses connection_timeout as the socket timeout of every read
+        self.slow_timeout = 3600
+        # Number of rows sent per executemany batch when writing rows
+        self.batch_size = 500
     
-    def connect(self):
+    def connect(self, timeout=None):
+        """Connects to the server
+
+        Args:
+            timeout (int, optional): seconds to wait for the server. Defaults to "timeout",
+                the slow operations pass "slow_timeout"
+        """
         try:
             cnx = mysql.connector.connect(
                 host=self.host,
                 user=self.user,
-                password=self.password
+                password=self.password,
+                connection_timeout=timeout or self.timeout
             )
             return cnx
         except mysql.connector.Error as err:
@@ -25,113 +87,434 @@ class CSVdatabase():
             else:
                 return False
     
+    def open_database(self) -> bool:
+        """Checks the connection then creates the database and tables
+
+        Returns:
+            bool: True if connected to the server
+        """
+        cnx = self.connect()
+        if cnx:
+            cnx.close()
+            self.create_db()
+            return True
+        else:
+            return False
+
     def create_db(self): # Create
         """Creates database and table"""
-        cnx = self.connect()
+        cnx = self.connect(self.slow_timeout)
 
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("CREATE DATABASE IF NOT EXISTS data_editor")
             cursor.execute("USE data_editor")
             cursor.execute("CREATE TABLE IF NOT EXISTS CSV_Data(filename varchar(255), col_content text(65535), row_content text(65535))")
+            # One row per record so that tables can be streamed page by page
+            cursor.execute("CREATE TABLE IF NOT EXISTS CSV_Rows(filename varchar(255), row_num int, row_content text(65535), PRIMARY KEY (filename, row_num))")
+            # Incremented on every save of the file
+            add_column(cursor, "CSV_Data", "version", "int NOT NULL DEFAULT 0")
+            # Id, size, hash and timestamps so files can be listed without reading rows
+            add_metadata_columns(cursor, "CSV_Data")
+            self._fill_metadata(cnx, cursor)
+            cnx.commit()
             
             cursor.close()
             cnx.close()   
         else:
             pass
 
+    def _fill_metadata(self, cnx, cursor):
+        """Computes the metadata of files saved before the metadata columns were added
+
+        Files that still keep their rows in the "row_content" blob are moved to
+        "CSV_Rows" one at a time, which gives their metadata. The others get the
+        size and count of their rows computed by the server, like ContentStats
+        does, their hash is left unknown like after update_rows.
+        """
+        cursor.execute("SELECT filename FROM CSV_Data WHERE row_content <> ''")
+        for (fname,) in cursor.fetchall():
+            cursor.execute("SELECT col_content, row_content FROM CSV_Data WHERE filename = %s", (fname,))
+            col_content, row_content = cursor.fetchone()
+            self._migrate_legacy_rows(cnx, cursor, fname, col_content, eval(row_content))
+        query = (
+            "UPDATE CSV_Data d SET "
+            "byte_size = LENGTH(d.col_content) + 1 + "
+            "(SELECT COALESCE(SUM(LENGTH(r.row_content) + 1), 0) FROM CSV_Rows r WHERE r.filename = d.filename), "
+            "row_count = (SELECT COUNT(*) FROM CSV_Rows r WHERE r.filename = d.filename), "
+            "updated_at = updated_at WHERE d.byte_size IS NULL"
+        )
+        cursor.execute(query)
+
     def get_fnames(self) -> list:
-        """Get 'filenames' from database"""
+        """Get 'filenames' from database, or from the local cache when the server is unreachable"""
+        return [row[0] for row in self.get_file_info()]
+
+    def get_file_info(self) -> list:
+        """Get (filename, byte_size, row_count, updated_at) of every file ordered by filename,
+        read from the filename index and metadata columns without reading rows. Only
+        filenames are known for the cached files when the server is unreachable"""
         cnx = self.connect()
 
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
 
-            # create list of filenames to access specific file
-            cursor.execute("SELECT filename FROM CSV_Data")
+            cursor.execute("SELECT filename, byte_size, row_count, updated_at FROM CSV_Data ORDER BY filename")
             results = cursor.fetchall()
-            values = [row[0] for row in results]
 
-            if values:
-                return values
-            
             cursor.close()
             cnx.close()
+            return results
         else:
-            pass
+            # List the cached files that can be opened read-only
+            return [(fname, None, None, None) for fname in self.cache.get_fnames("CSV_Data")]
 
-    def get_val_from_fname(self, fname):
-        """Get content of filename in database
+    def file_exists(self, fname: str) -> bool:
+        """Looks the filename up in the unique filename index"""
+        cnx = self.connect()
+
+        if cnx:
+            cursor = cnx.cursor()
+            cursor.execute("USE data_editor")
+
+            cursor.execute("SELECT 1 FROM CSV_Data WHERE filename = %s LIMIT 1", (fname,))
+            exists = cursor.fetchone() is not None
+
+            cursor.close()
+            cnx.close()
+            return exists
+        else:
+            return False
+
+    def get_columns(self, fname: str) -> list:
+        """Get the column names of a file in database
+
+        Files saved before rows were stored in "CSV_Rows" keep all of their rows
+        in the "row_content" blob, those are moved to "CSV_Rows" by create_db or,
+        when saved by an older editor since, on first open.
+        When the server is unreachable the columns of the cached copy are returned
+        and "read_only" is set.
 
         Args:
             fname (str): File name from option menu
 
         Returns:
-            str: content of the file
+            list: column names of the file
         """
         cnx = self.connect()
+        self.current_fname = fname
         if cnx:
+            self.read_only = False
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
 
             # select content using filename
-            query = "SELECT col_content, row_content FROM CSV_Data WHERE filename = %s"
-            self.current_fname = fname
+            query = "SELECT col_content, row_content, version, updated_at FROM CSV_Data WHERE filename = %s"
 
             cursor.execute(query, (fname,))
+            result = cursor.fetchone()
 
-            result = cursor.fetchall()
-            col_row = []
+            columns = []
             if result:
-                for content in result:
-                    for res in content:
-                        col_row.append(res)
-                return col_row
-            
+                col_content, row_content, self.current_version, self.current_updated_at = result
+                columns = eval(col_content)
+                self.current_columns = columns
+                if row_content:
+                    self._migrate_legacy_rows(cnx, cursor, fname, col_content, eval(row_content))
+
+            cursor.close()
+            cnx.close()
+            return columns
+        else:
+            cached = self.cache.get("CSV_Data", fname)
+            if cached:
+                self.read_only = True
+                self.current_version, self.current_updated_at, col_content = cached
+                self.current_columns = eval(col_content)
+                return self.current_columns
+            return []
+
+    def _is_cached(self, fname: str) -> bool:
+        """Checks if the cache has all rows of the opened version of the file"""
+        return self.cache.is_current("CSV_Data", fname, self.current_version, self.current_updated_at)
+
+    def _migrate_legacy_rows(self, cnx, cursor, fname: str, columns: str, rows: list):
+        """Moves the rows of the "row_content" blob to "CSV_Rows" and empties the blob"""
+        cursor.execute("DELETE FROM CSV_Rows WHERE filename = %s", (fname,))
+        stats = ContentStats.of_csv_columns(columns)
+        self._insert_rows(cursor, fname, rows, stats=stats)
+        self._write_metadata(cursor, fname, stats)
+        cursor.execute("UPDATE CSV_Data SET row_content = '' WHERE filename = %s", (fname,))
+        cnx.commit()
+
+    def _insert_rows(self, cursor, fname: str, rows, task=None, stats=None):
+        """Inserts rows of a file to "CSV_Rows" in batches
+
+        Args:
+            cursor (cursor): cursor of the open connection
+            fname (str): filename in database
+            rows (iterable): rows of the file in order, can be a generator
+            task (DBTask, optional): task to check for cancellation and report the rows written
+            stats (ContentStats, optional): stats the written rows are added to
+        """
+        query = "INSERT INTO CSV_Rows (filename, row_num, row_content) VALUES (%s, %s, %s)"
+        values = []
+        for row_num, row in enumerate(rows):
+            row_content = json.dumps(row, default=str)
+            if stats is not None:
+                stats.add_row(row_content)
+            values.append((fname, row_num, row_content))
+            if len(values) == self.batch_size:
+                if task is not None:
+                    task.check()
+                    task.report(row_num + 1)
+                cursor.executemany(query, values)
+                values = []
+        if values:
+            cursor.executemany(query, values)
+
+    def _write_metadata(self, cursor, fname: str, stats: ContentStats):
+        """Stores the byte size, row count and hash of the rows written for the file"""
+        query = "UPDATE CSV_Data SET byte_size = %s, row_count = %s, content_hash = %s WHERE filename = %s"
+        cursor.execute(query, stats.values() + (fname,))
+
+    def count_rows(self, fname: str) -> int:
+        """Get the number of rows of a file in database"""
+        cnx = self.connect()
+        if cnx:
+            cursor = cnx.cursor()
+            cursor.execute("USE data_editor")
+
+            cursor.execute("SELECT COUNT(*) FROM CSV_Rows WHERE filename = %s", (fname,))
+            count = cursor.fetchone()[0]
+
             cursor.close()
             cnx.close()
+            return count
+        else:
+            return self.cache.count_rows(fname)
+
+    def iter_row_pages(self, fname: str, page_size: int):
+        """Streams the rows of a file page by page
+
+        Rows are read from the local cache when it has the opened version of the
+        file or the server is unreachable. Otherwise they are read through an
+        unbuffered cursor so the server sends them as they are fetched instead of
+        the driver holding the whole result set, and they are written to the cache
+        as they arrive. The connection stays open until the generator is exhausted
+        or closed.
+
+        Args:
+            fname (str): File name from option menu
+            page_size (int): number of rows per page
+
+        Yields:
+            list: rows of the next page
+        """
+        if self.read_only or self._is_cached(fname):
+            for page in self.cache.iter_row_pages(fname, page_size):
+                yield [json.loads(row) for row in page]
+            return
+
+        cnx = self.connect()
+        if cnx:
+            cursor = cnx.cursor(buffered=False)
+            cursor.execute("USE data_editor")
+
+            query = "SELECT row_content FROM CSV_Rows WHERE filename = %s ORDER BY row_num"
+            cursor.execute(query, (fname,))
+            self.cache.clear_rows(fname)
+            row_num = 0
+            try:
+                while True:
+                    try:
+                        page = cursor.fetchmany(page_size)
+                    except mysql.connector.Error:
+                        # The server drops a stream that is not read for longer than its
+                        # net_write_timeout, the remaining pages are read by row number
+                        break
+                    if not page:
+                        self._cache_complete(fname, row_num)
+                        return
+                    self.cache.put_rows(fname, {row_num + offset: row[0] for offset, row in enumerate(page)})
+                    row_num += len(page)
+                    yield [json.loads(row[0]) for row in page]
+            finally:
+                # Closing the connection drops the rows that were not fetched
+                try:
+                    cnx.close()
+                except mysql.connector.Error:
+                    pass
+
+            while True:
+                page = self.get_row_page(fname, row_num, page_size)
+                if not page:
+                    return
+                row_num += len(page)
+                yield page
         else:
             pass
-            
-    def save_to_db(self, filename, columns, rows):
-        """Saves the filename, columns, and rows to database table"""
+
+    def _cache_complete(self, fname: str, row_count: int):
+        """Marks the cached rows as the opened version of the file once all of them are stored"""
+        if self.cache.count_rows(fname) == row_count:
+            self.cache.put("CSV_Data", fname, self.current_version, self.current_updated_at, str(self.current_columns))
+
+    def get_row_page(self, fname: str, start_row: int, count: int) -> list:
+        """Get "count" rows of a file starting from row number "start_row" """
+        if self.read_only or self._is_cached(fname):
+            return [json.loads(row) for row in self.cache.get_rows(fname, start_row, count)]
+
         cnx = self.connect()
+        if cnx:
+            cursor = cnx.cursor()
+            cursor.execute("USE data_editor")
+
+            query = "SELECT row_content FROM CSV_Rows WHERE filename = %s AND row_num >= %s ORDER BY row_num LIMIT %s"
+            cursor.execute(query, (fname, start_row, count))
+            rows = [json.loads(row[0]) for row in cursor.fetchall()]
+
+            cursor.close()
+            cnx.close()
+            return rows
+        else:
+            return []
+            
+    def save_to_db(self, filename, columns, rows, task=None):
+        """Saves the filename, columns, and rows to database table. Nothing is
+        saved if the task is cancelled before all rows are written"""
+        cnx = self.connect(self.slow_timeout)
 
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
             
-            query = "INSERT INTO CSV_Data (filename, col_content, row_content) VALUES (%s, %s, %s)"
-            values = (filename, columns, rows)
-            cursor.execute(query, values)
+            # Saving under the name of an existing file replaces it
+            query = (
+                "INSERT INTO CSV_Data (filename, col_content, row_content) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE col_content = VALUES(col_content), row_content = '', version = version + 1"
+            )
+            values = (filename, columns, "")
+            stats = ContentStats.of_csv_columns(columns)
+            try:
+                cursor.execute(query, values)
+                cursor.execute("DELETE FROM CSV_Rows WHERE filename = %s", (filename,))
+                self._insert_rows(cursor, filename, rows, task, stats)
+                self._write_metadata(cursor, filename, stats)
+            except OperationCancelled:
+                cnx.rollback()
+                cnx.close()
+                raise
             cnx.commit()
+            self.cache.clear_rows(filename)
 
             cursor.close()
             cnx.close()
         else:
             pass
     
-    def update_csv(self, fname, columns, rows):
-        """Updates the "columns" and "rows" values in the table"""
-        cnx = self.connect()
+    def update_csv(self, fname, columns, rows, task=None):
+        """Updates the "columns" and "rows" values in the table. Nothing is
+        changed if the task is cancelled before all rows are written"""
+        cnx = self.connect(self.slow_timeout)
         
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
             
-            query = "UPDATE CSV_Data SET col_content = %s, row_content = %s WHERE filename = %s"
-            values = (columns, rows, fname)
+            query = "UPDATE CSV_Data SET col_content = %s, row_content = '', version = version + 1 WHERE filename = %s"
+            values = (columns, fname)
+            stats = ContentStats.of_csv_columns(columns)
 
-            cursor.execute(query, values)
+            try:
+                cursor.execute(query, values)
+                cursor.execute("DELETE FROM CSV_Rows WHERE filename = %s", (fname,))
+                self._insert_rows(cursor, fname, rows, task, stats)
+                self._write_metadata(cursor, fname, stats)
+            except OperationCancelled:
+                cnx.rollback()
+                cnx.close()
+                raise
 
             cnx.commit()
+            self.cache.clear_rows(fname)
 
             cursor.close()
             cnx.close()
         else:
             pass
 
+    def update_rows(self, fname: str, rows: dict, version: int) -> bool:
+        """Updates rows of the file by row number in a single transaction. The rows are
+        only written if the file is still at the version it had when it was opened
+
+        Args:
+            fname (str): filename in database
+            rows (dict): {row number: row} pairs of the modified rows
+            version (int): version of the file when it was opened
+
+        Returns:
+            bool: False if the file was saved by another instance since it was opened,
+                None if not connected
+        """
+        cnx = self.connect(self.slow_timeout)
+
+        if cnx:
+            cursor = cnx.cursor()
+            cursor.execute("USE data_editor")
+
+            # Lock the file until commit so that two instances cannot both pass the version check
+            cursor.execute("SELECT version FROM CSV_Data WHERE filename = %s FOR UPDATE", (fname,))
+            result = cursor.fetchone()
+            if not result or result[0] != version:
+                cnx.rollback()
+                cursor.close()
+                cnx.close()
+                return False
+
+            query = "UPDATE CSV_Rows SET row_content = %s WHERE filename = %s AND row_num = %s"
+            values = [(json.dumps(row, default=str), fname, row_num) for row_num, row in rows.items()]
+
+            # Adjust the byte size by the difference of the updated rows, the hash of the
+            # whole file is unknown until it is saved in full again
+            old_size = 0
+            row_nums = list(rows)
+            for start in range(0, len(row_nums), self.batch_size):
+                part = row_nums[start:start + self.batch_size]
+                placeholders = ", ".join(["%s"] * len(part))
+                query_size = f"SELECT SUM(LENGTH(row_content)) FROM CSV_Rows WHERE filename = %s AND row_num IN ({placeholders})"
+                cursor.execute(query_size, [fname] + part)
+                result = cursor.fetchone()
+                # SUM is NULL when none of the rows exist
+                old_size += int(result[0] or 0)
+            new_size = sum(len(value[0].encode("utf-8")) for value in values)
+
+            cursor.executemany(query, values)
+            query = (
+                "UPDATE CSV_Data SET version = version + 1, byte_size = byte_size + %s, content_hash = NULL "
+                "WHERE filename = %s"
+            )
+            cursor.execute(query, (new_size - old_size, fname))
+            cursor.execute("SELECT updated_at FROM CSV_Data WHERE filename = %s", (fname,))
+            updated_at = cursor.fetchone()[0]
+
+            cnx.commit()
+
+            # Keep the cached copy current instead of downloading the file again on next open
+            if self.cache.is_current("CSV_Data", fname, version, self.current_updated_at):
+                self.cache.put_rows(fname, {row_num: value[0] for value, row_num in zip(values, rows)})
+                self.cache.put("CSV_Data", fname, version + 1, updated_at, str(self.current_columns))
+            self.current_version = version + 1
+            self.current_updated_at = updated_at
+
+            cursor.close()
+            cnx.close()
+            return True
+        else:
+            # Not the same as a version conflict, the save did not happen
+            return None
+
     def del_from_tbl(self, fname: str): # Delete
         """Delete column using filename"""
         cnx = self.connect()
@@ -141,8 +524,10 @@ class CSVdatabase():
             
             query = "DELETE FROM CSV_Data WHERE filename = %s"
             cursor.execute(query, (fname,))
+            cursor.execute("DELETE FROM CSV_Rows WHERE filename = %s", (fname,))
 
             cnx.commit()
+            self.cache.delete("CSV_Data", fname)
 
             cursor.close()
             cnx.close()
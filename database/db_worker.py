@@ -0,0 +1,114 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class OperationCancelled(Exception):
+    """Raised inside a database call when its task was cancelled"""
+
+class DBTask():
+    """Handle of a database call submitted to the worker"""
+    def __init__(self, worker, on_progress=None):
+        self.worker = worker
+        self.on_progress = on_progress
+        # Set when the task is cancelled, long calls check it between batches
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        """Cancels the task, its callbacks will not be called"""
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        """Stops the running call if the task was cancelled"""
+        if self.cancelled.is_set():
+            raise OperationCancelled()
+
+    def report(self, value):
+        """Sends progress of the running call to the on_progress callback"""
+        if self.on_progress is not None:
+            self.worker.results.put((self, self.on_progress, value, False))
+
+class DBWorker():
+    """Runs database calls on a background thread so the Tk mainloop never waits on
+    the server. Calls run one at a time in the order they are submitted, and their
+    callbacks are called from the mainloop.
+
+    Args:
+        root (Tk): root window whose mainloop receives the results
+        on_error (function): called with the exception when a call fails
+    """
+    def __init__(self, root, on_error=None):
+        self.root = root
+        self.on_error = on_error
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        # (task, callback, value, finished) waiting to be handed to the mainloop
+        self.results = queue.Queue()
+        # Tasks that are queued or running
+        self.tasks = set()
+        # Milliseconds between checks for results
+        self.poll_ms = 50
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, func, *args, on_done=None, on_progress=None, pass_task=False, **kwargs) -> DBTask:
+        """Runs func(*args, **kwargs) on the worker thread
+
+        Args:
+            func (function): database call
+            on_done (function, optional): called with the return value of func
+            on_progress (function, optional): called with every value passed to task.report
+            pass_task (bool, optional): passes the task to func as the "task" keyword so that
+                it can check for cancellation and report progress
+
+        Returns:
+            DBTask: handle to cancel the call
+        """
+        task = DBTask(self, on_progress)
+        if pass_task:
+            kwargs["task"] = task
+
+        def run():
+            try:
+                task.check()
+                result = func(*args, **kwargs)
+            except OperationCancelled:
+                self.results.put((task, None, None, True))
+            except Exception as err:
+                self.results.put((task, self.on_error, err, True))
+            else:
+                self.results.put((task, on_done, result, True))
+
+        self.tasks.add(task)
+        task.future = self.executor.submit(run)
+        return task
+
+    def cancel_all(self) -> int:
+        """Cancels every queued or running task
+
+        Returns:
+            int: number of cancelled tasks
+        """
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        self.tasks.clear()
+        return len(tasks)
+
+    def _poll(self):
+        """Calls the callbacks of finished calls from the mainloop"""
+        while True:
+            try:
+                task, callback, value, finished = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if finished:
+                self.tasks.discard(task)
+            if callback is not None and not task.cancelled.is_set():
+                callback(value)
+        self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        """Cancels the tasks and stops the worker thread"""
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sqlite3
+
+class DocumentCache():
+    """Local SQLite copy of the documents read from the MySQL database
+
+    Documents are keyed by table and filename, and stored with the version and
+    update time they had on the server so that a copy is only downloaded again
+    when it changed. The copies can still be opened read-only when the server
+    cannot be reached. Every server and user has its own SQLite file, so the
+    copies listed when the server is unreachable are the ones read from it.
+
+    Args:
+        path (str, optional): path of the SQLite file. Defaults to a file per server
+            under ~/.data_editor/cache
+        server (function, optional): returns the (host, user) the documents are read with,
+            called on every connection since the credentials change after login
+    """
+    def __init__(self, path=None, server=None):
+        self.path = path
+        self.server = server
+        # Paths of the files whose tables were created
+        self.created = set()
+
+    def cache_path(self) -> str:
+        """Get the path of the SQLite file of the current server"""
+        if self.path is not None:
+            return self.path
+        host, user = self.server() if self.server is not None else ("", "")
+        # The driver connects to the local server when no host is given
+        key = hashlib.sha1(f"{user}@{host or '127.0.0.1'}".encode("utf-8")).hexdigest()
+        return os.path.join(os.path.expanduser("~"), ".data_editor", "cache", f"{key}.sqlite3")
+
+    def connect(self):
+        """Opens a connection to the cache, a new one per call so it can be used from any thread"""
+        path = self.cache_path()
+        if path in self.created:
+            return sqlite3.connect(path, timeout=10, check_same_thread=False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cnx = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        cnx.execute("CREATE TABLE IF NOT EXISTS documents(tbl TEXT, filename TEXT, version INTEGER, updated_at TEXT, content TEXT, PRIMARY KEY (tbl, filename))")
+        cnx.execute("CREATE TABLE IF NOT EXISTS csv_rows(filename TEXT, row_num INTEGER, row_content TEXT, PRIMARY KEY (filename, row_num))")
+        cnx.commit()
+        self.created.add(path)
+        return cnx
+
+    def get(self, tbl: str, fname: str):
+        """Get the cached copy of a document
+
+        Args:
+            tbl (str): table of the document in MySQL
+            fname (str): filename of the document
+
+        Returns:
+            tuple: (version, updated_at, content) or None if the document is not cached
+        """
+        cnx = self.connect()
+        query = "SELECT version, updated_at, content FROM documents WHERE tbl = ? AND filename = ?"
+        result = cnx.execute(query, (tbl, fname)).fetchone()
+        cnx.close()
+        return result
+
+    def is_current(self, tbl: str, fname: str, version: int, updated_at) -> bool:
+        """Checks if the cached copy has the version and update time of the server"""
+        cached = self.get(tbl, fname)
+        return cached is not None and cached[0] == version and cached[1] == str(updated_at)
+
+    def put(self, tbl: str, fname: str, version: int, updated_at, content: str):
+        """Stores the copy of a document with the version and update time of the server"""
+        cnx = self.connect()
+        query = "INSERT OR REPLACE INTO documents (tbl, filename, version, updated_at, content) VALUES (?, ?, ?, ?, ?)"
+        cnx.execute(query, (tbl, fname, version, str(updated_at), content))
+        cnx.commit()
+        cnx.close()
+
+    def delete(self, tbl: str, fname: str):
+        """Removes the copy of a document"""
+        cnx = self.connect()
+        cnx.execute("DELETE FROM documents WHERE tbl = ? AND filename = ?", (tbl, fname))
+        if tbl == "CSV_Data":
+            cnx.execute("DELETE FROM csv_rows WHERE filename = ?", (fname,))
+        cnx.commit()
+        cnx.close()
+
+    def get_fnames(self, tbl: str) -> list:
+        """Get the filenames of the cached documents of a table"""
+        cnx = self.connect()
+        results = cnx.execute("SELECT filename FROM documents WHERE tbl = ? ORDER BY filename", (tbl,)).fetchall()
+        cnx.close()
+        return [row[0] for row in results]
+
+    # CSV ROWS
+
+    def put_rows(self, fname: str, rows: dict):
+        """Stores rows of a csv by row number
+
+        Args:
+            fname (str): filename of the csv
+            rows (dict): {row number: serialized row} pairs
+        """
+        cnx = self.connect()
+        query = "INSERT OR REPLACE INTO csv_rows (filename, row_num, row_content) VALUES (?, ?, ?)"
+        cnx.executemany(query, [(fname, row_num, row) for row_num, row in rows.items()])
+        cnx.commit()
+        cnx.close()
+
+    def clear_rows(self, fname: str):
+        """Removes the rows of a csv and marks its copy as outdated"""
+        cnx = self.connect()
+        cnx.execute("DELETE FROM csv_rows WHERE filename = ?", (fname,))
+        cnx.execute("DELETE FROM documents WHERE tbl = 'CSV_Data' AND filename = ?", (fname,))
+        cnx.commit()
+        cnx.close()
+
+    def count_rows(self, fname: str) -> int:
+        """Get the number of cached rows of a csv"""
+        cnx = self.connect()
+        count = cnx.execute("SELECT COUNT(*) FROM csv_rows WHERE filename = ?", (fname,)).fetchone()[0]
+        cnx.close()
+        return count
+
+    def get_rows(self, fname: str, start_row: int, count: int) -> list:
+        """Get "count" serialized rows of a csv starting from row number "start_row" """
+        cnx = self.connect()
+        query = "SELECT row_content FROM csv_rows WHERE filename = ? AND row_num >= ? ORDER BY row_num LIMIT ?"
+        results = cnx.execute(query, (fname, start_row, count)).fetchall()
+        cnx.close()
+        return [row[0] for row in results]
+
+    def iter_row_pages(self, fname: str, page_size: int):
+        """Yields the serialized rows of a csv page by page"""
+        cnx = self.connect()
+        try:
+            cursor = cnx.execute("SELECT row_content FROM csv_rows WHERE filename = ? ORDER BY row_num", (fname,))
+            while True:
+                page = cursor.fetchmany(page_size)
+                if not page:
+                    break
+                yield [row[0] for row in page]
+        finally:
+            cnx.close()
@@ -0,0 +1,73 @@
+def column_exists(cursor, table: str, column: str) -> bool:
+    """Checks if the column exists in a table of the current database
+
+    Args:
+        cursor (cursor): cursor of the open connection
+        table (str): name of the table
+        column (str): name of the column
+
+    Returns:
+        bool: True if the table has the column
+    """
+    query = (
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s"
+    )
+    cursor.execute(query, (table, column))
+    return cursor.fetchone()[0] > 0
+
+def add_column(cursor, table: str, column: str, definition: str):
+    """Adds the column to a table created by an older version of the editor
+
+    Args:
+        cursor (cursor): cursor of the open connection
+        table (str): name of the table
+        column (str): name of the column
+        definition (str): column type and attributes, e.g. "int NOT NULL DEFAULT 0"
+    """
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def index_exists(cursor, table: str, index: str) -> bool:
+    """Checks if the index exists on a table of the current database"""
+    query = (
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s"
+    )
+    cursor.execute(query, (table, index))
+    return cursor.fetchone()[0] > 0
+
+def add_index(cursor, table: str, index: str, columns: str, unique: bool = False):
+    """Adds the index to a table created by an older version of the editor
+
+    Args:
+        cursor (cursor): cursor of the open connection
+        table (str): name of the table
+        index (str): name of the index
+        columns (str): indexed columns, e.g. "filename"
+        unique (bool, optional): creates a unique index. Defaults to False.
+    """
+    if not index_exists(cursor, table, index):
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        cursor.execute(f"ALTER TABLE {table} ADD {kind} {index} ({columns})")
+
+def add_metadata_columns(cursor, table: str):
+    """Adds the primary key, metadata columns and filename index to a table of documents
+
+    Rows of older tables that share a filename are removed first, keeping the
+    last saved one, so that the unique index on filename can be created.
+
+    Args:
+        cursor (cursor): cursor of the open connection
+        table (str): "Text_Data", "Exports" or "CSV_Data"
+    """
+    add_column(cursor, table, "id", "int NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST")
+    add_column(cursor, table, "byte_size", "bigint")
+    add_column(cursor, table, "row_count", "int")
+    add_column(cursor, table, "content_hash", "char(64)")
+    add_column(cursor, table, "created_at", "timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP")
+    add_column(cursor, table, "updated_at", "timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    if not index_exists(cursor, table, "idx_filename"):
+        cursor.execute(f"DELETE t1 FROM {table} t1 JOIN {table} t2 ON t1.filename = t2.filename AND t1.id < t2.id")
+        add_index(cursor, table, "idx_filename", "filename", unique=True)
+    add_index(cursor, table, "idx_content_hash", "content_hash")
@@ -1,6 +1,34 @@
+
 import mysql.connector
 from mysql.connector import errorcode
 
+from database.chunk_store import ChunkStore
+from database.content_stats import ContentStats
+from database.doc_cache import DocumentCache
+from database.schema import add_column, add_metadata_columns
+
+class DocumentStream():
+    """Reads a document of database part by part as its chunks arrive, like a file opened in text mode
+
+    The parts are not kept, so reading a document never holds the whole of it.
+
+    Args:
+        parts (generator): parts of the document from TXTdatabase._iter_document
+    """
+    def __init__(self, parts):
+        self.parts = parts
+
+    def read(self, size: int = -1) -> str:
+        """Get the text of the next non-empty part, the size is ignored"""
+        for part, _ in self.parts:
+            if part:
+                return part
+        return ''
+
+    def close(self):
+        """Closes the connection of a document that was not read to its end"""
+        self.parts.close()
+
 class TXTdatabase():
     def __init__(self):
         # Flag to check if a file is opened
@@ -9,13 +37,33 @@ class TXTdatabase():
         self.host = ""
         self.user = ""
         self.password = ""
+        # Seconds to wait for the server to connect or answer before it is taken as unreachable
+        self.timeout = 5
+        # Seconds the slow operations wait for an answer: migrations, bulk imports and chunk writes.
+        # The pure Python driver uses connection_timeout as the socket timeout of every read
+        self.slow_timeout = 3600
+        # Local copy of the documents read from database
+        self.cache = DocumentCache(server=lambda: (self.host, self.user))
+        # Flag set when the last read was served from the cache because the server is unreachable
+        self.read_only = False
+        # Content-addressed chunks of the documents on the server
+        self.chunks = ChunkStore()
+        # Bytes of content sent by the last save
+        self.last_sent_bytes = 0
+
+    def connect(self, timeout=None):
+        """Connects to the server
 
-    def connect(self):
+        Args:
+            timeout (int, optional): seconds to wait for the server. Defaults to "timeout",
+                the slow operations pass "slow_timeout"
+        """
         try:
             cnx = mysql.connector.connect(
                 host=self.host,
                 user=self.user,
-                password=self.password
+                password=self.password,
+                connection_timeout=timeout or self.timeout
             )
             return cnx
         except mysql.connector.Error as err:
@@ -26,9 +74,23 @@ class TXTdatabase():
             else:
                 return False
             
+    def open_database(self) -> bool:
+        """Checks the connection then creates the database and tables
+
+        Returns:
+            bool: True if connected to the server
+        """
+        cnx = self.connect()
+        if cnx:
+            cnx.close()
+            self.create_database()
+            return True
+        else:
+            return False
+
     def create_database(self):
         """Creates database and table"""
-        cnx = self.connect()
+        cnx = self.connect(self.slow_timeout)
 
         if cnx:
             cursor = cnx.cursor()
@@ -37,146 +99,322 @@ class TXTdatabase():
             cursor.execute("USE data_editor")
             cursor.execute("CREATE TABLE IF NOT EXISTS Text_Data(filename varchar(255), content text(65535))")
             cursor.execute("CREATE TABLE IF NOT EXISTS Exports(filename varchar(255), content text(65535))")
+            for table in ("Text_Data", "Exports"):
+                # Version and update time of every document, compared with the local cache on read
+                add_column(cursor, table, "version", "int NOT NULL DEFAULT 0")
+                # Id, size, hash and timestamps so files can be listed without reading content
+                add_metadata_columns(cursor, table)
+                self._fill_metadata(cursor, table)
+            # Content-addressed chunks shared by the documents of both tables
+            self.chunks.create_tables(cursor)
+            cnx.commit()
             
             cursor.close()
             cnx.close()
         else:
             pass
 
-    def get_fnames(self) -> list:
-        """Get 'filenames' from database"""
-        cnx = self.connect()
+    def _fill_metadata(self, cursor, table: str):
+        """Computes the metadata of documents saved before the metadata columns were added.
+        SHA2 hashes the UTF-8 bytes of the content like ContentStats"""
+        query = (
+            f"UPDATE {table} SET byte_size = LENGTH(content), content_hash = SHA2(content, 256), "
+            "row_count = LENGTH(content) - LENGTH(REPLACE(content, '\\n', '')) + (content <> '' AND RIGHT(content, 1) <> '\\n'), "
+            "updated_at = updated_at WHERE content_hash IS NULL AND content IS NOT NULL"
+        )
+        cursor.execute(query)
 
-        if cnx:
-            cursor = cnx.cursor()
-            cursor.execute("USE data_editor")
+    def _read_document(self, table: str, fname: str) -> str:
+        """Get content of a document, downloading it only if the cached copy is outdated.
+        The cached copy is returned and "read_only" is set when the server is unreachable
 
-            # create list of filenames to access specific file
-            cursor.execute("SELECT filename FROM Text_Data")
-            results = cursor.fetchall()
-            values = [row[0] for row in results]
+        Args:
+            table (str): "Text_Data" or "Exports"
+            fname (str): File name from option menu
 
-            if values:
-                return values
-            
-            cursor.close()
-            cnx.close()
+        Returns:
+            str: content of the file
+        """
+        parts = [part for part, _ in self._iter_document(table, fname)]
+        if parts:
+            return "".join(parts)
+
+    def _iter_document(self, table: str, fname: str, keep: bool = True):
+        """Get content of a document part by part as its chunks arrive, see _read_document.
+        The downloaded content is stored in the cache once all of it has arrived
+
+        Args:
+            table (str): "Text_Data" or "Exports"
+            fname (str): File name from option menu
+            keep (bool, optional): False to not keep the parts for the cache, the document is
+                then never held whole
+
+        Yields:
+            tuple: (text, fraction of the document read), nothing if the file is not found
+        """
+        cnx = self.connect()
+        if cnx:
+            self.read_only = False
+            try:
+                cursor = cnx.cursor()
+                cursor.execute("USE data_editor")
+
+                # Compare the stamp of the document with the cached copy before downloading
+                query = f"SELECT version, updated_at FROM {table} WHERE filename = %s"
+                cursor.execute(query, (fname,))
+                result = cursor.fetchone()
+
+                if result:
+                    version, updated_at = result
+                    if self.cache.is_current(table, fname, version, updated_at):
+                        yield self.cache.get(table, fname)[2], 1.0
+                    else:
+                        parts = []
+                        chunked = False
+                        for part, fraction in self.chunks.read_stream(cursor, table, fname):
+                            chunked = True
+                            if keep:
+                                parts.append(part)
+                            yield part, fraction
+                        if not chunked:
+                            # Documents saved before chunk storage keep their content in the table
+                            query = f"SELECT t1.content FROM {table} t1 WHERE t1.filename = %s"
+                            cursor.execute(query, (fname,))
+                            parts = [cursor.fetchone()[0]]
+                            yield parts[0], 1.0
+                        if keep or not chunked:
+                            self.cache.put(table, fname, version, updated_at, "".join(parts))
+
+                cursor.close()
+            finally:
+                # Also drops the rows still unread when the reader stops early
+                cnx.close()
         else:
-            pass
+            cached = self.cache.get(table, fname)
+            if cached:
+                self.read_only = True
+                yield cached[2], 1.0
 
-    def get_val_from_fname(self, fname: str) -> str: # Read
-        """Get content of filename in database
+    def _stream_document(self, table: str, fname: str, task=None) -> bool:
+        """Sends the content of a document part by part to task.report as it arrives
 
         Args:
+            table (str): "Text_Data" or "Exports"
             fname (str): File name from option menu
+            task (DBTask, optional): receives (text, fraction of the document read) for every
+                part and is checked for cancellation
 
         Returns:
-            str: content of the file
+            bool: True if the file was found
         """
+        found = False
+        parts = self._iter_document(table, fname)
+        try:
+            for part in parts:
+                found = True
+                if task is not None:
+                    task.check()
+                    task.report(part)
+        finally:
+            parts.close()
+        return found
+
+    def _cache_written(self, cursor, table: str, fname: str, text: str):
+        """Stores the saved content in the cache with its new version and update time"""
+        cursor.execute(f"SELECT version, updated_at FROM {table} WHERE filename = %s", (fname,))
+        result = cursor.fetchone()
+        if result:
+            self.cache.put(table, fname, result[0], result[1], text)
+
+    def _list_files(self, table: str) -> list:
+        """Get (filename, byte_size, row_count, updated_at) of the files of a table ordered by
+        filename, read from the filename index and metadata columns without reading content.
+        Only filenames are known for the cached files when the server is unreachable"""
         cnx = self.connect()
+
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
 
-            # select content using filename
-            query = "SELECT t1.content FROM Text_Data t1 WHERE t1.filename = %s"
-            self.current_fname = fname
-
-            cursor.execute(query, (fname,))
-
-            result = cursor.fetchone()
+            query = f"SELECT filename, byte_size, row_count, updated_at FROM {table} ORDER BY filename"
+            cursor.execute(query)
+            results = cursor.fetchall()
 
-            if result:
-                # iterate over tuple to return string
-                for content in result:
-                    return content
-            
             cursor.close()
             cnx.close()
+            return results
         else:
-            pass
+            # Files that can be opened read-only from the cache
+            return [(fname, None, None, None) for fname in self.cache.get_fnames(table)]
 
-    def save_to_db(self, filename: str, text: str): # Create
-        """Saves the filename and content to database"""
+    def _file_exists(self, table: str, fname: str) -> bool:
+        """Looks the filename up in the unique filename index of a table"""
         cnx = self.connect()
-        
+
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
-            
-            query = "INSERT INTO Text_Data (filename, content) VALUES (%s, %s)"
-            values = (filename, text)
 
-            cursor.execute(query, values)
-
-            cnx.commit()
+            cursor.execute(f"SELECT 1 FROM {table} WHERE filename = %s LIMIT 1", (fname,))
+            exists = cursor.fetchone() is not None
 
             cursor.close()
             cnx.close()
+            return exists
         else:
-            pass
+            return False
+
+    def _write_document(self, table: str, fname: str, text: str) -> bool:
+        """Stores a document as content-addressed chunks with its metadata
+
+        The save is skipped when the stored content hash is the same, and only the
+        chunks the server does not have are sent. "last_sent_bytes" is set to the
+        size of the chunk data that was sent.
+
+        Args:
+            table (str): "Text_Data" or "Exports"
+            fname (str): filename of the document
+            text (str): content of the document
+
+        Returns:
+            bool: False if the stored content was already the same, None if not connected
+        """
+        cnx = self.connect(self.slow_timeout)
 
-    def update_txt(self, filename: str, text: str): # Update
-        """Update the content of the file"""
-        cnx = self.connect()
-        
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
-            
-            query = "UPDATE Text_Data SET content = %s WHERE filename = %s"
-            values = (text, filename)
+            stats = ContentStats.of_text(text)
+            self.last_sent_bytes = 0
 
-            cursor.execute(query, values)
+            # Lock the row so a concurrent save cannot pass the hash check with other content
+            cursor.execute(f"SELECT content_hash FROM {table} WHERE filename = %s FOR UPDATE", (fname,))
+            result = cursor.fetchone()
+            if result and result[0] == stats.content_hash:
+                cnx.rollback()
+                cursor.close()
+                cnx.close()
+                return False
+
+            self.last_sent_bytes = self.chunks.write(cursor, table, fname, text)
+            # The content lives in the chunks, the column only keeps documents saved before them
+            query = (
+                f"INSERT INTO {table} (filename, content, byte_size, row_count, content_hash) VALUES (%s, '', %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE content = '', byte_size = VALUES(byte_size), "
+                "row_count = VALUES(row_count), content_hash = VALUES(content_hash), version = version + 1"
+            )
+            cursor.execute(query, (fname,) + stats.values())
 
             cnx.commit()
+            self._cache_written(cursor, table, fname, text)
 
             cursor.close()
             cnx.close()
+            return True
         else:
-            pass
+            # Not the same as an unchanged content, the save did not happen
+            return None
+
+    def _write_document_stream(self, table: str, fname: str, parts) -> bool:
+        """Stores a document produced in parts, like _write_document but without holding
+        its whole content. The chunks are sent in batches as the parts arrive and the
+        content is not kept in the local cache.
+
+        Args:
+            table (str): "Text_Data" or "Exports"
+            fname (str): filename of the document
+            parts (iterable): consecutive parts of the content of the document
+
+        Returns:
+            bool: False if not connected
+        """
+        cnx = self.connect(self.slow_timeout)
 
-    def del_from_tbl(self, fname: str): # Delete
-        """Delete column using filename"""
-        cnx = self.connect()
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
-            
-            query = "DELETE FROM Text_Data WHERE filename = %s"
-            cursor.execute(query, (fname,))
+            stats = ContentStats()
+
+            # Lock the row so a concurrent save of the same file waits for this one
+            cursor.execute(f"SELECT content_hash FROM {table} WHERE filename = %s FOR UPDATE", (fname,))
+            cursor.fetchall()
+            self.last_sent_bytes = self.chunks.write_stream(cursor, table, fname, parts, stats)
+            query = (
+                f"INSERT INTO {table} (filename, content, byte_size, row_count, content_hash) VALUES (%s, '', %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE content = '', byte_size = VALUES(byte_size), "
+                "row_count = VALUES(row_count), content_hash = VALUES(content_hash), version = version + 1"
+            )
+            cursor.execute(query, (fname,) + stats.values())
 
             cnx.commit()
+            # A cached copy of the previous content would be shown as current
+            self.cache.delete(table, fname)
 
             cursor.close()
             cnx.close()
+            return True
         else:
-            pass
+            return False
 
-    #EXPORTS
+    def find_documents(self, words) -> list:
+        """Get the documents of both tables that can contain any of the words, from the word
+        index of the chunks. Every document is a candidate when "words" is None, and the
+        cached documents are the candidates when the server is unreachable
 
-    def get_fnames_EXP(self) -> list:
-        """Get 'filenames' from database"""
-        cnx = self.connect()
+        Args:
+            words (list): folded words or None
+
+        Returns:
+            list: (table, filename) of the candidates ordered by table and filename
+        """
+        cnx = self.connect(self.slow_timeout)
 
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
+            # Chunks saved before the word index are indexed once
+            self.chunks.index_pending(cursor)
+            cnx.commit()
 
-            # create list of filenames to access specific file
-            cursor.execute("SELECT filename FROM Exports")
-            results = cursor.fetchall()
-            values = [row[0] for row in results]
+            if words is None:
+                found = set()
+                for table in ("Text_Data", "Exports"):
+                    cursor.execute(f"SELECT filename FROM {table}")
+                    found.update((table, row[0]) for row in cursor.fetchall())
+            else:
+                found = self.chunks.find(cursor, words)
+                # Documents saved before chunk storage are not in the word index
+                for table in ("Text_Data", "Exports"):
+                    cursor.execute(f"SELECT filename FROM {table} WHERE content <> ''")
+                    found.update((table, row[0]) for row in cursor.fetchall())
 
-            if values:
-                return values
-            
             cursor.close()
             cnx.close()
+            return sorted(found)
         else:
-            pass
+            return sorted((table, fname) for table in ("Text_Data", "Exports") for fname in self.cache.get_fnames(table))
 
-    def get_val_from_fname_EXP(self, fname: str) -> str: # Read
+    def open_document(self, table: str, fname: str) -> DocumentStream:
+        """Get a file-like reader of a document that reads its chunks as they arrive"""
+        return DocumentStream(self._iter_document(table, fname, keep=False))
+
+    def get_document(self, table: str, fname: str) -> str:
+        """Get content of a document of either table without opening it"""
+        return self._read_document(table, fname)
+
+    def get_fnames(self) -> list:
+        """Get 'filenames' from database"""
+        return [row[0] for row in self._list_files("Text_Data")]
+
+    def get_file_info(self) -> list:
+        """Get (filename, byte_size, row_count, updated_at) of every file in database"""
+        return self._list_files("Text_Data")
+
+    def file_exists(self, fname: str) -> bool:
+        """Checks if the filename is in database"""
+        return self._file_exists("Text_Data", fname)
+
+    def get_val_from_fname(self, fname: str) -> str: # Read
         """Get content of filename in database
 
         Args:
@@ -185,80 +423,118 @@ class TXTdatabase():
         Returns:
             str: content of the file
         """
-        cnx = self.connect()
-        if cnx:
-            cursor = cnx.cursor()
-            cursor.execute("USE data_editor")
+        self.current_fname = fname
+        return self._read_document("Text_Data", fname)
 
-            # select content using filename
-            query = "SELECT t1.content FROM Exports t1 WHERE t1.filename = %s"
-            self.current_fname = fname
+    def stream_val_from_fname(self, fname: str, task=None) -> bool: # Read
+        """Reads content of filename in database part by part, see _stream_document
 
-            cursor.execute(query, (fname,))
+        Args:
+            fname (str): File name from option menu
 
-            result = cursor.fetchone()
+        Returns:
+            bool: True if the file was found
+        """
+        self.current_fname = fname
+        return self._stream_document("Text_Data", fname, task)
 
-            if result:
-                # iterate over tuple to return string
-                for content in result:
-                    return content
-            
-            cursor.close()
-            cnx.close()
-        else:
-            pass
+    def save_to_db(self, filename: str, text: str) -> bool: # Create
+        """Saves the filename and content to database, replacing a file with the same name
 
-    def save_to_db_EXP(self, filename: str, text: str): # Create
-        """Saves the filename and content to database"""
-        cnx = self.connect()
-        
+        Returns:
+            bool: False if the stored content was already the same and nothing was sent,
+                None if not connected
+        """
+        return self._write_document("Text_Data", filename, text)
+
+    def update_txt(self, filename: str, text: str) -> bool: # Update
+        """Update the content of the file
+
+        Returns:
+            bool: False if the stored content was already the same and nothing was sent,
+                None if not connected
+        """
+        return self._write_document("Text_Data", filename, text)
+
+    def del_from_tbl(self, fname: str): # Delete
+        """Delete column using filename"""
+        cnx = self.connect(self.slow_timeout)
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
             
-            query = "INSERT INTO Exports (filename, content) VALUES (%s, %s)"
-            values = (filename, text)
-
-            cursor.execute(query, values)
+            query = "DELETE FROM Text_Data WHERE filename = %s"
+            cursor.execute(query, (fname,))
+            self.chunks.delete(cursor, "Text_Data", fname)
 
             cnx.commit()
+            self.cache.delete("Text_Data", fname)
 
             cursor.close()
             cnx.close()
         else:
             pass
 
-    def update_txt_EXP(self, filename: str, text: str): # Update
-        """Update the content of the file"""
-        cnx = self.connect()
-        
-        if cnx:
-            cursor = cnx.cursor()
-            cursor.execute("USE data_editor")
-            
-            query = "UPDATE Exports SET content = %s WHERE filename = %s"
-            values = (text, filename)
+    #EXPORTS
 
-            cursor.execute(query, values)
+    def get_fnames_EXP(self) -> list:
+        """Get 'filenames' from database"""
+        return [row[0] for row in self._list_files("Exports")]
 
-            cnx.commit()
+    def get_file_info_EXP(self) -> list:
+        """Get (filename, byte_size, row_count, updated_at) of every file in database"""
+        return self._list_files("Exports")
 
-            cursor.close()
-            cnx.close()
-        else:
-            pass
+    def file_exists_EXP(self, fname: str) -> bool:
+        """Checks if the filename is in database"""
+        return self._file_exists("Exports", fname)
+
+    def get_val_from_fname_EXP(self, fname: str) -> str: # Read
+        """Get content of filename in database
+
+        Args:
+            fname (str): File name from option menu
+
+        Returns:
+            str: content of the file
+        """
+        return self._read_document("Exports", fname)
+
+    def save_to_db_EXP(self, filename: str, text: str) -> bool: # Create
+        """Saves the filename and content to database, replacing a file with the same name
+
+        Returns:
+            bool: False if the stored content was already the same and nothing was sent,
+                None if not connected
+        """
+        return self._write_document("Exports", filename, text)
+
+    def save_stream_EXP(self, filename: str, parts) -> bool: # Create
+        """Saves a file produced in parts, such as an export of search results, see _write_document_stream"""
+        return self._write_document_stream("Exports", filename, parts)
+
+    def update_txt_EXP(self, filename: str, text: str) -> bool: # Update
+        """Update the content of the file
+
+        Returns:
+            bool: False if the stored content was already the same and nothing was sent,
+                None if not connected
+        """
+        return self._write_document("Exports", filename, text)
 
     def del_from_tbl_EXP(self, fname: str): # Delete
         """Delete column using filename"""
-        cnx = self.connect()
+        cnx = self.connect(self.slow_timeout)
         if cnx:
             cursor = cnx.cursor()
             cursor.execute("USE data_editor")
             
             query = "DELETE FROM Exports WHERE filename = %s"
             cursor.execute(query, (fname,))
+            self.chunks.delete(cursor, "Exports", fname)
 
             cnx.commit()
+            self.cache.delete("Exports", fname)
 
             cursor.close()
             cnx.close()
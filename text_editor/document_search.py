@@ -0,0 +1,100 @@
+import time
+
+from database.txt_database import TXTdatabase
+from text_editor.txt_models import FUZZY, SUBSTRING, Model
+from text_editor.word_index import WordIndex, fold
+
+
+class DocumentSearchReport():
+    """Counts of a search across the documents of database shown when it finishes"""
+    def __init__(self):
+        self.candidates = 0
+        self.read = 0
+        self.documents_with_matches = 0
+        self.matches = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Sentence matches: {self.matches} in {self.documents_with_matches} document(s)\n"
+            f"Read {self.read} of {self.candidates} candidate document(s) in {self.elapsed:.1f} s\n"
+        )
+
+
+class DocumentSearcher():
+    """Searches every document of "Text_Data" and "Exports" with the editor's sentence search
+
+    The word index of the stored chunks gives the documents that contain a keyword
+    as a whole word, which every sentence match needs, so only those are read and
+    matched exactly. Keywords that are not plain ASCII words cannot be looked up
+    and make every document a candidate.
+
+    Args:
+        database (TXTdatabase): database whose credentials are used
+    """
+    def __init__(self, database):
+        # Own instance so the reads do not change the file opened in the editor
+        self.database = TXTdatabase()
+        self.database.host = database.host
+        self.database.user = database.user
+        self.database.password = database.password
+
+    def run(self, text_entry: str, option_value: str, task=None) -> DocumentSearchReport:
+        """Searches the documents
+
+        Args:
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu wheter ignore case or case sensitive
+            task (DBTask, optional): receives (documents done, number of candidates, result) for every
+                document and is checked for cancellation
+
+        Returns:
+            DocumentSearchReport: counts of the search
+        """
+        report = DocumentSearchReport()
+        start = time.perf_counter()
+        model = Model()
+        lst_entry = model.entry_list(text_entry)
+        if not lst_entry:
+            return report
+
+        candidates = self.candidates(lst_entry, option_value)
+        report.candidates = len(candidates)
+
+        for done, (table, fname) in enumerate(candidates, 1):
+            if task is not None:
+                task.check()
+            content = self.database.get_document(table, fname)
+            if content is None:
+                continue
+            report.read += 1
+            # Searched like the document opened in the editor, which ends it with a newline
+            matches, counts = Model().search(content + '\n', text_entry, option_value)
+            if matches:
+                report.documents_with_matches += 1
+                report.matches += len(matches)
+            if task is not None:
+                task.report((done, len(candidates), {"path": f"{table}: {fname}", "matches": matches, "counts": counts}))
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def candidates(self, lst_entry: list, option_value: str) -> list:
+        """Get the (table, filename) of the documents that can have matches"""
+        words = None
+        # Substrings are not whole words, those searches read every document
+        if option_value not in (SUBSTRING, FUZZY) and all(map(WordIndex().is_word, lst_entry)):
+            words = sorted({fold(keyword) for keyword in lst_entry})
+        return self.database.find_documents(words)
+
+    def sources(self, text_entry: str, option_value: str) -> list:
+        """Get the (name, open function) of the documents that can have matches, for ResultExporter
+
+        A document is only read when its open function is called, and then as its chunks arrive.
+        """
+        def opener(table, fname):
+            return lambda: self.database.open_document(table, fname)
+        return [
+            (f"{table}: {fname}", opener(table, fname))
+            for table, fname in self.candidates(Model().entry_list(text_entry), option_value)
+        ]
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import time
+
+from text_editor.rope import Rope
+
+# Milliseconds between two autosaves of the text editor
+AUTOSAVE_MS = 5000
+# Characters of edit records after which the journal is compacted into a new snapshot
+COMPACT_SIZE = 1 << 20
+
+
+def _replace(temp_name: str, filename: str, write):
+    """Writes a file with write(file) to a temporary file, synced to disk, that then replaces it"""
+    try:
+        with open(temp_name, 'w', encoding='utf-8', errors='surrogatepass', newline='') as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_name, filename)
+    finally:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+
+
+class EditJournal():
+    """Unsaved edits of a document kept on disk, to recover them after a crash
+
+    A journal is a snapshot of the text and a log where the edits made since are
+    appended as (start offset, end offset, chars). Appending only writes the new
+    edits, so it costs the same whatever the size of the text. When the log gets
+    larger than COMPACT_SIZE the current text becomes the new snapshot, written
+    to a temporary file that replaces the old one, and the log starts over. Both
+    carry a generation number: a log older than its snapshot is already in it
+    and is ignored. A journal is removed when its document is saved or closed,
+    so the journals found when the editor starts were left by a crash.
+
+    Args:
+        name (str): file path or database filename of the document
+        source (str, optional): "file", "database" or "new", where the document is saved
+        directory (str, optional): directory of the journals. Defaults to ~/.data_editor/journal
+    """
+    def __init__(self, name: str, source: str = "file", directory=None):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".data_editor", "journal")
+        self.directory = directory
+        self.name = name
+        self.source = source
+        key = hashlib.sha1(f"{source}:{name}".encode('utf-8', 'surrogatepass')).hexdigest()
+        self.snapshot_path = os.path.join(directory, f"{key}.snap")
+        self.log_path = os.path.join(directory, f"{key}.log")
+        # Generation of the snapshot on disk, 0 until the first one is written
+        self.generation = 0
+        self.log_size = 0
+        # Set when the log on disk cannot be appended to, the next write starts a new snapshot
+        self.compact_next = False
+        # Time of the last write, shown when the journal is recovered
+        self.saved_at = None
+
+    def write(self, edits: list, text: Rope):
+        """Adds the edits made since the last write
+
+        The first write, and every write once the log is larger than COMPACT_SIZE,
+        stores the whole text as a snapshot instead.
+
+        Args:
+            edits (list): (start offset, end offset, chars) of the edits in order
+            text (Rope): text of the document with the edits
+        """
+        if not self.generation or self.compact_next or self.log_size > COMPACT_SIZE:
+            self.compact(text)
+            return
+        records = ''.join(json.dumps(edit, ensure_ascii=False, separators=(',', ':')) + '\n' for edit in edits)
+        with open(self.log_path, 'a', encoding='utf-8', errors='surrogatepass', newline='') as file:
+            file.write(records)
+            file.flush()
+            os.fsync(file.fileno())
+        self.log_size += len(records)
+        self.saved_at = time.time()
+
+    def compact(self, text: Rope):
+        """Stores the text as the snapshot of a new generation and starts an empty log"""
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self.generation + 1
+        header = json.dumps({"name": self.name, "source": self.source, "generation": generation, "time": time.time()})
+
+        def write_snapshot(file):
+            file.write(header + '\n')
+            # Written leaf by leaf, the whole text is never joined
+            for chunk in text.chunks():
+                file.write(chunk)
+
+        _replace(f"{self.snapshot_path}.tmp", self.snapshot_path, write_snapshot)
+        # A crash here leaves the log of the previous generation, which is then ignored
+        _replace(f"{self.log_path}.tmp", self.log_path, lambda file: file.write(json.dumps({"generation": generation}) + '\n'))
+        self.generation = generation
+        self.log_size = 0
+        self.compact_next = False
+        self.saved_at = time.time()
+
+    def recover(self) -> Rope:
+        """Get the text of the snapshot with the edits of its log
+
+        A record cut by the crash ends the log, the edits before it are kept.
+        """
+        with open(self.snapshot_path, 'r', encoding='utf-8', errors='surrogatepass', newline='') as file:
+            header = json.loads(file.readline())
+            text = Rope.from_text(file.read())
+        self.generation = header["generation"]
+        self.saved_at = header["time"]
+        self.log_size = 0
+        self.compact_next = True
+        try:
+            with open(self.log_path, 'r', encoding='utf-8', errors='surrogatepass', newline='') as file:
+                if json.loads(file.readline()).get("generation") != self.generation:
+                    return text
+                for line in file:
+                    if not line.endswith('\n'):
+                        return text
+                    start, end, chars = json.loads(line)
+                    text = text.replace(start, end, chars)
+                    self.log_size += len(line)
+        except (OSError, ValueError):
+            return text
+        self.compact_next = False
+        return text
+
+    def remove(self):
+        """Removes the journal, its document was saved or closed"""
+        for path in (self.snapshot_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.generation = 0
+        self.log_size = 0
+
+    @classmethod
+    def found(cls, directory=None) -> list:
+        """Get the journals left in the directory, the most recent first"""
+        journal = cls("", directory=directory)
+        if not os.path.isdir(journal.directory):
+            return []
+        journals = []
+        for name in os.listdir(journal.directory):
+            if not name.endswith(".snap"):
+                continue
+            try:
+                with open(os.path.join(journal.directory, name), 'r', encoding='utf-8') as file:
+                    header = json.loads(file.readline())
+            except (OSError, ValueError):
+                continue
+            found = cls(header["name"], header["source"], journal.directory)
+            found.saved_at = header["time"]
+            journals.append(found)
+        journals.sort(key=lambda found: found.saved_at, reverse=True)
+        return journals
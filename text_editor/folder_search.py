@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from text_editor.text_decoder import CODE_UNITS, sniff_encoding
+from text_editor.txt_models import Model
+
+# Extensions of the files searched in a folder
+SEARCH_EXTENSIONS = (".txt",)
+# Bytes read at the start of a file to tell if it is binary
+BINARY_CHECK_SIZE = 8192
+# Sentence matches and files kept in the results of the last searches, the least
+# recently used results are dropped past either
+CACHE_MATCHES = 200000
+CACHE_FILES = 50000
+
+
+class _Matches():
+    """Collects the matches Model.search_file reports, in place of a DBTask"""
+    def __init__(self):
+        self.matches = []
+
+    def check(self):
+        pass
+
+    def report(self, progress):
+        self.matches.extend(progress[1])
+
+
+def is_binary(path: str) -> bool:
+    """Checks if the start of the file has a NUL byte, which text files do not have
+    unless sniff_encoding finds them in UTF-16 or UTF-32"""
+    with open(path, 'rb') as file:
+        head = file.read(BINARY_CHECK_SIZE)
+    if b'\0' not in head:
+        return False
+    encoding, bom = sniff_encoding(head)
+    return not bom and encoding not in CODE_UNITS
+
+
+def search_file(path: str, text_entry: str, option_value: str) -> dict:
+    """Searches one file of the folder, run in a worker process
+
+    Args:
+        path (str): path of the file
+        text_entry (str): string in the search entry
+        option_value (str): value in the option menu wheter ignore case or case sensitive
+
+    Returns:
+        dict: path, binary flag, sentence matches and (keyword, count) list of the file
+    """
+    if is_binary(path):
+        return {"path": path, "binary": True, "matches": [], "counts": []}
+    collector = _Matches()
+    # Same semantics as searching the file opened in the editor
+    _, counts = Model().search_file(path, text_entry, option_value, task=collector)
+    return {"path": path, "binary": False, "matches": collector.matches, "counts": counts}
+
+
+class FolderSearchReport():
+    """Counts of a folder search shown when it finishes"""
+    def __init__(self):
+        self.searched = 0
+        self.unchanged = 0
+        self.binary = 0
+        self.files_with_matches = 0
+        self.matches = 0
+        self.elapsed = 0.0
+        # (path, error message) of the files that could not be searched
+        self.failures = []
+
+    def summary(self) -> str:
+        """Text of the report with throughput and failures"""
+        files = self.searched + self.unchanged
+        files_per_second = files / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"Sentence matches: {self.matches} in {self.files_with_matches} file(s)",
+            f"Searched {self.searched} file(s), {self.unchanged} unchanged since the last search, "
+            f"skipped {self.binary} binary, {len(self.failures)} failed.",
+            f"{self.elapsed:.1f} s, {files_per_second:.1f} files/s",
+        ]
+        lines.extend(f"{path}: {error}" for path, error in self.failures)
+        return "\n".join(lines) + "\n"
+
+
+class FolderSearcher():
+    """Searches every text file of a folder with the editor's sentence search
+
+    Files are searched in worker processes and every result is reported as soon
+    as its file is done. Results are kept by path, size and modification time, so
+    a file that did not change since the last search with the same keywords is
+    not read again. At most CACHE_MATCHES matches and CACHE_FILES files are kept,
+    a file with more matches is searched again every time.
+
+    Args:
+        workers (int, optional): number of searching processes. Defaults to the number of CPUs.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers
+        # {(path, size, mtime, entry, option): result} of the last searches, the least recently used first
+        self.results = OrderedDict()
+        self.cached_matches = 0
+
+    def find_files(self, directory: str) -> list:
+        """Get the paths of the files to search under the directory"""
+        paths = []
+        for root, dirs, files in os.walk(directory):
+            for name in sorted(files):
+                if name.lower().endswith(SEARCH_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return paths
+
+    def run(self, directory: str, text_entry: str, option_value: str, task=None) -> FolderSearchReport:
+        """Searches the files of the directory
+
+        Args:
+            directory (str): directory to walk
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu wheter ignore case or case sensitive
+            task (DBTask, optional): receives (files done, number of files, result) for every file
+                and is checked for cancellation
+
+        Returns:
+            FolderSearchReport: counts, throughput and failures of the search
+        """
+        report = FolderSearchReport()
+        start = time.perf_counter()
+        done = 0
+        paths = self.find_files(directory)
+
+        keys = {}
+        pending = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as err:
+                report.failures.append((path, str(err)))
+                continue
+            key = (path, stat.st_size, stat.st_mtime_ns, text_entry, option_value)
+            if key in self.results:
+                self.results.move_to_end(key)
+                report.unchanged += 1
+                done += 1
+                self._add_result(report, self.results[key], task, done, len(paths))
+            else:
+                keys[path] = key
+                pending.append(path)
+
+        if pending:
+            # Spawned instead of forked since the editor runs the search from a thread of the Tk process
+            context = multiprocessing.get_context("spawn")
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            futures = {executor.submit(search_file, path, text_entry, option_value): path for path in pending}
+            try:
+                for future in as_completed(futures):
+                    if task is not None:
+                        task.check()
+                    path = futures[future]
+                    done += 1
+                    try:
+                        result = future.result()
+                    except Exception as err:
+                        report.failures.append((path, str(err)))
+                        continue
+                    self._keep_result(keys[path], result)
+                    report.searched += 1
+                    self._add_result(report, result, task, done, len(paths))
+            except BaseException:
+                # Drops the files that are not searched yet without waiting for the ones being searched
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            executor.shutdown()
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def _keep_result(self, key: tuple, result: dict):
+        """Keeps the result of a searched file, dropping the least recently used past the limits"""
+        size = len(result["matches"])
+        if size > CACHE_MATCHES:
+            return
+        self.results[key] = result
+        self.cached_matches += size
+        while self.cached_matches > CACHE_MATCHES or len(self.results) > CACHE_FILES:
+            _, dropped = self.results.popitem(last=False)
+            self.cached_matches -= len(dropped["matches"])
+
+    def _add_result(self, report: FolderSearchReport, result: dict, task, done: int, total: int):
+        if result["binary"]:
+            report.binary += 1
+        elif result["matches"]:
+            report.files_with_matches += 1
+            report.matches += len(result["matches"])
+        if task is not None:
+            task.report((done, total, result))
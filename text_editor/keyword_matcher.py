@@ -0,0 +1,131 @@
+import re
+
+from text_editor.sentence_matcher import SentenceMatcher
+
+
+def trie_pattern(keys) -> str:
+    """Builds a regex that matches any of the keys literally, arranged as a trie
+
+    Keys that share a start share its branch, so matching at a position costs the
+    length of the longest key instead of the number of keys. The longest key that
+    matches is tried first.
+
+    Args:
+        keys (iterable): non-empty strings
+
+    Returns:
+        str: pattern of the trie, e.g. ca(?:r|t(?:s)?) for "car", "cat" and "cats"
+    """
+    # Nested dicts of characters, the "" key marks the end of a key
+    root = {}
+    for key in keys:
+        node = root
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return _node_pattern(root)
+
+
+def _node_pattern(node: dict) -> str:
+    branches = [re.escape(char) + _node_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    if len(branches) == 1:
+        pattern = branches[0]
+        if '' in node:
+            return '(?:' + pattern + ')?'
+        return pattern
+    pattern = '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        pattern += '?'
+    return pattern
+
+
+class KeywordMatcher():
+    """Finds the sentences with any of the keywords and counts every keyword in one pass
+
+    Keywords are matched literally. Counts are the non-overlapping occurrences of
+    each keyword in the matched sentences, including occurrences inside longer
+    words as the search has always counted them.
+
+    Args:
+        keywords (list): keywords of the search entry
+        ignore_case (bool): matches the keywords ignoring case
+    """
+    def __init__(self, keywords: list, ignore_case: bool):
+        self.ignore_case = ignore_case
+        # Keywords that only differ in case are one key when ignoring case
+        self.keys = {self.key(keyword) for keyword in keywords}
+        self.key_lengths = sorted({len(key) for key in self.keys})
+        self.trie = trie_pattern(self.keys)
+
+        flags = re.IGNORECASE if ignore_case else 0
+        self.sentence_matcher = SentenceMatcher(self.trie, ignore_case)
+        # Longest key starting at every position, the other keys there are its prefixes
+        self.scanner = re.compile('(?=(' + self.trie + '))', flags)
+
+    def key(self, keyword: str) -> str:
+        return keyword.lower() if self.ignore_case else keyword
+
+    def count(self, text: str, counts: dict, ends: dict, spans: list = None):
+        """Adds the occurrences of every key in the text to "counts"
+
+        Args:
+            text (str): matched sentence
+            counts (dict): {key: count} updated in place
+            ends (dict): {key: end of its last counted occurrence}, so occurrences of a key do not overlap
+            spans (list, optional): receives the (start, end) offsets of every counted occurrence
+        """
+        for match in self.scanner.finditer(text):
+            start = match.start()
+            longest = match.group(1)
+            for length in self.key_lengths:
+                if length > len(longest):
+                    break
+                key = self.key(longest[:length])
+                if key in self.keys and start >= ends.get(key, 0):
+                    counts[key] = counts.get(key, 0) + 1
+                    ends[key] = start + length
+                    if spans is not None:
+                        spans.append((start, start + length))
+
+    def search(self, sentences, spans: list = None) -> tuple:
+        """Matches the sentences and counts the keywords of the matched ones
+
+        Args:
+            sentences (iterable): sentences with spaces and newlines normalized
+            spans (list, optional): receives (sentence number, start, end, keyword spans) for every
+                match, the offsets are in the sentence
+
+        Returns:
+            tuple: (matches, {key: count})
+        """
+        matches = []
+        counts = {}
+        for number, sentence in enumerate(sentences):
+            span = self.sentence_matcher.span(sentence)
+            if span is not None:
+                start, end = span
+                match = sentence[start:end]
+                matches.append(match)
+                # Offsets restart with every sentence
+                keyword_spans = None if spans is None else []
+                self.count(match, counts, {}, keyword_spans)
+                if spans is not None:
+                    spans.append((number, start, end, [(a + start, b + start) for a, b in keyword_spans]))
+        return matches, counts
+
+    def count_all(self, matches: list, spans: list = None) -> dict:
+        """Counts the keywords of matches found without the sentence matcher
+
+        Args:
+            matches (list): matched text
+            spans (list, optional): receives the keyword spans of every match, the offsets are in the match
+        """
+        counts = {}
+        for match in matches:
+            keyword_spans = None if spans is None else []
+            self.count(match, counts, {}, keyword_spans)
+            if spans is not None:
+                spans.append(keyword_spans)
+        return counts
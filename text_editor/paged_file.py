@@ -0,0 +1,200 @@
+import os
+import threading
+
+from text_editor.text_decoder import CODE_UNITS, decode_counted, detect_file
+
+# Bytes searched for a line end after the nominal start of a page, past them the page is cut between two characters
+LINE_SEARCH = 1 << 16
+
+class PagedFile():
+    """Text file kept on disk and read one page at a time
+
+    Pages are cut at the first line end ("\n", "\r\n" or "\r") after every multiple
+    of page_size bytes, or between two characters when there is none in the next
+    LINE_SEARCH bytes, so the start of any page is found with a single short read
+    and opening a file costs the same whatever its size. Edited pages are kept in memory and
+    merged with the others when the file is saved. The encoding is guessed
+    from the start of the file like TextReader does, and the file is saved in it.
+    Pages that were not edited are copied as they are, so bytes that are not
+    valid in that encoding are only lost in the edited pages.
+
+    Args:
+        filename (str): file path string of the text that will be paged
+        page_size (int, optional): bytes per page before it is cut at a newline
+    """
+    def __init__(self, filename: str, page_size: int = 1 << 18):
+        self.page_size = page_size
+        # Pages are read from the editor and from searches running in the background
+        self.lock = threading.Lock()
+        self._open(filename)
+
+    def _open(self, filename: str):
+        self.filename = filename
+        # Same decoding as TextReader, undecodable bytes are shown as replacement characters
+        self.format = detect_file(filename)
+        self.encoding = self.format.encoding
+        # Characters of UTF-16 and UTF-32 take several bytes, a newline is only
+        # found at a multiple of their size after the byte order mark
+        self.unit = CODE_UNITS.get(self.encoding, 1)
+        self.lf = '\n'.encode(self.encoding)
+        self.cr = '\r'.encode(self.encoding)
+        self.file = open(filename, 'rb')
+        self.size = os.path.getsize(filename)
+        # Number of pages, the last one is shorter
+        self.count = max(-(-self.size // self.page_size), 1)
+        # {page: byte offset} of the pages whose start was found
+        self.starts = {0: len(self.format.bom)}
+        # {page: text} of the pages changed in the editor
+        self.edits = {}
+        # {page: undecodable bytes} of the pages read with replacement characters
+        self.replaced = {}
+
+    def start(self, page: int) -> int:
+        """Get the byte offset where the page starts"""
+        if page >= self.count:
+            return self.size
+        if page not in self.starts:
+            bom = self.starts[0]
+            offset = bom + (page * self.page_size - bom) // self.unit * self.unit
+            with self.lock:
+                self.file.seek(offset)
+                # One unit more to see the "\n" of a "\r\n" at the end of the search
+                data = self.file.read(LINE_SEARCH + self.unit)
+            self.starts[page] = offset + self._cut(data)
+        return self.starts[page]
+
+    def _find(self, data: bytes, char: bytes) -> int:
+        """Get the position of the first whole character in the searched bytes, -1 if there is none"""
+        position = data.find(char, 0, LINE_SEARCH)
+        while position >= 0 and position % self.unit:
+            position = data.find(char, position + 1, LINE_SEARCH)
+        return position
+
+    def _cut(self, data: bytes) -> int:
+        """Get the position in the bytes after the nominal start of a page where the page starts"""
+        ends = [position for position in (self._find(data, self.lf), self._find(data, self.cr)) if position >= 0]
+        if ends:
+            end = min(ends)
+            position = end + self.unit
+            # A "\r\n" stays in one page, both would be a line end once decoded
+            if data[end:position] == self.cr and data[position:position + self.unit] == self.lf:
+                position += self.unit
+            return position
+        # A line longer than the search, the page starts at the next character
+        position = 0
+        if self.encoding == 'utf-8':
+            while position < min(len(data), 3) and 0x80 <= data[position] < 0xC0:
+                position += 1
+        elif self.encoding in ('utf-16-le', 'utf-16-be') and len(data) >= 2:
+            high = data[1] if self.encoding == 'utf-16-le' else data[0]
+            # Low surrogate, the second half of a character
+            if 0xDC <= high <= 0xDF:
+                position = 2
+        return position
+
+    def original(self, page: int) -> str:
+        """Get the text of the page as it is on disk"""
+        start = self.start(page)
+        end = self.start(page + 1)
+        with self.lock:
+            self.file.seek(start)
+            data = self.file.read(end - start)
+        text, replaced = decode_counted(data.decode, self.encoding, 'count_replace')
+        if replaced and page not in self.replaced:
+            self.replaced[page] = replaced
+            self.format.replaced += replaced
+        # Newlines are translated the same way as in text mode
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    def page(self, page: int) -> str:
+        """Get the text of the page with its edits"""
+        if page in self.edits:
+            return self.edits[page]
+        return self.original(page)
+
+    def set_page(self, page: int, text: str):
+        """Stores the text of the page from the editor, pages that did not change are not kept"""
+        if text != self.original(page):
+            self.edits[page] = text
+        else:
+            self.edits.pop(page, None)
+
+    def pages(self):
+        """Get the text of every page in order"""
+        for page in range(self.count):
+            yield self.page(page)
+
+    def text(self) -> str:
+        """The whole text with its edits"""
+        return ''.join(self.pages())
+
+    def stream(self):
+        """Get a file-like reader of the text as it is now, for searching it in the background"""
+        return PageStream(self, dict(self.edits))
+
+    def save(self, filename: str):
+        """Writes every page with its edits and pages the saved file
+
+        The pages are written to a temporary file next to the target that then
+        replaces it, so the file being paged is never overwritten while it is read
+        and a crash while saving never leaves a partial file.
+
+        Args:
+            filename (str): file path string where the text is saved
+        """
+        temp_name = filename + '.tmp'
+        try:
+            with self.format.open(temp_name) as file:
+                for page in range(self.count):
+                    if page in self.edits:
+                        file.write(self.edits[page])
+                    else:
+                        file.flush()
+                        self._copy(page, file.buffer)
+                file.flush()
+                os.fsync(file.fileno())
+            with self.lock:
+                self.file.close()
+                os.replace(temp_name, filename)
+                self._open(filename)
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+    def _copy(self, page: int, target):
+        """Writes the bytes of the page as they are on disk"""
+        start = self.start(page)
+        end = self.start(page + 1)
+        with self.lock:
+            self.file.seek(start)
+            while start < end:
+                data = self.file.read(min(end - start, 1 << 20))
+                if not data:
+                    break
+                target.write(data)
+                start += len(data)
+
+    def close(self):
+        self.file.close()
+
+
+class PageStream():
+    """Reads the pages of a PagedFile in order like a file opened in text mode"""
+    def __init__(self, paged: PagedFile, edits: dict):
+        self.paged = paged
+        self.edits = edits
+        self.next_page = 0
+
+    def read(self, size: int = -1) -> str:
+        """Get the text of the next non-empty page, the size is ignored"""
+        while self.next_page < self.paged.count:
+            page = self.next_page
+            self.next_page += 1
+            text = self.edits[page] if page in self.edits else self.paged.original(page)
+            if text:
+                return text
+        return ''
+
+    def progress(self) -> float:
+        """Fraction of the pages read"""
+        return self.next_page / self.paged.count
@@ -0,0 +1,163 @@
+import csv
+import gzip
+import io
+import json
+import os
+import time
+
+from text_editor.txt_models import Model
+
+# Columns of an exported match, in the order of the CSV header
+EXPORT_FIELDS = ["file", "offset", "sentence", "hits"]
+
+
+def export_format(filename: str) -> str:
+    """Get "csv" or "jsonl" from the extension of the file, before a ".gz" """
+    name = filename.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+class RecordFormatter():
+    """Formats matches as JSON Lines or CSV rows, a block of matches at a time
+
+    Args:
+        export_format (str): "jsonl" or "csv"
+    """
+    def __init__(self, export_format: str):
+        self.export_format = export_format
+
+    def header(self) -> str:
+        if self.export_format == "csv":
+            return self.format_rows([EXPORT_FIELDS])
+        return ""
+
+    def format(self, name: str, records: list) -> str:
+        """Get the text of the matches of a source
+
+        Args:
+            name (str): file or document the matches are from
+            records (list): (offset, sentence, [(keyword, offset in the sentence)]) from Model.search_records
+        """
+        if self.export_format == "csv":
+            # The hits of a match are one cell, as JSON
+            return self.format_rows(
+                [name, offset, sentence, json.dumps([[keyword, hit] for keyword, hit in hits], ensure_ascii=False)]
+                for offset, sentence, hits in records
+            )
+        return "".join(
+            json.dumps({
+                "file": name,
+                "offset": offset,
+                "sentence": sentence,
+                "hits": [{"keyword": keyword, "offset": hit} for keyword, hit in hits],
+            }, ensure_ascii=False) + "\n"
+            for offset, sentence, hits in records
+        )
+
+    def format_rows(self, rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue()
+
+
+class ExportReport():
+    """Counts of an export shown when it finishes"""
+    def __init__(self):
+        self.sources = 0
+        self.matches = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        matches_per_second = self.matches / self.elapsed if self.elapsed else 0.0
+        return (
+            f"Exported {self.matches} matches from {self.sources} source(s) "
+            f"in {self.elapsed:.1f} s, {matches_per_second:.0f} matches/s"
+        )
+
+
+class ResultExporter():
+    """Searches text sources again and streams every match to a file or the database
+
+    Matches go from the search engine to the output a block of sentences at a
+    time, so an export holds neither all the matches nor the text of a whole
+    source, whatever their number.
+
+    Args:
+        export_format (str): "jsonl" or "csv"
+    """
+    def __init__(self, export_format: str):
+        self.formatter = RecordFormatter(export_format)
+
+    def parts(self, sources, text_entry: str, option_value: str, report: ExportReport, task=None):
+        """Get the export block by block
+
+        Args:
+            sources (function): returns (name, open function) of the texts to search, every open
+                function returns a file-like object, see DocumentSearcher.sources
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu
+            report (ExportReport): counts of the export, updated in place
+            task (DBTask, optional): receives (sources done, number of sources, matches exported)
+                and is checked for cancellation
+
+        Yields:
+            str: formatted matches
+        """
+        start = time.perf_counter()
+        yield self.formatter.header()
+        source_list = sources()
+        for done, (name, opener) in enumerate(source_list, 1):
+            file = opener()
+            try:
+                for records in Model().search_records(file, text_entry, option_value):
+                    if task is not None:
+                        task.check()
+                    if records:
+                        report.matches += len(records)
+                        yield self.formatter.format(name, records)
+            finally:
+                close = getattr(file, "close", None)
+                if close is not None:
+                    close()
+            report.sources += 1
+            if task is not None:
+                task.report((done, len(source_list), report.matches))
+        report.elapsed = time.perf_counter() - start
+
+    def to_file(self, filename: str, sources, text_entry: str, option_value: str, task=None) -> ExportReport:
+        """Writes the export to a file, gzip-compressed when its name ends with ".gz"
+
+        The export is written next to the file first and replaces it when complete,
+        so a cancelled export leaves no partial file.
+
+        Returns:
+            ExportReport: counts of the export
+        """
+        report = ExportReport()
+        temp_name = filename + ".tmp"
+        opener = gzip.open if filename.lower().endswith(".gz") else open
+        try:
+            with opener(temp_name, "wt", encoding="utf-8", newline="") as file:
+                for part in self.parts(sources, text_entry, option_value, report, task):
+                    file.write(part)
+            os.replace(temp_name, filename)
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+        return report
+
+    def to_database(self, database, fname: str, sources, text_entry: str, option_value: str, task=None) -> ExportReport:
+        """Writes the export to the "Exports" table, sent in batches of chunks as it is produced
+
+        Args:
+            database (TXTdatabase): database to write to
+
+        Returns:
+            ExportReport: counts of the export, None if not connected
+        """
+        report = ExportReport()
+        if not database.save_stream_EXP(fname, self.parts(sources, text_entry, option_value, report, task)):
+            return None
+        return report
@@ -0,0 +1,220 @@
+# Leaves are built with LEAF_SIZE characters and edited in place up to MAX_LEAF
+LEAF_SIZE = 2048
+MAX_LEAF = 4096
+
+class Rope():
+    """Immutable balanced tree of text leaves
+
+    Inserts and deletes copy only the path to the leaves they change, so they cost
+    O(log n) and every version of the text stays valid. A version can be kept as a
+    snapshot, for a search running in the background, without copying the text.
+    Nodes keep the number of characters and newlines under them, which turns the
+    (line, column) indexes of the text widget into offsets in O(log n).
+    """
+    __slots__ = ('leaf', 'left', 'right', 'length', 'newlines', 'height')
+
+    def __init__(self, text: str = ''):
+        self.leaf = text
+        self.left = None
+        self.right = None
+        self.length = len(text)
+        self.newlines = text.count('\n')
+        self.height = 0
+
+    @classmethod
+    def from_text(cls, text: str) -> 'Rope':
+        """Builds a balanced rope of the text"""
+        return cls.from_chunks([text])
+
+    @classmethod
+    def from_chunks(cls, chunks) -> 'Rope':
+        """Builds a balanced rope of text given in parts, as they are read, without joining them"""
+        leaves = [cls(chunk[start:start + LEAF_SIZE]) for chunk in chunks for start in range(0, len(chunk), LEAF_SIZE)]
+        if not leaves:
+            return cls()
+        return _build(leaves, 0, len(leaves))
+
+    def offset(self, line: int, column: int) -> int:
+        """Get the offset of a (line, column) position, lines start at 1"""
+        return self.line_start(line) + column
+
+    def line_start(self, line: int) -> int:
+        """Get the offset where a line starts, the end of the text after the last line"""
+        count = line - 1
+        if count <= 0:
+            return 0
+        if count > self.newlines:
+            return self.length
+        node = self
+        base = 0
+        while node.leaf is None:
+            if count <= node.left.newlines:
+                node = node.left
+            else:
+                count -= node.left.newlines
+                base += node.left.length
+                node = node.right
+        position = -1
+        for _ in range(count):
+            position = node.leaf.index('\n', position + 1)
+        return base + position + 1
+
+    def position(self, offset: int) -> tuple:
+        """Get the (line, column) position of an offset, the inverse of offset"""
+        offset = min(max(offset, 0), self.length)
+        node = self
+        remaining = offset
+        line = 1
+        while node.leaf is None:
+            if remaining < node.left.length:
+                node = node.left
+            else:
+                remaining -= node.left.length
+                line += node.left.newlines
+                node = node.right
+        line += node.leaf.count('\n', 0, remaining)
+        return line, offset - self.line_start(line)
+
+    def replace(self, start: int, end: int, chars: str) -> 'Rope':
+        """Get a rope with the characters between two offsets replaced
+
+        Args:
+            start (int): offset of the first replaced character
+            end (int): offset after the last replaced character, the same as start to insert
+            chars (str): inserted text, empty to delete
+
+        Returns:
+            Rope: new version of the text, this one is unchanged
+        """
+        edited = _edit_leaf(self, start, end, chars)
+        if edited is not None:
+            return edited
+        left, rest = _split(self, start)
+        _, right = _split(rest, end - start)
+        return _join(_join(left, Rope.from_text(chars)), right)
+
+    def chunks(self):
+        """Get the text of the leaves in order, to stream the text without joining it"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.leaf is not None:
+                if node.leaf:
+                    yield node.leaf
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+
+    def text(self) -> str:
+        return ''.join(self.chunks())
+
+    def reader(self):
+        """Get a file-like reader of this version of the text"""
+        return RopeReader(self)
+
+
+class RopeReader():
+    """Reads the leaves of a rope in order like a file opened in text mode"""
+    def __init__(self, rope: Rope):
+        self.length = rope.length
+        self.chunks = rope.chunks()
+        self.position = 0
+
+    def read(self, size: int = -1) -> str:
+        """Get at least "size" characters, fewer only at the end of the text"""
+        parts = []
+        read = 0
+        for chunk in self.chunks:
+            parts.append(chunk)
+            read += len(chunk)
+            if 0 <= size <= read:
+                break
+        self.position += read
+        return ''.join(parts)
+
+    def progress(self) -> float:
+        """Fraction of the text read"""
+        return self.position / self.length if self.length else 1.0
+
+
+def _node(left: Rope, right: Rope) -> Rope:
+    node = Rope.__new__(Rope)
+    node.leaf = None
+    node.left = left
+    node.right = right
+    node.length = left.length + right.length
+    node.newlines = left.newlines + right.newlines
+    node.height = max(left.height, right.height) + 1
+    return node
+
+
+def _build(leaves: list, start: int, end: int) -> Rope:
+    if end - start == 1:
+        return leaves[start]
+    middle = (start + end) // 2
+    return _node(_build(leaves, start, middle), _build(leaves, middle, end))
+
+
+def _balance(left: Rope, right: Rope) -> Rope:
+    """Joins two trees whose heights differ by at most 2, rotating like an AVL tree"""
+    if left.height > right.height + 1:
+        if left.left.height >= left.right.height:
+            return _node(left.left, _node(left.right, right))
+        inner = left.right
+        return _node(_node(left.left, inner.left), _node(inner.right, right))
+    if right.height > left.height + 1:
+        if right.right.height >= right.left.height:
+            return _node(_node(left, right.left), right.right)
+        inner = right.left
+        return _node(_node(left, inner.left), _node(inner.right, right.right))
+    return _node(left, right)
+
+
+def _join(left: Rope, right: Rope) -> Rope:
+    """Concatenates two ropes, O(difference of their heights)"""
+    if left.length == 0:
+        return right
+    if right.length == 0:
+        return left
+    if left.leaf is not None and right.leaf is not None and left.length + right.length <= MAX_LEAF:
+        return Rope(left.leaf + right.leaf)
+    if left.height > right.height + 1:
+        return _balance(left.left, _join(left.right, right))
+    if right.height > left.height + 1:
+        return _balance(_join(left, right.left), right.right)
+    return _node(left, right)
+
+
+def _split(rope: Rope, offset: int) -> tuple:
+    """Splits a rope at an offset into two ropes"""
+    if offset <= 0:
+        return Rope(), rope
+    if offset >= rope.length:
+        return rope, Rope()
+    if rope.leaf is not None:
+        return Rope(rope.leaf[:offset]), Rope(rope.leaf[offset:])
+    if offset <= rope.left.length:
+        left, middle = _split(rope.left, offset)
+        return left, _join(middle, rope.right)
+    middle, right = _split(rope.right, offset - rope.left.length)
+    return _join(rope.left, middle), right
+
+
+def _edit_leaf(rope: Rope, start: int, end: int, chars: str):
+    """Replaces the characters when they are all in one leaf that stays small enough
+
+    Returns:
+        Rope: new version with the path to the leaf copied, None if the edit spans leaves
+    """
+    if rope.leaf is not None:
+        if rope.length - (end - start) + len(chars) > MAX_LEAF:
+            return None
+        return Rope(rope.leaf[:start] + chars + rope.leaf[end:])
+    left_length = rope.left.length
+    if end <= left_length and start < left_length:
+        left = _edit_leaf(rope.left, start, end, chars)
+        return None if left is None else _node(left, rope.right)
+    if start >= left_length:
+        right = _edit_leaf(rope.right, start - left_length, end - left_length, chars)
+        return None if right is None else _node(rope.left, right)
+    return None
@@ -0,0 +1,76 @@
+# Results shown at once in the results pane, the next ones are shown on demand
+RESULTS_PAGE = 1000
+
+
+class SearchResults():
+    """Results of one search kept as a list and shown in the results pane a page at a time
+
+    The totals come from the list, so they are exact whatever the number of
+    results shown. A result is a sentence match, or the header or keyword counts
+    of a searched file in a folder or database search.
+
+    Args:
+        title (str): header of the results
+        number (int): number of the search, names its mark and tag in the results pane
+    """
+    def __init__(self, title: str, number: int):
+        self.title = title
+        # Mark where the next results are inserted, and tag of the "load more" line
+        self.mark = f"search_matches_{number}"
+        self.tag = f"load_more_{number}"
+        self.items = []
+        # Results already inserted in the results pane, the first ones of items
+        self.shown = 0
+        self.num_matches = 0
+        # (keyword, count) list, set when the search is done
+        self.counts = []
+
+    def add_matches(self, matches: list):
+        self.items.extend(matches)
+        self.num_matches += len(matches)
+
+    def add_group(self, path: str, matches: list, counts: list):
+        """Adds the matches of a searched file under its name, followed by its keyword counts"""
+        self.items.append(f"====== {path} ======")
+        self.add_matches(matches)
+        self.items.append("\n".join(f"Number of matches for \"{string}\": {count}" for string, count in counts))
+
+    def hidden(self) -> int:
+        """Number of results not shown yet"""
+        return len(self.items) - self.shown
+
+    def render(self, count: int) -> str:
+        """Get the text of the next results to show, at most "count", and marks them as shown"""
+        items = self.items[self.shown:self.shown + max(count, 0)]
+        if not items:
+            return ""
+        text = "\n\n".join(items)
+        if self.shown:
+            text = "\n\n" + text
+        self.shown += len(items)
+        return text
+
+    def hidden_text(self) -> str:
+        """Text of the results not shown, as it would be after the shown ones"""
+        return "".join(self.hidden_parts())
+
+    def hidden_parts(self):
+        """Get the text of the results not shown a page at a time, see hidden_text"""
+        for start in range(self.shown, len(self.items), RESULTS_PAGE):
+            text = "\n\n".join(self.items[start:start + RESULTS_PAGE])
+            yield "\n\n" + text if start else text
+
+    def load_more_text(self) -> str:
+        return (
+            f"\n\nShowing {self.shown} of {len(self.items)} results. "
+            f"Click to load {min(RESULTS_PAGE, self.hidden())} more"
+        )
+
+    def header(self) -> str:
+        return f"\n{self.title}:\n\n"
+
+    def summary(self) -> str:
+        """Sentence matches and keyword counts of the search, in the order of the entry"""
+        lines = [f"Sentence matches: {self.num_matches}"]
+        lines.extend(f"Number of matches for \"{string}\": {count}" for string, count in self.counts)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,186 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# A sentence runs up to and including the next ".", "?" or "!", the text after the last one is the last sentence
+SENTENCE = re.compile(r'[^.?!]*[.?!]|[^.?!]+')
+# Runs of spaces and newlines are searched as a single space
+SPACES = re.compile('[ \n]+')
+
+def map_offsets(text: str, start: int, end: int, offsets: list) -> list:
+    """Maps offsets in the normalized text[start:end] to offsets in text
+
+    An offset right after a normalized space maps to the end of the run of
+    spaces and newlines it stands for.
+
+    Args:
+        text (str): text of the sentence
+        start (int): offset of the sentence in text
+        end (int): offset after the sentence in text
+        offsets (list): offsets in the normalized sentence
+
+    Returns:
+        list: offsets in text, in the same order
+    """
+    # (normalized offset of a run, characters the run adds to the offsets after it)
+    run_starts = []
+    shifts = []
+    shift = 0
+    for run in SPACES.finditer(text, start, end):
+        run_starts.append(run.start() - start - shift)
+        shift += run.end() - run.start() - 1
+        shifts.append(shift)
+    result = []
+    for offset in offsets:
+        runs = bisect_left(run_starts, offset)
+        result.append(start + offset + (shifts[runs - 1] if runs else 0))
+    return result
+
+
+class SentenceIndex():
+    """Sentences of the text editor content with their offsets and normalized text
+
+    The text is segmented once, then every update only segments again the
+    sentences around the part of the text that changed. Sentences keep an id
+    for as long as they are not changed so that other indexes can refer to them.
+    """
+    def __init__(self):
+        self.text = ''
+        # Offset of every sentence in the text
+        self.starts = []
+        # Sentences with runs of spaces and newlines replaced by one space
+        self.sentences = []
+        # Id of every sentence
+        self.ids = []
+        self._next_id = 0
+        # Incremented every time the text changes
+        self.version = 0
+        # Size of the blocks compared when looking for the changed part of the text
+        self.block_size = 65536
+        # {id: position} of the sentences, built again after the version changes
+        self._positions = {}
+        self._positions_version = None
+        # Offset of every sentence in the normalized text, built again after the version changes
+        self._normalized_starts = []
+        self._normalized_version = None
+
+    def build(self, text: str):
+        """Segments the whole text"""
+        self.text = text
+        self.starts, self.sentences = self._segment(text, 0, len(text))
+        self.ids = self._new_ids(len(self.sentences))
+        self.version += 1
+
+    def update(self, text: str) -> tuple:
+        """Segments again only the sentences that overlap the changed part of the text
+
+        Args:
+            text (str): new content of the text editor
+
+        Returns:
+            tuple: (removed, added) lists of (id, sentence) pairs
+        """
+        old = self.text
+        if text == old:
+            return [], []
+        if not self.sentences:
+            self.build(text)
+            return [], list(zip(self.ids, self.sentences))
+
+        prefix = self._common_prefix(old, text)
+        suffix = self._common_suffix(old, text, min(len(old), len(text)) - prefix)
+        delta = len(text) - len(old)
+
+        # The changed sentences run from the one with the first changed character to the one
+        # with the first unchanged character after the change, both stay cut at terminators
+        first = max(bisect_right(self.starts, prefix) - 1, 0)
+        last = max(bisect_right(self.starts, len(old) - suffix) - 1, 0)
+        end = self.starts[last + 1] if last + 1 < len(self.starts) else len(old)
+
+        starts, sentences = self._segment(text, self.starts[first], end + delta)
+        ids = self._new_ids(len(sentences))
+        removed = list(zip(self.ids[first:last + 1], self.sentences[first:last + 1]))
+
+        self.starts[first:] = starts + [start + delta for start in self.starts[last + 1:]]
+        self.sentences[first:last + 1] = sentences
+        self.ids[first:last + 1] = ids
+        self.text = text
+        self.version += 1
+        return removed, list(zip(ids, sentences))
+
+    def _segment(self, text: str, start: int, end: int) -> tuple:
+        """Get the offsets and normalized text of the sentences in text[start:end]"""
+        starts = []
+        sentences = []
+        for match in SENTENCE.finditer(text, start, end):
+            starts.append(match.start())
+            sentences.append(SPACES.sub(' ', match.group()))
+        return starts, sentences
+
+    def _new_ids(self, count: int) -> list:
+        ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        return ids
+
+    def _common_prefix(self, old: str, new: str) -> int:
+        """Length of the common start of both texts, compared block by block"""
+        size = min(len(old), len(new))
+        pos = 0
+        while pos < size and old[pos:pos + self.block_size] == new[pos:pos + self.block_size]:
+            pos += self.block_size
+        pos = min(pos, size)
+        end = min(pos + self.block_size, size)
+        while pos < end and old[pos] == new[pos]:
+            pos += 1
+        return pos
+
+    def _common_suffix(self, old: str, new: str, limit: int) -> int:
+        """Length of the common end of both texts, at most "limit" characters"""
+        old_end = len(old)
+        new_end = len(new)
+        length = 0
+        while length < limit:
+            size = min(self.block_size, limit - length)
+            if old[old_end - length - size:old_end - length] != new[new_end - length - size:new_end - length]:
+                break
+            length += size
+        while length < limit and old[old_end - length - 1] == new[new_end - length - 1]:
+            length += 1
+        return length
+
+    def positions(self, ids) -> list:
+        """Get the positions of the sentences with the ids, in text order"""
+        if self._positions_version != self.version:
+            self._positions = {sentence_id: position for position, sentence_id in enumerate(self.ids)}
+            self._positions_version = self.version
+        return sorted(self._positions[sentence_id] for sentence_id in ids)
+
+    def sentence_at(self, offset: int) -> int:
+        """Get the position of the sentence that contains the text offset"""
+        return max(bisect_right(self.starts, offset) - 1, 0)
+
+    def text_offsets(self, position: int, offsets: list) -> list:
+        """Maps offsets in a normalized sentence to offsets in the text, see map_offsets
+
+        Args:
+            position (int): position of the sentence
+            offsets (list): offsets in the normalized sentence
+
+        Returns:
+            list: offsets in the text, in the same order
+        """
+        start = self.starts[position]
+        end = self.starts[position + 1] if position + 1 < len(self.starts) else len(self.text)
+        return map_offsets(self.text, start, end, offsets)
+
+    def locate(self, offset: int) -> tuple:
+        """Get the position of the sentence and the offset in it of an offset in the normalized text"""
+        if self._normalized_version != self.version:
+            self._normalized_starts = list(accumulate((len(sentence) for sentence in self.sentences), initial=0))
+            self._normalized_version = self.version
+        position = min(max(bisect_right(self._normalized_starts, offset) - 1, 0), max(len(self.sentences) - 1, 0))
+        return position, offset - self._normalized_starts[position]
+
+    def normalized_text(self) -> str:
+        """The whole text with runs of spaces and newlines replaced by one space"""
+        return ''.join(self.sentences)
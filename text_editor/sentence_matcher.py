@@ -0,0 +1,59 @@
+import re
+
+# Characters allowed right after a keyword, as in the original search pattern
+KEYWORD_END = r'(?=[\s@*&^%$#.,;:\/\'-\?!]|$)'
+# First word boundary of a sentence, where a sentence match starts
+FIRST_BOUNDARY = re.compile(r'\b')
+TERMINATORS = '.?!'
+
+class SentenceMatcher():
+    """Matches sentences that contain a keyword in time linear in the sentence length
+
+    Gives the same matches as the search pattern
+    \\b[^.?!]*\\b<keyword>\\b[^.?!]*[ .?!] applied to a sentence, without its
+    backtracking: a keyword occurrence is found with a pattern that has no
+    leading [^.?!]*, then the match is expanded to the sentence boundaries.
+    A sentence ending with a terminator matches from its first word boundary
+    to the terminator. The unterminated last sentence matches up to its last
+    space, if a keyword occurrence ends before that space.
+
+    Args:
+        keywords (str): alternation of the keywords, used as in the original pattern
+        ignore_case (bool): matches the keywords ignoring case
+    """
+    def __init__(self, keywords: str, ignore_case: bool):
+        flags = re.IGNORECASE if ignore_case else 0
+        # A keyword with only punctuation between it and the preceding word boundary
+        self.occurrence = re.compile(r'\b[^.?!\w]*(?:' + keywords + ')' + KEYWORD_END + r'\b', flags)
+
+    def match(self, sentence: str):
+        """Get the part of the sentence the search pattern matches
+
+        Args:
+            sentence (str): sentence with spaces and newlines normalized
+
+        Returns:
+            str: matched part of the sentence or None if there is no match
+        """
+        span = self.span(sentence)
+        if span is None:
+            return None
+        return sentence[span[0]:span[1]]
+
+    def span(self, sentence: str):
+        """Get the offsets of the part of the sentence the search pattern matches
+
+        Returns:
+            tuple: (start, end) in the sentence or None if there is no match
+        """
+        if sentence[-1] in TERMINATORS:
+            if self.occurrence.search(sentence) is None:
+                return None
+            return FIRST_BOUNDARY.search(sentence).start(), len(sentence)
+
+        # The keyword must end at or before the last space, the end of the search is
+        # seen by the pattern like the space after it
+        last_space = sentence.rfind(' ')
+        if last_space < 0 or self.occurrence.search(sentence, 0, last_space) is None:
+            return None
+        return FIRST_BOUNDARY.search(sentence).start(), last_space + 1
@@ -0,0 +1,105 @@
+from text_editor.sentence_index import SENTENCE, SPACES, map_offsets
+
+class SentenceReader():
+    """Reads the sentences of a file block by block without loading the whole file
+
+    A block is cut after its last sentence terminator and the text after it is
+    carried over to the next block, so sentences are segmented as if the file
+    was searched at once. Sentences come out normalized like the ones of a
+    SentenceIndex.
+
+    Args:
+        block_size (int, optional): characters read at a time
+        max_sentence (int, optional): characters carried over before a sentence without
+            terminator is cut at its last space, keeps memory bounded on text like logs
+    """
+    def __init__(self, block_size: int = 1 << 20, max_sentence: int = 1 << 16):
+        self.block_size = block_size
+        self.max_sentence = max_sentence
+
+    def blocks(self, file):
+        """Get the sentences of the file one block at a time
+
+        Args:
+            file (file): file opened in text mode
+
+        Yields:
+            list: normalized sentences of the block
+        """
+        for block in self.located_blocks(file):
+            yield block.sentences
+
+    def located_blocks(self, file):
+        """Get the blocks of the file with the offsets of their sentences
+
+        Args:
+            file (file): file opened in text mode
+
+        Yields:
+            SentenceBlock: text, offset and sentences of the block
+        """
+        pending = ''
+        # Offset of the pending text in the file
+        offset = 0
+        while True:
+            data = file.read(self.block_size)
+            if not data:
+                break
+            text = pending + data
+            # Cut after the last terminator, the sentence after it may continue in the next block
+            cut = max(text.rfind('.'), text.rfind('?'), text.rfind('!')) + 1
+            pending = text[cut:]
+            if cut:
+                yield self._segment(text[:cut], offset)
+                offset += cut
+            if len(pending) > self.max_sentence:
+                starts, length = self._split_long(pending)
+                yield SentenceBlock(pending[:length], offset, starts)
+                offset += length
+                pending = pending[length:]
+
+        # The text widget ends the content with a newline, the last sentence is searched the same way
+        pending += '\n'
+        yield self._segment(pending, offset)
+
+    def _segment(self, text: str, offset: int):
+        return SentenceBlock(text, offset, [match.start() for match in SENTENCE.finditer(text)])
+
+    def _split_long(self, text: str) -> tuple:
+        """Cuts a sentence without terminator into parts of at most max_sentence characters
+
+        Returns:
+            tuple: (offsets where the parts ending at a space or newline start, length of the
+                parts, the rest is carried over)
+        """
+        starts = []
+        position = 0
+        while len(text) - position > self.max_sentence:
+            end = position + self.max_sentence
+            cut = max(text.rfind(' ', position, end), text.rfind('\n', position, end)) + 1
+            if cut <= position:
+                cut = end
+            starts.append(position)
+            position = cut
+        return starts, position
+
+
+class SentenceBlock():
+    """Sentences read by a SentenceReader at once, with their place in the file
+
+    Args:
+        text (str): text of the block
+        offset (int): offset of the block in the file
+        starts (list): offset of every sentence in the text of the block
+    """
+    def __init__(self, text: str, offset: int, starts: list):
+        self.text = text
+        self.offset = offset
+        self.starts = starts
+        ends = starts[1:] + [len(text)]
+        self.sentences = [SPACES.sub(' ', text[start:end]) for start, end in zip(starts, ends)]
+
+    def file_offsets(self, number: int, offsets: list) -> list:
+        """Maps offsets in the normalized sentence "number" to offsets in the file"""
+        end = self.starts[number + 1] if number + 1 < len(self.starts) else len(self.text)
+        return [self.offset + offset for offset in map_offsets(self.text, self.starts[number], end, offsets)]
@@ -0,0 +1,134 @@
+from text_editor.sentence_index import SPACES
+
+# Keywords shorter than this are always matched exactly, a typo in them matches most text
+FUZZY_MIN_LENGTH = 4
+
+
+def fold_text(text: str) -> str:
+    """Lowercases the text character by character, so the offsets stay those of the text"""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters lowercase to more than one, those are kept as they are
+    return ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+def pieces(keyword: str, max_errors: int) -> list:
+    """Splits a keyword into max_errors + 1 parts, one of them is in any text within max_errors edits of it"""
+    count = max_errors + 1
+    size, extra = divmod(len(keyword), count)
+    parts = []
+    start = 0
+    for number in range(count):
+        end = start + size + (number < extra)
+        parts.append(keyword[start:end])
+        start = end
+    return parts
+
+
+class SubstringMatcher():
+    """Finds the sentences that contain any of the keywords anywhere, ignoring case
+
+    Unlike KeywordMatcher the keywords do not have to be whole words. With
+    max_errors above 0 a keyword also matches text within that many inserted,
+    deleted or replaced characters of it, to find misspellings. It has the
+    search and key methods of KeywordMatcher so that both run the same way.
+
+    Args:
+        keywords (list): keywords of the search entry
+        max_errors (int, optional): edits allowed in an occurrence of a keyword. Defaults to 0.
+    """
+    def __init__(self, keywords: list, max_errors: int = 0):
+        self.max_errors = max_errors
+        self.keys = sorted({self.key(keyword) for keyword in keywords})
+        self.ignore_case = True
+
+    def key(self, keyword: str) -> str:
+        # Sentences are searched normalized, so are the spaces of the keywords
+        return fold_text(SPACES.sub(' ', keyword))
+
+    def errors(self, key: str) -> int:
+        """Edits allowed in an occurrence of the key"""
+        return self.max_errors if len(key) >= FUZZY_MIN_LENGTH else 0
+
+    def occurrences(self, key: str, text: str) -> list:
+        """Get the (start, end) of the non-overlapping occurrences of the key in the folded text"""
+        found = []
+        errors = self.errors(key)
+        if errors == 0:
+            start = text.find(key)
+            while start >= 0:
+                found.append((start, start + len(key)))
+                start = text.find(key, start + len(key))
+            return found
+
+        # A text within max_errors edits of the key contains one of its pieces exactly
+        if not any(piece in text for piece in pieces(key, errors)):
+            return found
+        begin = 0
+        while begin < len(text):
+            occurrence = self._approximate(key, text, begin, errors)
+            if occurrence is None:
+                break
+            found.append(occurrence)
+            begin = occurrence[1]
+        return found
+
+    def _approximate(self, key: str, text: str, begin: int, errors: int):
+        """Finds the first occurrence of the key within max_errors edits, starting at "begin"
+
+        Edit distance of the key to the best substring ending at every character,
+        computed column by column, with the start of that substring.
+
+        Returns:
+            tuple: (start, end) of the occurrence or None
+        """
+        length = len(key)
+        costs = list(range(length + 1))
+        starts = [begin] * (length + 1)
+        for position in range(begin, len(text)):
+            char = text[position]
+            new_costs = [0]
+            new_starts = [position + 1]
+            for row in range(1, length + 1):
+                cost = costs[row - 1] + (key[row - 1] != char)
+                start = starts[row - 1]
+                if costs[row] + 1 < cost:
+                    cost = costs[row] + 1
+                    start = starts[row]
+                if new_costs[row - 1] + 1 < cost:
+                    cost = new_costs[row - 1] + 1
+                    start = new_starts[row - 1]
+                new_costs.append(cost)
+                new_starts.append(start)
+            costs = new_costs
+            starts = new_starts
+            if costs[length] <= errors and position + 1 > starts[length]:
+                return starts[length], position + 1
+        return None
+
+    def search(self, sentences, spans: list = None) -> tuple:
+        """Matches the sentences and counts the keywords of the matched ones, see KeywordMatcher.search
+
+        Returns:
+            tuple: (matches, {key: count})
+        """
+        matches = []
+        counts = {}
+        for number, sentence in enumerate(sentences):
+            folded = fold_text(sentence)
+            keyword_spans = []
+            for key in self.keys:
+                found = self.occurrences(key, folded)
+                if found:
+                    counts[key] = counts.get(key, 0) + len(found)
+                    keyword_spans.extend(found)
+            if not keyword_spans:
+                continue
+            # The whole sentence is the match, without the spaces around it
+            start = len(sentence) - len(sentence.lstrip(' '))
+            end = max(len(sentence.rstrip(' ')), start)
+            matches.append(sentence[start:end])
+            if spans is not None:
+                spans.append((number, start, end, sorted(keyword_spans)))
+        return matches, counts
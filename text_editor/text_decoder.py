@@ -0,0 +1,290 @@
+import codecs
+import io
+import locale
+import os
+import threading
+import time
+
+# Bytes read and decoded at a time
+BLOCK_SIZE = 1 << 20
+# Bytes of the start of a file looked at to guess its encoding
+SNIFF_SIZE = 1 << 16
+# Byte order marks, the UTF-32 ones first since they start like the UTF-16 ones
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+# Bytes of a character of the encodings whose newline is not one byte
+CODE_UNITS = {'utf-16-le': 2, 'utf-16-be': 2, 'utf-32-le': 4, 'utf-32-be': 4}
+# Encodings a file without a byte order mark is read again in, in order, when some of
+# its bytes are not valid in the guessed one. iso8859-1 decodes any byte
+FALLBACKS = ['cp1252', 'iso8859-1']
+
+
+class _Replaced(threading.local):
+    """Bytes replaced by the "count_replace" error handler in the current thread"""
+    count = 0
+
+
+REPLACED = _Replaced()
+
+
+def _count_replace(error: UnicodeDecodeError) -> tuple:
+    REPLACED.count += error.end - error.start
+    return '\ufffd', error.end
+
+
+# Decodes like "replace" and counts the undecodable bytes, so a text that lost some is not saved over its file
+codecs.register_error('count_replace', _count_replace)
+
+
+def decode_counted(decode, *args) -> tuple:
+    """Calls a decode function using the "count_replace" errors
+
+    Returns:
+        tuple: (decoded text, undecodable bytes replaced by U+FFFD)
+    """
+    REPLACED.count = 0
+    text = decode(*args)
+    return text, REPLACED.count
+
+
+def _decodes(head: bytes, encoding: str) -> bool:
+    """Whether the bytes are valid in the encoding, a character cut at the end is allowed"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def sniff_encoding(head: bytes) -> tuple:
+    """Guesses the encoding of a file from its first bytes
+
+    A byte order mark decides it, otherwise UTF-8 if the bytes are valid UTF-8,
+    UTF-16 if every other byte is mostly NUL, then the encoding of the system
+    and cp1252, which decodes any byte.
+
+    Args:
+        head (bytes): start of the file
+
+    Returns:
+        tuple: (encoding, byte order mark or b'')
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, bom
+
+    sample = head[:4096]
+    if b'\0' in sample:
+        # ASCII text in UTF-16 has a NUL after (little endian) or before every character
+        odd = sample[1::2].count(0)
+        even = sample[0::2].count(0)
+        half = len(sample) // 2
+        if odd > half * 0.3 and odd > even * 4:
+            return 'utf-16-le', b''
+        if even > half * 0.3 and even > odd * 4:
+            return 'utf-16-be', b''
+
+    if _decodes(head, 'utf-8'):
+        return 'utf-8', b''
+    preferred = codecs.lookup(locale.getpreferredencoding(False)).name
+    if preferred != 'utf-8' and _decodes(head, preferred):
+        return preferred, b''
+    return 'cp1252', b''
+
+
+class TextFormat():
+    """Encoding, byte order mark and line ends of a text file, so it is saved as it was opened
+
+    Args:
+        encoding (str): name of the codec of the text, without its byte order mark
+        bom (bytes, optional): byte order mark at the start of the file
+        newline (str, optional): line end written on save, None for the one of the system
+    """
+    def __init__(self, encoding: str, bom: bytes = b'', newline=None):
+        self.encoding = encoding
+        self.bom = bom
+        self.newline = newline
+        # Undecodable bytes shown as replacement characters, saving the text loses them
+        self.replaced = 0
+
+    def open(self, filename: str):
+        """Opens a file to write text in this format, starting with the byte order mark"""
+        file = open(filename, 'wb')
+        file.write(self.bom)
+        return io.TextIOWrapper(file, encoding=self.encoding, newline=self.newline)
+
+    def describe(self) -> str:
+        name = self.encoding.upper()
+        if self.bom:
+            name += " with BOM"
+        endings = {'\r\n': "CRLF", '\n': "LF", '\r': "CR"}
+        if self.newline in endings:
+            name += f", {endings[self.newline]}"
+        return name
+
+
+def fallback_encoding(format: TextFormat):
+    """Get the encoding to read a file in again when some of its bytes could not be decoded
+
+    A byte order mark or UTF-16/32 means the encoding is known, those have no fallback.
+
+    Returns:
+        str: the next of FALLBACKS, None if there is none
+    """
+    if format.bom or format.encoding in CODE_UNITS:
+        return None
+    if format.encoding not in FALLBACKS:
+        return FALLBACKS[0]
+    position = FALLBACKS.index(format.encoding) + 1
+    return FALLBACKS[position] if position < len(FALLBACKS) else None
+
+
+class TextReader():
+    """Reads a text file block by block, decoded and with "\\n" line ends
+
+    The encoding is guessed from the first block. Every block is read into the
+    same buffer without a buffered file in between, then decoded incrementally
+    so a character cut between two blocks is decoded whole. "\\r\\n" and "\\r"
+    become "\\n", as in a file opened in text mode, and the line end found most
+    is kept to save the file with it. Undecodable bytes become replacement
+    characters and are counted in format.replaced: the first block can be valid
+    in the guessed encoding and a later one not, see fallback_encoding.
+
+    Args:
+        filename (str): file path string of the text that will be read
+        block_size (int, optional): bytes read at a time
+        encoding (str, optional): encoding of the file instead of the guessed one
+    """
+    def __init__(self, filename: str, block_size: int = BLOCK_SIZE, encoding=None):
+        self.file = open(filename, 'rb', buffering=0)
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.buffer = bytearray(block_size)
+        self.bytes_read = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        # Line ends found: CRLF, lone CR and lone LF
+        self.endings = [0, 0, 0]
+        # "\r" at the end of a block, its "\n" can start the next one
+        self.pending_cr = False
+        self.done = False
+
+        head = self._read_block()
+        if encoding is None:
+            encoding, bom = sniff_encoding(bytes(head[:SNIFF_SIZE]))
+        else:
+            bom = b''
+        self.format = TextFormat(encoding, bom)
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='count_replace')
+        # The first block is decoded by the first read, after the byte order mark
+        self.head = head[len(bom):]
+
+    def _read_block(self) -> memoryview:
+        count = self.file.readinto(self.buffer)
+        self.bytes_read += count
+        return memoryview(self.buffer)[:count]
+
+    def read(self, size: int = -1) -> str:
+        """Get the text of the next block, the size is ignored
+
+        Returns:
+            str: text of the block, '' at the end of the file
+        """
+        while not self.done:
+            if self.head is not None:
+                data = self.head
+                self.head = None
+            else:
+                data = self._read_block()
+            final = not data
+            text, replaced = decode_counted(self.decoder.decode, data, final)
+            self.format.replaced += replaced
+            if final:
+                self.done = True
+                self.elapsed = time.perf_counter() - self.started
+            text = self._normalize(text, final)
+            if text:
+                return text
+        return ''
+
+    def _normalize(self, text: str, final: bool) -> str:
+        if self.pending_cr:
+            text = '\r' + text
+            self.pending_cr = False
+        if text.endswith('\r') and not final:
+            text = text[:-1]
+            self.pending_cr = True
+        crlf = text.count('\r\n')
+        cr = text.count('\r') - crlf
+        self.endings[0] += crlf
+        self.endings[1] += cr
+        self.endings[2] += text.count('\n') - crlf
+        if crlf:
+            text = text.replace('\r\n', '\n')
+        if cr:
+            text = text.replace('\r', '\n')
+        if final:
+            counts = dict(zip(('\r\n', '\r', '\n'), self.endings))
+            newline = max(counts, key=counts.get)
+            self.format.newline = newline if counts[newline] else None
+        return text
+
+    def __iter__(self):
+        while True:
+            text = self.read()
+            if not text:
+                return
+            yield text
+
+    def progress(self) -> float:
+        """Fraction of the file read"""
+        return min(self.bytes_read / self.size, 1.0) if self.size else 1.0
+
+    def rate(self) -> float:
+        """Bytes read per second"""
+        elapsed = self.elapsed if self.done else time.perf_counter() - self.started
+        return self.bytes_read / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def detect_file(filename: str) -> TextFormat:
+    """Get the format of a file from its first bytes, without reading the rest
+
+    The encoding is guessed by sniff_encoding and the line end is the one used
+    in the first bytes.
+    """
+    with open(filename, 'rb') as file:
+        head = file.read(SNIFF_SIZE)
+    encoding, bom = sniff_encoding(head)
+    text = head[len(bom):].decode(encoding, errors='replace')
+    for newline in ('\r\n', '\n', '\r'):
+        if newline in text:
+            return TextFormat(encoding, bom, newline)
+    return TextFormat(encoding, bom)
+
+
+def read_text(filename: str) -> tuple:
+    """Reads a whole text file of any encoding, in a fallback encoding if it has undecodable bytes
+
+    Returns:
+        tuple: (text, TextFormat of the file)
+    """
+    encoding = None
+    while True:
+        with TextReader(filename, encoding=encoding) as reader:
+            text = ''.join(reader)
+        encoding = fallback_encoding(reader.format) if reader.format.replaced else None
+        if encoding is None:
+            return text, reader.format
@@ -0,0 +1,81 @@
+class TextTracker():
+    """Reports every change of a Tk text widget as the range it replaces
+
+    The widget command is renamed and replaced by a proxy, so the insert, delete
+    and replace calls made by the key bindings, the clipboard and the program
+    itself are all seen before they are run. Their indexes are resolved the way
+    the widget resolves them, including the final newline that cannot be deleted.
+
+    Args:
+        widget (Text): text widget to track
+        on_change (function): called with (start, end, chars) after each change, start and
+            end are (line, column) of the replaced range before the change
+    """
+    def __init__(self, widget, on_change):
+        self.widget = widget
+        self.on_change = on_change
+        self.original = widget._w + "_tracked"
+        widget.tk.call("rename", widget._w, self.original)
+        widget.tk.createcommand(widget._w, self._proxy)
+
+    def _call(self, *args):
+        return self.widget.tk.call((self.original,) + args)
+
+    def _position(self, index) -> tuple:
+        line, column = str(self._call("index", index)).split('.')
+        return int(line), int(column)
+
+    def _proxy(self, *args):
+        if not args or args[0] not in ("insert", "delete", "replace"):
+            return self._call(*args)
+
+        command = args[0]
+        changes = []
+        if command == "insert":
+            changes.append(self._insert_range(args[1]) + (''.join(args[2::2]),))
+        elif command == "delete" and len(args) <= 3:
+            changes.append(self._delete_range(args[1], args[2] if len(args) > 2 else None) + ('',))
+        elif command == "replace":
+            start, end = self._delete_range(args[1], args[2])
+            changes.append((start, end, ''.join(args[3::2])))
+        else:
+            # Several ranges in one delete, the whole text is reported as replaced
+            changes = None
+
+        if changes is None:
+            last = self._position("end - 1 chars")
+            result = self._call(*args)
+            self.on_change((1, 0), last, str(self._call("get", "1.0", "end - 1 chars")))
+            return result
+
+        result = self._call(*args)
+        for start, end, chars in changes:
+            if start != end or chars:
+                self.on_change(start, end, chars)
+        return result
+
+    def _insert_range(self, index) -> tuple:
+        position = self._position(index)
+        # Text inserted at "end" goes before the final newline
+        if position == self._position("end"):
+            position = self._position("end - 1 chars")
+        return position, position
+
+    def _delete_range(self, index1, index2) -> tuple:
+        start = self._position(index1)
+        if index2 is None:
+            end = self._position(f"{index1} + 1 chars")
+        else:
+            end = self._position(index2)
+        if start >= end:
+            return start, start
+
+        text_end = self._position("end")
+        if end == text_end:
+            # The final newline stays, a range of whole lines takes the newline before it instead
+            end = self._position("end - 1 chars")
+            if start[1] == 0 and start[0] > 1:
+                start = self._position(f"{start[0]}.0 - 1 chars")
+        if start >= end:
+            return start, start
+        return start, end
@@ -0,0 +1,171 @@
+import hashlib
+import marshal
+import os
+from array import array
+
+from text_editor.substring_matcher import fold_text, pieces
+
+# Consecutive sentences are indexed together in blocks of at least this many characters
+BLOCK_SIZE = 8192
+# Changes the name of the stored indexes whenever their format changes
+FORMAT_VERSION = 1
+# Indexes kept on disk, the least recently used ones are removed
+MAX_STORED = 32
+
+
+def trigrams(text: str) -> set:
+    """Get every run of three characters of the text"""
+    return {text[position:position + 3] for position in range(len(text) - 2)}
+
+
+class TrigramIndex():
+    """Inverted index from every three characters to the blocks of sentences that contain them
+
+    A keyword is only in the blocks that contain all of its trigrams, so a
+    substring search only verifies the sentences of those blocks. Sentences are
+    folded like SubstringMatcher folds them. The index is not updated by edits,
+    it belongs to the version of the SentenceIndex it was built from.
+    """
+    def __init__(self):
+        # Position of the first sentence of every block, and the number of sentences after the last one
+        self.block_starts = []
+        # {trigram: block numbers as the bytes of an array("I")}
+        self.postings = {}
+        # Version of the SentenceIndex the postings belong to, None until built
+        self.version = None
+
+    def build(self, sentences: list, version: int):
+        """Indexes the sentences
+
+        Args:
+            sentences (list): sentences of a SentenceIndex
+            version (int): version of the SentenceIndex with these sentences
+        """
+        postings = {}
+        self.block_starts = []
+        position = 0
+        while position < len(sentences):
+            self.block_starts.append(position)
+            block = []
+            size = 0
+            while position < len(sentences) and size < BLOCK_SIZE:
+                block.append(sentences[position])
+                size += len(sentences[position])
+                position += 1
+            number = len(self.block_starts) - 1
+            # Sentences are joined by a character no keyword has, so no trigram spans two of them
+            for trigram in trigrams(fold_text('\0'.join(block))):
+                blocks = postings.get(trigram)
+                if blocks is None:
+                    blocks = postings[trigram] = array('I')
+                blocks.append(number)
+        self.block_starts.append(len(sentences))
+        self.postings = {trigram: blocks.tobytes() for trigram, blocks in postings.items()}
+        self.version = version
+
+    def blocks(self, trigram: str) -> array:
+        blocks = array('I')
+        blocks.frombytes(self.postings.get(trigram, b''))
+        return blocks
+
+    def candidates(self, keys: list, max_errors: int = 0):
+        """Get the positions of the sentences that can contain any of the keys
+
+        A key within max_errors edits of a text has one of its max_errors + 1
+        pieces in the text exactly, each piece is looked up by its trigrams.
+
+        Args:
+            keys (list): keys of a SubstringMatcher
+            max_errors (int, optional): edits allowed in an occurrence of every key
+
+        Returns:
+            list: positions in text order, None if a key is too short to be looked up
+        """
+        numbers = set()
+        for key in keys:
+            for piece in pieces(key, max_errors):
+                if len(piece) < 3:
+                    return None
+                blocks = None
+                # The rarest trigrams first, the intersection only gets smaller
+                for trigram in sorted(trigrams(piece), key=lambda trigram: len(self.postings.get(trigram, b''))):
+                    found = self.blocks(trigram)
+                    blocks = set(found) if blocks is None else blocks.intersection(found)
+                    if not blocks:
+                        break
+                numbers.update(blocks)
+        positions = []
+        for number in sorted(numbers):
+            positions.extend(range(self.block_starts[number], self.block_starts[number + 1]))
+        return positions
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps((FORMAT_VERSION, self.block_starts, self.postings))
+
+    def from_bytes(self, data: bytes, version: int):
+        """Loads an index stored with to_bytes for the version of a SentenceIndex"""
+        format_version, self.block_starts, self.postings = marshal.loads(data)
+        if format_version != FORMAT_VERSION:
+            raise ValueError("Index stored in another format")
+        self.version = version
+
+
+class TrigramStore():
+    """Trigram indexes kept on disk by the hash of the text they were built from
+
+    Opening the same content again, from a file or the database, loads its index
+    instead of building it. Only the MAX_STORED indexes used last are kept.
+
+    Args:
+        directory (str, optional): directory of the indexes. Defaults to ~/.data_editor/trigrams
+    """
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".data_editor", "trigrams")
+        self.directory = directory
+
+    def key(self, text: str) -> str:
+        """Hash of the content of an index"""
+        return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.v{FORMAT_VERSION}.idx")
+
+    def load(self, key: str, version: int):
+        """Get the stored index of a content, None if there is none
+
+        Args:
+            key (str): hash of the content from TrigramStore.key
+            version (int): version of the SentenceIndex of the content
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            index = TrigramIndex()
+            index.from_bytes(data, version)
+            # Marks it as used for the cleanup
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        return index
+
+    def save(self, key: str, index: TrigramIndex):
+        """Stores an index, written to a temporary file first so a stored index is never partial"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(index.to_bytes())
+        os.replace(temp_path, path)
+        self.clean()
+
+    def clean(self):
+        """Removes the least recently used indexes beyond MAX_STORED"""
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".idx")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[MAX_STORED:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
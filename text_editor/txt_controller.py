@@ -1,14 +1,34 @@
 import re
 import os
+from bisect import bisect_right
+import threading
+import time
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import filedialog as fd
+from tkinter import simpledialog
 
+from database.bulk_import import BulkImporter
+from database.content_stats import format_size
+from database.db_worker import DBWorker
 from database.txt_database import TXTdatabase
+from text_editor.document_search import DocumentSearcher
+from text_editor.edit_journal import AUTOSAVE_MS, EditJournal
+from text_editor.folder_search import FolderSearcher, is_binary
+from text_editor.result_export import ResultExporter, export_format
+from text_editor.search_results import RESULTS_PAGE, SearchResults
+from text_editor.text_decoder import TextReader, fallback_encoding
 from text_editor.txt_models import Model
 from text_editor.txt_views import ViewPanel
 from csv_editor.csv_controller import CSV_Controller
 
+# Files larger than this are opened a few pages at a time instead of being read whole
+PAGED_FILE_SIZE = 16 * 1024 * 1024
+# Pages of a paged file kept in the text editor around the viewport
+PAGE_WINDOW = 3
+# Matches highlighted at once after a search, more are highlighted as they scroll into view
+HIGHLIGHT_ALL = 2000
+
 class TXT_Controller():
     """Controller object for the text editor"""
     def __init__(self):
@@ -25,6 +45,41 @@ class TXT_Controller():
 
         # Database reference
         self.database = TXTdatabase()   
+        # Runs the database calls in the background so the editor never waits on the server
+        self.db_worker = DBWorker(self.root, self.db_error_msg)
+        # Runs the searches on their own thread so the editor and the database calls are not kept waiting
+        self.search_worker = DBWorker(self.root, self.search_error_msg)
+        self.search_task = None
+        # Reads and decodes the opened files, their text is inserted in the editor block by block
+        self.file_worker = DBWorker(self.root, self.open_error_msg)
+        self.file_task = None
+        # Writes the unsaved edits to the journal of the document every few seconds
+        self.journal_worker = DBWorker(self.root, self.autosave_error_msg)
+        self.journal = None
+        # Results of the searches in the results pane with results still to show, by number
+        self.search_results = {}
+        self.results = None
+        self.next_results = 0
+        # Keeps the results of the files searched in a folder for the next search
+        self.folder_searcher = FolderSearcher()
+        # (entry, option, function giving the sources) of the last search, exported again on demand
+        self.last_search = None
+        self.export_task = None
+
+        # Offsets of the matches of the last search of the editor, see Model.search
+        self.match_spans = []
+        self.match_starts = []
+        # Numbers of the matches already highlighted
+        self.tagged_matches = set()
+        # Number of the match jumped to last, -1 before the first jump
+        self.current_match = -1
+        # Set while highlighting the matches in view waits to run after the current scroll
+        self.highlight_pending = False
+
+        # Pages of the paged file shown in the text editor, in order
+        self.loaded_pages = []
+        # Set while a page swap waits to run after the current scroll
+        self.page_swap_pending = False
         
         # Flag to check if a file is opened
         self.open_status_name = False
@@ -46,7 +101,11 @@ class TXT_Controller():
         self.file_menu.add_command(label="Save", command=self.save_file)
         self.file_menu.add_command(label="Save as...", command=self.save_as_file)
         self.file_menu.add_separator()
-        self.file_menu.add_command(label="Delete File", command=self.delete_file)     
+        self.file_menu.add_command(label="Delete File", command=self.delete_file)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="Search File...", command=self.search_file)
+        self.file_menu.add_command(label="Search in Folder...", command=self.search_folder)
+        self.file_menu.add_command(label="Export Matches...", command=self.export_matches)     
         
         # Action menu
         self.action_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -61,19 +120,17 @@ class TXT_Controller():
         self.edit_menu.add_command(label="Copy", command=lambda: self.copy_text(False))
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Paste", command=lambda: self.paste_text(False))
+        self.edit_menu.add_separator()
+        self.edit_menu.add_command(label="Next match", accelerator="F3", command=self.next_match)
+        self.edit_menu.add_command(label="Previous match", accelerator="Shift+F3", command=self.previous_match)
      
-        # Flag to check if connected to db
-        self.cnx = self.database.connect()
+        # Flag to check if connected to db, set when the connection comes up
+        self.cnx = False
         
-        # Create database if there is connection
-        if self.cnx:
-            self.database.create_database()
-            self.view.status_bar.config(fg='darkgreen')
-            self.view.status_bar.config(text="Connected to Database       ")
-        else:
-            self.view.status_bar.config(fg='red')
-            self.view.status_bar.config(text="Error: Not connected to Database       ")
-            self.view.connect_popup() 
+        # Connect and create database in the background
+        self.view.status_bar.config(fg='black')
+        self.view.status_bar.config(text="Connecting to Database...       ")
+        self.db_worker.submit(self.database.open_database, on_done=self.on_connected)
             
         # Database CRUD menu
         self.database_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -103,12 +160,33 @@ class TXT_Controller():
             command=self.db_read,
             state=state
         )
+        self.database_menu.add_command(
+            label="Import folder...",
+            command=self.db_import_folder,
+            state=state
+        )
+        self.database_menu.add_command(
+            label="Search all documents",
+            command=self.search_database,
+            state=state
+        )
+        self.database_menu.add_command(
+            label="Export matches to database...",
+            command=self.db_export_matches,
+            state=state
+        )
         self.database_menu.add_separator()
         self.database_menu.add_command(
             label="Delete current file", 
             command=self.del_curr_from_db,
             state=state
         )
+        self.database_menu.add_separator()
+        self.database_menu.add_command(
+            label="Cancel running operations", 
+            command=self.cancel_db_operations,
+            state=state
+        )
 
         self.db_exports_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.db_exports_menu.add_command(
@@ -142,6 +220,10 @@ class TXT_Controller():
             "WM_DELETE_WINDOW",
             self.on_closing
         )
+
+        self.root.after(AUTOSAVE_MS, self.autosave)
+        # The journals left by a crash are offered once the window is shown
+        self.root.after_idle(self.offer_recovery)
     
     def run(self):
         """Runs the program"""
@@ -152,6 +234,21 @@ class TXT_Controller():
         self.view.connect_popup_root.destroy()
         self.root.wm_attributes("-topmost", False)
 
+    def on_connected(self, connected):
+        """Updates the status bar when the connection at startup is done
+
+        Args:
+            connected (bool): True if connected to the database
+        """
+        self.cnx = connected
+        if self.cnx:
+            self.view.status_bar.config(fg='darkgreen')
+            self.view.status_bar.config(text="Connected to Database       ")
+        else:
+            self.view.status_bar.config(fg='red')
+            self.view.status_bar.config(text="Error: Not connected to Database       ")
+            self.view.connect_popup() 
+
     def submit(self):
         usr_cred = [self.view.host_entry.get(), self.view.user_entry.get(), self.view.password_entry.get()]
 
@@ -159,10 +256,15 @@ class TXT_Controller():
         self.database.user = usr_cred[1]
         self.database.password = usr_cred[2]
 
-        self.cnx = self.database.connect()
+        self.view.status_bar.config(fg='black')
+        self.view.status_bar.config(text="Connecting to Database...       ")
+        self.db_worker.submit(self.database.open_database, on_done=self.on_submit_done)
+
+    def on_submit_done(self, connected):
+        """Closes the credentials popup if the connection with the submitted credentials is up"""
+        self.cnx = connected
         if self.cnx:
             self.cred_on_closing()
-            self.database.create_database()
             self.view.status_bar.config(fg='darkgreen')
             self.view.status_bar.config(text="Connected to Database       ")
         else:
@@ -173,29 +275,74 @@ class TXT_Controller():
     def cnx_error_msg(self):
         """Error message when not connected to database"""
         messagebox.showinfo(title="Message", message=f"Not connected to database.")
+
+    def db_error_msg(self, err):
+        """Error message when a database call fails"""
+        # A file that was being read from database stops there
+        if self.file_task is not None and self.file_task.future.done():
+            self.file_task = None
+        self.view.status_bar.config(fg='red')
+        self.view.status_bar.config(text="Error: Database operation failed       ")
+        messagebox.showinfo(title="Database Error", message=f"{err}")
+
+    def db_import_folder(self):
+        """Imports every CSV and TXT file of a folder to database in the background"""
+        if self.cnx:
+            directory = fd.askdirectory(title="Import folder")
+            if directory:
+                importer = BulkImporter(self.database)
+                self.db_worker.submit(
+                    importer.run, directory,
+                    pass_task=True,
+                    on_progress=self.on_import_progress,
+                    on_done=self.on_imported
+                )
+        else:
+            self.cnx_error_msg()
+
+    def on_import_progress(self, progress):
+        """Shows the number of files imported so far"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Importing... {progress}       ")
+
+    def on_imported(self, report):
+        """Shows the throughput and failures of a finished import"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Imported {report.imported} file(s)       ")
+        messagebox.showinfo(title="Import finished", message=report.summary())
+
+    def cancel_db_operations(self):
+        """Cancels the database calls that are queued or running"""
+        count = self.db_worker.cancel_all()
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Cancelled {count} database operation(s)       ")
     
     def no_opened_file(self):
         messagebox.showinfo(title="Message", message=f"No opened file")
 
+    def read_only_msg(self):
+        """Error message when saving a file opened from the cache while offline"""
+        messagebox.showinfo(title="Message", message=f"Not connected to database. The file was opened read-only from the local cache.")
+
     # DATABASE FILES
 
     def db_save_cmd(self):
         # Database: save command for menu
-        title = self.root.title().replace("DATABASE: ", "")
+        title = self.root.title().replace("DATABASE: ", "").replace(" (read-only)", "")
         if self.cnx:
             if self.open_status_name or self.database.current_fname:
-                fnames = self.database.get_fnames()
                 if self.open_status_name:
                     filename = title
                 elif self.database.current_fname:
                     filename = self.database.current_fname    
-                if not bool(fnames):
-                        self.db_save(filename)
-                else:
-                    if filename not in fnames:
+
+                def on_checked(exists):
+                    # Asks for another filename if the filename already exists
+                    if not exists:
                         self.db_save(filename)
                     else:
-                        self.view.db_save_popup()         
+                        self.view.db_save_popup()
+                self.db_worker.submit(self.database.file_exists, filename, on_done=on_checked)
             else:
                 self.no_opened_file()        
         else:
@@ -208,14 +355,12 @@ class TXT_Controller():
             # Check if filename is empty
             if fname != "":
                 # Get content of text editor
-                current_content = self.view.txt_editor.get('1.0', tk.END)
+                current_content = self.editor_text()
                     
                 # Save to database
-                self.database.save_to_db(fname, current_content)
-
-                messagebox.showinfo(
-                    title = "Saved Successfully!",
-                    message = f"Saved {fname} to Database 'Text Editor'."
+                self.db_worker.submit(
+                    self.database.save_to_db, fname, current_content,
+                    on_done=lambda saved: self.on_db_saved(saved, "Saved Successfully!", f"Saved {fname} to Database 'Text Editor'.", editor=True)
                 )
             else:
                 # Save as if the filename is empty
@@ -223,6 +368,25 @@ class TXT_Controller():
         else:
             self.cnx_error_msg()
     
+    def on_db_saved(self, saved, title, message, editor=False):
+        """Confirms a save, or tells that it was skipped because the content did not change
+
+        Args:
+            editor (bool, optional): the text editor was saved, its autosave journal is removed
+        """
+        if saved is None:
+            self.cnx_error_msg()
+            return
+        if editor:
+            # The database has the text, the edits made while the save ran are still autosaved
+            self.reset_journal(keep_edits=True)
+        if saved:
+            self.view.status_bar.config(fg="black")
+            self.view.status_bar.config(text=f"Sent {format_size(self.database.last_sent_bytes)}       ")
+            messagebox.showinfo(title=title, message=message)
+        else:
+            messagebox.showinfo(title="Message", message=f"No changes to save, the content in database is the same.")
+
     def db_save_as_cmd(self):
         # Database: save as command for menu
         # Check if a file is opened in either local or mysql directory
@@ -249,7 +413,9 @@ class TXT_Controller():
 
     def db_save_changes_cmd(self):
         # Database: save changes command for menu
-        if self.database.current_fname:
+        if self.database.current_fname and self.database.read_only:
+            self.read_only_msg()
+        elif self.database.current_fname:
             self.db_save_changes()
         else:
             messagebox.showinfo(
@@ -259,75 +425,109 @@ class TXT_Controller():
 
     def db_save_changes(self):
         # Updates the changes to database
-        content = self.view.txt_editor.get("1.0", tk.END)
+        content = self.editor_text()
         filename = self.database.current_fname
-        self.database.update_txt(filename, content)
-        messagebox.showinfo(
-                    title = "Message",
-                    message = f"Saved changes to {filename}"
-            )
+        self.db_worker.submit(
+            self.database.update_txt, filename, content,
+            on_done=lambda saved: self.on_db_saved(saved, "Message", f"Saved changes to {filename}", editor=True)
+        )
 
     def db_read(self):
-        """Triggers when opening file from database menu"""
-        if self.cnx:
-            # List of filenames from database to be displayed
-            fname_lst_db = self.database.get_fnames()
-            
-            # Check if database is not empty
-            if fname_lst_db:
-                self.view.open_popup(fname_lst_db)
-            else:
-                messagebox.showinfo(
-                    title = "Empty",
-                    message = f"Database is empty."
-                )
-        else:
+        """Triggers when opening file from database menu. When not connected the
+        files in the local cache are listed instead"""
+        # List of filenames from database to be displayed
+        self.db_worker.submit(self.database.get_file_info, on_done=self.on_fnames_read)
+
+    def on_fnames_read(self, fname_lst_db):
+        """Opens the popup with the filenames, sizes and modification times read from database"""
+        # Check if database is not empty
+        if fname_lst_db:
+            self.view.open_popup(fname_lst_db)
+        elif not self.cnx:
             self.cnx_error_msg()
+        else:
+            messagebox.showinfo(
+                title = "Empty",
+                message = f"Database is empty."
+            )
         
     def get_selected_val(self): # button command // views
         """Gets filename value from option menu"""
-        if self.cnx:
-            fname = self.view.db_fname.get()
-            self.view.popup_root.destroy()
-            self.insert_db_txt(fname)
-        else:
-            self.cnx_error_msg()
+        fname = self.view.db_files[self.view.db_fname.get()]
+        self.view.popup_root.destroy()
+        self.insert_db_txt(fname)
 
     def insert_db_txt(self, fname):
-        """Inserts the content of the file using filename from database"""
-        res = self.database.get_val_from_fname(fname)
-        self.view.txt_editor.delete('1.0', 'end')
-        self.view.txt_editor.insert('1.0', res)
+        """Reads the file from database in the background, its chunks are inserted as they arrive"""
+        self.update()
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Opening {fname}...       ")
+        self.file_task = self.db_worker.submit(
+            self.database.stream_val_from_fname, fname,
+            pass_task=True,
+            on_progress=lambda part: self.on_db_txt_part(fname, part),
+            on_done=lambda found: self.on_db_txt_read(fname, found)
+        )
+
+    def on_db_txt_part(self, fname, part):
+        """Appends a part of the file read from database to the text editor"""
+        text, fraction = part
+        self.view.txt_editor.insert('end - 1 chars', text)
+        # The part is opened text, not an edit for the autosave journal
+        self.model.take_edits()
+        self.view.status_bar.config(text=f"Opening {fname}... {fraction:.0%}       ")
+
+    def on_db_txt_read(self, fname, found):
+        """Indexes the file read from database and updates the flags"""
+        self.file_task = None
+        if not found:
+            self.view.status_bar.config(fg='red')
+            self.view.status_bar.config(text=f"Error: {fname} is not in the database       ")
+            return
+        self.view.status_bar.config(text=f"DATABASE: {fname}       ")
+        # The inserted parts are the opened text, not edits to autosave
+        self.reset_journal()
+        self.index_text()
 
         # Update flags
         self.open_status_name = False
         self.database.current_fname = fname
-        self.root.title("DATABASE: " + fname)
+        self.set_db_title(fname)
+
+    def index_text(self):
+        """Builds the search indexes of the opened text in a background thread"""
+        text = self.editor_text()
+        threading.Thread(target=self.model.build_index, args=(text,), daemon=True).start()
 
     def del_curr_from_db(self):
         """Deletes current file from database"""
         # Check connection
         if self.cnx:
             curr_fname = self.database.current_fname
-            fnames = self.database.get_fnames()
-            if bool(fnames):
-                # Check if there is an opened file
-                if curr_fname:
-                    if messagebox.askyesno(title="Delete?", message=f"Do you really want to delete \"{curr_fname}\" from database?"):
-                        # Deletes current file from db
-                        self.database.del_from_tbl(curr_fname)
-                        self.database.current_fname = False
-                        self.open_status_name = False
-                        self.new_file()
-                        # Confirmation message that the file is deleted
-                        messagebox.showinfo(title="Message", message=f"Successfuly deleted \"{curr_fname}\" from database.")
+
+            def on_fnames(fnames):
+                if bool(fnames):
+                    # Check if there is an opened file
+                    if curr_fname:
+                        if messagebox.askyesno(title="Delete?", message=f"Do you really want to delete \"{curr_fname}\" from database?"):
+                            # Deletes current file from db
+                            self.db_worker.submit(self.database.del_from_tbl, curr_fname, on_done=on_deleted)
+                    else:
+                        messagebox.showinfo(title="Message", message=f"File does not exist in database.")
                 else:
-                    messagebox.showinfo(title="Message", message=f"File does not exist in database.")
-            else:
-                messagebox.showinfo(
-                    title = "Empty",
-                    message = f"Database is empty."
-                )
+                    messagebox.showinfo(
+                        title = "Empty",
+                        message = f"Database is empty."
+                    )
+
+            def on_deleted(result):
+                self.database.current_fname = False
+                self.open_status_name = False
+                self.new_file()
+                # Confirmation message that the file is deleted
+                messagebox.showinfo(title="Message", message=f"Successfuly deleted \"{curr_fname}\" from database.")
+
+            self.db_worker.submit(self.database.get_fnames, on_done=on_fnames)
         else:
             self.cnx_error_msg()
 
@@ -340,14 +540,12 @@ class TXT_Controller():
             # Check if filename is empty
             if fname != "":
                 # Get content of text editor
-                current_content = self.view.display_text.get('1.0', tk.END)
+                current_content = self.display_content()
                     
                 # Save to database
-                self.database.save_to_db_EXP(fname, current_content)
-
-                messagebox.showinfo(
-                    title = "Saved Successfully!",
-                    message = f"Saved {fname} to Database 'Text Editor'."
+                self.db_worker.submit(
+                    self.database.save_to_db_EXP, fname, current_content,
+                    on_done=lambda saved: self.on_db_saved(saved, "Saved Successfully!", f"Saved {fname} to Database 'Text Editor'.")
                 )
             else:
                 # Save as if the filename is empty
@@ -373,7 +571,9 @@ class TXT_Controller():
 
     def db_save_changes_cmd_EXP(self):
         # Database: save changes command for menu
-        if self.database.current_fname_EXP:
+        if self.database.current_fname_EXP and self.database.read_only:
+            self.read_only_msg()
+        elif self.database.current_fname_EXP:
             self.db_save_changes_EXP()
         else:
             messagebox.showinfo(
@@ -383,73 +583,91 @@ class TXT_Controller():
 
     def db_save_changes_EXP(self):
         # Updates the changes to database
-        content = self.view.display_text.get("1.0", tk.END)
+        content = self.display_content()
         filename = self.database.current_fname_EXP
-        self.database.update_txt_EXP(filename, content)
-        messagebox.showinfo(
-                    title = "Message",
-                    message = f"Saved changes to {filename}"
-            )
+        self.db_worker.submit(
+            self.database.update_txt_EXP, filename, content,
+            on_done=lambda saved: self.on_db_saved(saved, "Message", f"Saved changes to {filename}")
+        )
 
     def db_read_EXP(self):
-        """Triggers when opening file from database menu"""
-        if self.cnx:
-            # List of filenames from database to be displayed
-            fname_lst_db = self.database.get_fnames_EXP()
-            
-            # Check if database is not empty
-            if fname_lst_db:
-                self.view.open_popup_EXP(fname_lst_db)
-            else:
-                messagebox.showinfo(
-                    title = "Empty",
-                    message = f"Database is empty."
-                )
-        else:
+        """Triggers when opening file from database menu. When not connected the
+        files in the local cache are listed instead"""
+        # List of filenames from database to be displayed
+        self.db_worker.submit(self.database.get_file_info_EXP, on_done=self.on_fnames_read_EXP)
+
+    def on_fnames_read_EXP(self, fname_lst_db):
+        """Opens the popup with the filenames, sizes and modification times read from database"""
+        # Check if database is not empty
+        if fname_lst_db:
+            self.view.open_popup_EXP(fname_lst_db)
+        elif not self.cnx:
             self.cnx_error_msg()
+        else:
+            messagebox.showinfo(
+                title = "Empty",
+                message = f"Database is empty."
+            )
         
     def get_selected_val_EXP(self): # button command // views
         """Gets filename value from option menu"""
-        if self.cnx:
-            fname = self.view.db_fname_EXP.get()
-            self.view.popup_root_EXP.destroy()
-            self.insert_db_txt_EXP(fname)
-        else:
-            self.cnx_error_msg()
+        fname = self.view.db_files_EXP[self.view.db_fname_EXP.get()]
+        self.view.popup_root_EXP.destroy()
+        self.insert_db_txt_EXP(fname)
 
     def insert_db_txt_EXP(self, fname):
+        """Reads the file from database in the background then inserts its content"""
+        self.db_worker.submit(
+            self.database.get_val_from_fname_EXP, fname,
+            on_done=lambda res: self.on_db_txt_read_EXP(fname, res)
+        )
+
+    def on_db_txt_read_EXP(self, fname, res):
         """Inserts the content of the file using filename from database"""
-        res = self.database.get_val_from_fname_EXP(fname)
         self.view.display_text.delete('1.0', 'end')
         self.view.display_text.insert('1.0', res)
+        self.clear_results()
 
         self.database.current_fname_EXP = fname
-        self.root.title("DATABASE: " + fname)
+        self.set_db_title(fname)
+
+    def set_db_title(self, fname):
+        """Shows the database filename in the title, marked when it was opened from the cache"""
+        if self.database.read_only:
+            self.root.title("DATABASE: " + fname + " (read-only)")
+        else:
+            self.root.title("DATABASE: " + fname)
 
     def del_curr_from_db_EXP(self):
         """Deletes current file from database"""
         # Check connection
         if self.cnx:
             curr_fname = self.database.current_fname_EXP
-            fnames = self.database.get_fnames()
-            if bool(fnames):
-                # Check if there is an opened file
-                if curr_fname:
-                    if messagebox.askyesno(title="Delete?", message=f"Do you really want to delete \"{curr_fname}\" from database?"):
-                        # Deletes current file from db
-                        self.database.del_from_tbl_EXP(curr_fname)
-                        self.database.current_fname_EXP = False
-                        self.open_status_name_EXP = False
-                        self.view.display_text.delete('1.0', 'end')
-                        # Confirmation message that the file is deleted
-                        messagebox.showinfo(title="Message", message=f"Successfuly deleted \"{curr_fname}\" from database.")
+
+            def on_fnames(fnames):
+                if bool(fnames):
+                    # Check if there is an opened file
+                    if curr_fname:
+                        if messagebox.askyesno(title="Delete?", message=f"Do you really want to delete \"{curr_fname}\" from database?"):
+                            # Deletes current file from db
+                            self.db_worker.submit(self.database.del_from_tbl_EXP, curr_fname, on_done=on_deleted)
+                    else:
+                        messagebox.showinfo(title="Message", message=f"File does not exist in database.")
                 else:
-                    messagebox.showinfo(title="Message", message=f"File does not exist in database.")
-            else:
-                messagebox.showinfo(
-                    title = "Empty",
-                    message = f"Database is empty."
-                )
+                    messagebox.showinfo(
+                        title = "Empty",
+                        message = f"Database is empty."
+                    )
+
+            def on_deleted(result):
+                self.database.current_fname_EXP = False
+                self.open_status_name_EXP = False
+                self.view.display_text.delete('1.0', 'end')
+                self.clear_results()
+                # Confirmation message that the file is deleted
+                messagebox.showinfo(title="Message", message=f"Successfuly deleted \"{curr_fname}\" from database.")
+
+            self.db_worker.submit(self.database.get_fnames_EXP, on_done=on_fnames)
         else:
             self.cnx_error_msg()
 
@@ -469,8 +687,23 @@ class TXT_Controller():
         Args:
             text (str, optional): string that will be inserted to text editor. Defaults to ''.
         """
+        # A file still being read would keep adding its text
+        if self.file_task is not None:
+            self.file_task.cancel()
+            self.file_task = None
+        self.close_paged()
+        self.model.format = None
         self.view.txt_editor.delete('1.0', 'end')
         self.view.txt_editor.insert('1.0', text)
+        self.reset_journal()
+
+    def editor_text(self) -> str:
+        """Content of the text editor, with every page when a paged file is opened"""
+        if self.model.paged is not None:
+            self.sync_pages()
+            # Same trailing newline as the content of the text widget
+            return self.model.paged.text() + '\n'
+        return self.model.text + '\n'
     
     def update_display(self, text=''):
         """Updates search results
@@ -481,38 +714,428 @@ class TXT_Controller():
         self.view.display_text.insert('1.0', text)
 
     def search_txt(self):
-        """Search functionality of Text Editor"""
-        # Getting the text from the Text editor
-        text_editor_input = self.view.txt_editor.get("1.0", tk.END)
+        """Search functionality of Text Editor, runs in the background on a snapshot of the text
+        so that typing goes on, and a new search cancels the one still running"""
+        if self.model.paged is not None:
+            self.search_paged()
+            return
         entry_input = self.view.entry.get()
         option_value = self.view.value_inside.get()
 
-        # Call search_sentence function to find list of all sentence matches
-        lst_searches = self.model.search_sentence(text_editor_input, entry_input, option_value)
-        # Transforming the list of results into string with lines in between for readability
-        string_searches = "\n\n".join(lst_searches)
+        self.last_search = (entry_input, option_value, self.editor_sources)
+        # Finds the sentence matches and counts every keyword in them in a single pass, with their offsets
+        snapshot = self.model.snapshot()
+        spans = []
+        self.start_search(
+            "Matches", self.model.search_snapshot, snapshot, entry_input, option_value, spans,
+            on_done=lambda res: self.on_text_searched(res, snapshot, spans)
+        )
+    
+    def search_file(self):
+        """Searches a file with the keywords of the search entry without opening it, for
+        files too large for the editor. The matches are shown as the file is read."""
+        entry_input = self.view.entry.get()
+        option_value = self.view.value_inside.get()
+        if not self.model.entry_list(entry_input):
+            messagebox.showinfo(title="Message", message=f"Enter the keywords to search first")
+            return
+        filename = fd.askopenfilename(
+            title="Search file",
+            filetypes=(("Text Files", "*.txt"), ("All Files", "*.*"))
+        )
+        if not filename:
+            return
 
-        # Inserting the string of results to the text editor in the display frame
-        sentences = f"\nMatches:\n\n{string_searches}\n\n------END OF RESULTS------\n\n"
-        self.update_display(sentences)
+        extract_filename = re.search(r"[^/\\]+$", filename).group(0)
+        self.last_search = (entry_input, option_value, lambda: self.file_sources(filename))
+        self.start_search(f"Matches in {extract_filename}", self.model.search_file, filename, entry_input, option_value)
 
-        # Iterator that inserts match count per keyword to the text editor
-        for string in self.model.entry_list(entry_input):
-            if option_value == "Ignore Case":
-                res = len(re.findall(string, string_searches, re.IGNORECASE))
-            else:
-                res = len(re.findall(string, string_searches))
+    def search_paged(self):
+        """Searches every page of the paged file in the background, edits included"""
+        self.sync_pages()
+        stream = self.model.paged.stream()
+        extract_filename = re.search(r"[^/\\]+$", self.model.paged.filename).group(0)
+        self.last_search = (self.view.entry.get(), self.view.value_inside.get(), self.editor_sources)
+        self.start_search(
+            f"Matches in {extract_filename}", self.model.search_stream, stream, stream.progress,
+            self.view.entry.get(), self.view.value_inside.get()
+        )
+
+    def search_folder(self):
+        """Searches every text file of a folder in worker processes, the results of every
+        file are shown as soon as it is searched"""
+        entry_input = self.view.entry.get()
+        option_value = self.view.value_inside.get()
+        if not self.model.entry_list(entry_input):
+            messagebox.showinfo(title="Message", message=f"Enter the keywords to search first")
+            return
+        directory = fd.askdirectory(title="Search in folder")
+        if not directory:
+            return
+
+        self.last_search = (entry_input, option_value, lambda: self.folder_sources(directory))
+        self.start_search(
+            f"Matches in {directory}", self.folder_searcher.run, directory, entry_input, option_value,
+            on_progress=self.on_grouped_search_progress,
+            on_done=self.on_grouped_searched
+        )
+
+    def search_database(self):
+        """Searches every document of "Text_Data" and "Exports" without opening them. When
+        not connected the documents in the local cache are searched instead"""
+        entry_input = self.view.entry.get()
+        option_value = self.view.value_inside.get()
+        if not self.model.entry_list(entry_input):
+            messagebox.showinfo(title="Message", message=f"Enter the keywords to search first")
+            return
+
+        searcher = DocumentSearcher(self.database)
+        self.last_search = (entry_input, option_value, lambda: lambda: searcher.sources(entry_input, option_value))
+        self.start_search(
+            "Matches in database", searcher.run, entry_input, option_value,
+            on_progress=self.on_grouped_search_progress,
+            on_done=self.on_grouped_searched
+        )
+
+    def editor_sources(self):
+        """Sources of an export of the text editor, the text as it is now, edits included
+
+        Returns:
+            function: gives the (name, open function) of the text, called by the exporter
+        """
+        name = self.root.title()
+        if self.model.paged is not None:
+            self.sync_pages()
+            stream = self.model.paged.stream()
+            return lambda: [(name, lambda: stream)]
+        snapshot = self.model.snapshot()
+        return lambda: [(name, snapshot.reader)]
+
+    def file_sources(self, filename):
+        """Sources of an export of a file searched without opening it"""
+        return lambda: [(filename, lambda: TextReader(filename))]
+
+    def folder_sources(self, directory):
+        """Sources of an export of a folder, the text files it has when the export runs"""
+        def sources():
+            return [
+                (path, lambda path=path: TextReader(path))
+                for path in self.folder_searcher.find_files(directory) if not is_binary(path)
+            ]
+        return sources
+
+    def export_matches(self):
+        """Exports every match of the last search to a JSON Lines or CSV file, optionally
+        gzip-compressed. The search runs again and the matches are written as they are found."""
+        if self.last_search is None:
+            messagebox.showinfo(title="Message", message=f"Search first, the matches of the last search are exported")
+            return
+        filename = fd.asksaveasfilename(
+            defaultextension=".jsonl",
+            title="Export Matches",
+            filetypes=(
+                ("JSON Lines", "*.jsonl"), ("CSV", "*.csv"),
+                ("Compressed JSON Lines", "*.jsonl.gz"), ("Compressed CSV", "*.csv.gz")
+            )
+        )
+        if not filename:
+            return
+        entry_input, option_value, sources = self.last_search
+        exporter = ResultExporter(export_format(filename))
+        self.start_export(exporter.to_file, filename, sources(), entry_input, option_value)
+
+    def db_export_matches(self):
+        """Exports every match of the last search as JSON Lines to the "Exports" table"""
+        if not self.cnx:
+            self.cnx_error_msg()
+            return
+        if self.last_search is None:
+            messagebox.showinfo(title="Message", message=f"Search first, the matches of the last search are exported")
+            return
+        fname = simpledialog.askstring("Export matches", "Filename in database:", parent=self.root)
+        if not fname:
+            return
+        entry_input, option_value, sources = self.last_search
+        exporter = ResultExporter("jsonl")
+        self.start_export(exporter.to_database, self.database, fname, sources(), entry_input, option_value)
+
+    def start_export(self, func, *args):
+        """Runs an export in the background, a new export cancels the one still running"""
+        if self.export_task is not None:
+            self.export_task.cancel()
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Exporting...       ")
+        self.export_task = self.search_worker.submit(
+            func, *args,
+            pass_task=True,
+            on_progress=self.on_export_progress,
+            on_done=self.on_exported
+        )
+
+    def on_export_progress(self, progress):
+        done, total, matches = progress
+        self.view.status_bar.config(text=f"Exporting... {done}/{total} sources, {matches} matches       ")
+
+    def on_exported(self, report):
+        """Shows the counts of the export"""
+        self.export_task = None
+        if report is None:
+            self.cnx_error_msg()
+            return
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"{report.summary()}       ")
+
+    def on_grouped_search_progress(self, progress):
+        """Keeps the matches and keyword counts of a searched file or document under its name,
+        shown while the first page of results is not full"""
+        done, total, result = progress
+        if result["matches"]:
+            self.results.add_group(result["path"], result["matches"], result["counts"])
+            self.show_results(self.results, RESULTS_PAGE - self.results.shown)
+        elapsed = time.perf_counter() - self.search_started
+        self.view.status_bar.config(
+            text=f"Searching... {done}/{total} files, {self.results.num_matches} matches, {elapsed:.1f}s       "
+        )
+
+    def on_grouped_searched(self, report):
+        """Shows the totals of a folder or database search"""
+        self.search_task = None
+        self.num_matches = report.matches
+        self.update_display(report.summary())
+        self.show_load_more(self.results)
+        self.view.status_bar.config(text=f"Found {report.matches} matches in {report.elapsed:.2f}s       ")
+
+    def start_search(self, title, func, *args, on_progress=None, on_done=None):
+        """Runs a search in the background and shows the matches in batches as they are found
+
+        Args:
+            title (str): header of the results
+            func (function): Model.search_snapshot, Model.search_file, Model.search_stream,
+                FolderSearcher.run or DocumentSearcher.run
+            on_progress (function, optional): shows a batch of results. Defaults to on_search_progress
+            on_done (function, optional): shows the totals. Defaults to on_searched
+        """
+        self.cancel_search()
+        self.results = SearchResults(title, self.next_results)
+        self.next_results += 1
+        self.search_results[self.results.mark] = self.results
+        # Matches are inserted at the mark, between the header and the end of the results
+        header = self.results.header()
+        self.update_display(header + "\n\n------END OF RESULTS------\n\n")
+        self.view.display_text.mark_set(self.results.mark, f"1.0 + {len(header)} chars")
+        self.num_matches = 0
+        self.search_started = time.perf_counter()
+
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Searching...       ")
+        self.search_task = self.search_worker.submit(
+            func, *args,
+            pass_task=True,
+            on_progress=on_progress or self.on_search_progress,
+            on_done=on_done or self.on_searched
+        )
+
+    def on_search_progress(self, progress):
+        """Keeps the matches of the last batch and shows them while the first page of results
+        is not full, with the matches so far and the elapsed time"""
+        fraction, matches = progress
+        if matches:
+            self.results.add_matches(matches)
+            self.show_results(self.results, RESULTS_PAGE - self.results.shown)
+        elapsed = time.perf_counter() - self.search_started
+        self.view.status_bar.config(
+            text=f"Searching... {fraction:.0%}, {self.results.num_matches} matches, {elapsed:.1f}s       "
+        )
+
+    def on_searched(self, res):
+        """Shows the number of sentence matches and the keyword counts, in one insert, once
+        the whole text is searched"""
+        num_matches, counts = res
+        self.search_task = None
+        self.results.num_matches = num_matches
+        self.results.counts = counts
+        self.num_matches = num_matches
+        self.update_display(self.results.summary())
+        self.show_load_more(self.results)
+        elapsed = time.perf_counter() - self.search_started
+        self.view.status_bar.config(text=f"Found {self.num_matches} matches in {elapsed:.2f}s       ")
+
+    def show_results(self, results, count):
+        """Inserts the next results of a search, at most "count", at its mark"""
+        text = results.render(count)
+        if text:
+            self.view.display_text.insert(results.mark, text)
+
+    def show_load_more(self, results):
+        """Shows the line that loads the next page of results when some are not shown yet"""
+        if not results.hidden():
+            self.forget_results(results)
+            return
+        self.view.display_text.insert(results.mark, results.load_more_text(), ("load_more", results.tag))
+        self.view.display_text.tag_bind(results.tag, "<Button-1>", lambda event: self.load_more(results))
+
+    def load_more(self, results):
+        """Replaces the "load more" line of a search by its next page of results"""
+        ranges = self.view.display_text.tag_ranges(results.tag)
+        if ranges:
+            self.view.display_text.delete(ranges[0], ranges[1])
+        self.show_results(results, RESULTS_PAGE)
+        self.show_load_more(results)
+        return "break"
+
+    def forget_results(self, results):
+        """Drops a search whose results are all in the results pane"""
+        self.search_results.pop(results.mark, None)
+        self.view.display_text.tag_delete(results.tag)
+        self.view.display_text.mark_unset(results.mark)
+
+    def clear_results(self):
+        """Drops the results still to show when the results pane is emptied or replaced, except
+        those of the search still running"""
+        for results in list(self.search_results.values()):
+            if results is not self.results or self.search_task is None:
+                self.forget_results(results)
+
+    def display_content(self):
+        """Text of the results pane with the results not shown yet in place of their "load more" line"""
+        return "".join(self.display_parts())
+
+    def display_parts(self):
+        """Get the text of the results pane in parts, see display_content"""
+        display = self.view.display_text
+        hidden = []
+        for results in self.search_results.values():
+            ranges = display.tag_ranges(results.tag)
+            if ranges:
+                first, last = (tuple(map(int, display.index(index).split('.'))) for index in ranges[:2])
+                hidden.append((first, last, results))
+        position = "1.0"
+        for first, last, results in sorted(hidden, key=lambda item: item[:2]):
+            yield display.get(position, "%d.%d" % first)
+            yield from results.hidden_parts()
+            position = "%d.%d" % last
+        yield display.get(position, tk.END)
+
+    def on_text_searched(self, res, snapshot, spans):
+        """Shows the keyword counts and highlights the matches in the text editor, unless
+        the text was edited during the search and the offsets no longer fit it"""
+        self.on_searched(res)
+        if self.model.snapshot() is snapshot:
+            self.set_highlights(spans)
+        else:
+            self.set_highlights([])
+
+    def set_highlights(self, spans):
+        """Replaces the highlighted matches, every one of them when there are few and only
+        the ones in view on large results
+
+        Args:
+            spans (list): (start, end, keyword spans) offsets of the matches in the text, see Model.search
+        """
+        for tag in ("match", "keyword", "current_match"):
+            self.view.txt_editor.tag_remove(tag, "1.0", tk.END)
+        self.match_spans = spans
+        self.match_starts = [span[0] for span in spans]
+        self.tagged_matches = set()
+        self.current_match = -1
+        if len(spans) <= HIGHLIGHT_ALL:
+            self.tag_matches(range(len(spans)))
+        else:
+            self.tag_visible_matches()
+
+    def text_index(self, offset):
+        """Text widget index of an offset in the text of the editor"""
+        return "%d.%d" % self.model.rope.position(offset)
+
+    def tag_matches(self, numbers):
+        """Highlights the matches with one call per tag, which adds all their ranges at once"""
+        match_ranges = []
+        keyword_ranges = []
+        for number in numbers:
+            if number in self.tagged_matches:
+                continue
+            self.tagged_matches.add(number)
+            start, end, keywords = self.match_spans[number]
+            match_ranges.extend((self.text_index(start), self.text_index(end)))
+            for keyword_start, keyword_end in keywords:
+                keyword_ranges.extend((self.text_index(keyword_start), self.text_index(keyword_end)))
+        if match_ranges:
+            self.view.txt_editor.tag_add("match", *match_ranges)
+        if keyword_ranges:
+            self.view.txt_editor.tag_add("keyword", *keyword_ranges)
+
+    def tag_visible_matches(self):
+        """Highlights the matches between the first and the last line in view"""
+        self.highlight_pending = False
+        if not self.match_spans:
+            return
+        editor = self.view.txt_editor
+        first_line, first_column = map(int, editor.index("@0,0").split('.'))
+        last_line, last_column = map(int, editor.index(f"@0,{editor.winfo_height()} lineend").split('.'))
+        first = self.model.rope.offset(first_line, first_column)
+        last = self.model.rope.offset(last_line, last_column)
+        # Matches do not overlap, the one starting before the view may still end in it
+        low = max(bisect_right(self.match_starts, first) - 1, 0)
+        high = bisect_right(self.match_starts, last)
+        self.tag_matches(range(low, high))
+
+    def on_editor_scroll(self, first, last):
+        """Scroll command of the text editor, highlights the matches that scroll into view"""
+        self.view.txt_scrollbar.set(first, last)
+        if len(self.match_spans) > HIGHLIGHT_ALL and not self.highlight_pending:
+            self.highlight_pending = True
+            self.root.after_idle(self.tag_visible_matches)
+
+    def next_match(self, event=None):
+        """Selects the match after the current one in the text editor"""
+        return self.go_to_match(1)
+
+    def previous_match(self, event=None):
+        """Selects the match before the current one in the text editor"""
+        return self.go_to_match(-1)
+
+    def go_to_match(self, step):
+        """Moves the cursor to a match of the last search and shows it, the offsets are
+        indexed by the number of the match so a jump does not search the text"""
+        if not self.match_spans:
+            self.view.status_bar.config(fg="black")
+            self.view.status_bar.config(text="No matches in the text editor, search first       ")
+            return "break"
+        if self.current_match < 0:
+            self.current_match = 0 if step > 0 else len(self.match_spans) - 1
+        else:
+            self.current_match = (self.current_match + step) % len(self.match_spans)
+
+        start, end, _ = self.match_spans[self.current_match]
+        first = self.text_index(start)
+        editor = self.view.txt_editor
+        editor.tag_remove("current_match", "1.0", tk.END)
+        editor.tag_add("current_match", first, self.text_index(end))
+        editor.mark_set(tk.INSERT, first)
+        editor.see(first)
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Match {self.current_match + 1} of {len(self.match_spans)}       ")
+        return "break"
+
+    def cancel_search(self):
+        """Cancels the search still running, a new search or a save replaces it"""
+        if self.search_task is not None:
+            self.search_task.cancel()
+            self.search_task = None
+            # The results found so far stay in the results pane without a "load more" line
+            self.forget_results(self.results)
+
+    def search_error_msg(self, err):
+        """Error message when a search fails"""
+        self.search_task = None
+        self.view.status_bar.config(fg='red')
+        self.view.status_bar.config(text="Error: Search failed       ")
+        messagebox.showinfo(title="Search Error", message=f"{err}")
 
-            count_matches = f"Number of matches for \"{string}\": {res}\n"    
-            self.update_display(count_matches)
-        
-        # Storing the number of matches to return number of sentence matches then inserting to the text widget
-        self.num_matches = len(lst_searches)
-        self.view.display_text.insert('1.0', f"Sentence matches: {self.num_matches}\n")
-    
     def destroy(self):
         """Clears the search results"""
         self.view.display_text.delete('1.0', tk.END)
+        self.clear_results()
 
     def shortcut(self, event):
         # CRUD Shortcuts for Text Editor
@@ -529,9 +1152,13 @@ class TXT_Controller():
         elif event.state == 4 and event.keysym == "d":
             self.delete_file()
 
-    def on_key_release(self, event):
-        """Inserts the inputted string to variable per key release"""
-        self.model.text = self.view.txt_editor.get('1.0', tk.END)
+    def on_text_change(self, start, end, chars):
+        """Applies an edit of the text editor to the model, whatever the size of the text"""
+        self.model.replace_text(start, end, chars)
+        if self.match_spans:
+            # The offsets no longer fit the text, the highlights move with it
+            self.match_spans = []
+            self.match_starts = []
 
     # Functions for edit menu
     def cut_text(self,e):        
@@ -574,15 +1201,288 @@ class TXT_Controller():
             self.root.title(f"{extract_filename}")
 
             # Update text editor
-            self.model.open(file)
-            self.update(self.model.text)
+            if os.path.getsize(file) > PAGED_FILE_SIZE:
+                self.open_paged(file)
+            else:
+                self.load_file(file)
+
+    def load_file(self, filename, encoding=None):
+        """Reads a file in the background, every block is shown in the text editor as it is decoded"""
+        self.update()
+        self.file_task = self.file_worker.submit(
+            self.model.read_file, filename,
+            encoding=encoding,
+            pass_task=True,
+            on_progress=self.on_file_progress,
+            on_done=lambda reader: self.on_file_read(filename, reader),
+        )
+
+    def on_file_progress(self, progress):
+        """Appends a decoded block to the text editor, the tracker adds it to the model"""
+        text, fraction, rate = progress
+        self.view.txt_editor.insert('end - 1 chars', text)
+        # The block is opened text, not an edit for the autosave journal
+        self.model.take_edits()
+        self.view.status_bar.config(text=f"Opening... {fraction:.0%}, {format_size(rate)}/s       ")
+
+    def on_file_read(self, filename, reader):
+        """Keeps the format of the read file to save it the same way, and indexes its text"""
+        self.file_task = None
+        if reader.format.replaced:
+            encoding = fallback_encoding(reader.format)
+            if encoding is not None:
+                # A later block was not valid in the encoding guessed from the start of the file
+                self.load_file(filename, encoding)
+                return
+        self.model.format = reader.format
+        self.view.status_bar.config(
+            text=f"{filename}  ({reader.format.describe()}, read at {format_size(reader.rate())}/s)       "
+        )
+        # The inserted blocks are the opened text, not edits to autosave
+        self.reset_journal()
+        self.index_text()
+
+    def journal_document(self) -> tuple:
+        """Get the (name, source) of the document in the text editor, see EditJournal"""
+        if self.open_status_name:
+            return self.open_status_name, "file"
+        if self.database.current_fname:
+            return self.database.current_fname, "database"
+        return "", "new"
+
+    def autosave(self):
+        """Writes the edits made since the last autosave to the journal of the document in the background"""
+        self.root.after(AUTOSAVE_MS, self.autosave)
+        edits = self.model.take_edits()
+        # A paged file keeps its edits in its pages, and a file being read is not edited yet
+        if not edits or self.model.paged is not None or self.file_task is not None:
+            return
+        if self.journal is None:
+            self.journal = EditJournal(*self.journal_document())
+        self.journal_worker.submit(self.journal.write, edits, self.model.snapshot())
+
+    def reset_journal(self, keep_edits=False):
+        """Removes the journal of the document, its text was just opened or saved
+
+        Args:
+            keep_edits (bool, optional): keeps the edits not autosaved yet, they were made after
+                the text that was saved and start the next journal
+        """
+        if not keep_edits:
+            self.model.take_edits()
+        if self.journal is not None:
+            self.journal_worker.submit(self.journal.remove)
+            self.journal = None
+
+    def offer_recovery(self):
+        """Offers to recover the unsaved edits of a document left in a journal by a crash"""
+        for journal in EditJournal.found():
+            name = journal.name or "New File"
+            saved_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(journal.saved_at))
+            if messagebox.askyesno(
+                title="Recover?",
+                message=f"\"{name}\" has changes from {saved_at} that were not saved. Do you want to recover them?"
+            ):
+                self.recover_journal(journal)
+                return
+            journal.remove()
+
+    def recover_journal(self, journal):
+        """Opens the text of a journal, it is kept until the recovered text is saved"""
+        try:
+            text = journal.recover()
+        except (OSError, ValueError) as err:
+            messagebox.showinfo(title="Recover Error", message=f"The changes could not be recovered: {err}")
+            journal.remove()
+            return
+        self.update(text.text())
+        self.journal = journal
+        self.index_text()
+
+        # Update flags
+        self.open_status_name = journal.name if journal.source == "file" else False
+        self.database.current_fname = journal.name if journal.source == "database" else False
+        if journal.source == "file":
+            self.root.title(re.search(r"[^/\\]+$", journal.name).group(0))
+        elif journal.source == "database":
+            self.set_db_title(journal.name)
+        else:
+            self.root.title("New File")
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(text=f"Recovered: {journal.name or 'New File'}       ")
+
+    def autosave_error_msg(self, err):
+        """Message when the journal cannot be written, the next autosave writes the whole text"""
+        if self.journal is not None:
+            self.journal.compact_next = True
+        self.view.status_bar.config(fg='red')
+        self.view.status_bar.config(text=f"Error: Autosave failed ({err})       ")
+
+    def open_error_msg(self, err):
+        """Error message when a file cannot be read"""
+        self.file_task = None
+        self.view.status_bar.config(fg='red')
+        self.view.status_bar.config(text="Error: File could not be opened       ")
+        messagebox.showinfo(title="Open Error", message=f"{err}")
+
+    def open_paged(self, filename):
+        """Opens a large file a few pages at a time, the pages are swapped as the editor scrolls"""
+        self.update()
+        self.model.open_paged(filename)
+        self.view.txt_editor.config(yscrollcommand=self.on_paged_scroll)
+        self.load_pages(0)
+
+    def close_paged(self):
+        """Leaves the paged mode, the text editor gets its whole content again"""
+        if self.model.paged is not None:
+            # The search of the pages reads the file that is closed
+            self.cancel_search()
+            self.model.close_paged()
+        for page in self.loaded_pages:
+            self.view.txt_editor.mark_unset(f"page_{page}")
+        self.loaded_pages = []
+        self.view.txt_editor.config(yscrollcommand=self.on_editor_scroll)
+
+    def load_pages(self, first):
+        """Shows the window of pages starting at the page "first" """
+        for page in self.loaded_pages:
+            self.view.txt_editor.mark_unset(f"page_{page}")
+        self.loaded_pages = []
+        self.view.txt_editor.delete('1.0', 'end')
+        for page in range(first, min(first + PAGE_WINDOW, self.model.paged.count)):
+            self.append_page(page)
+        self.view.txt_editor.yview('1.0')
+        self.show_pages()
+
+    def append_page(self, page):
+        editor = self.view.txt_editor
+        start = editor.index('end-1c')
+        editor.insert('end-1c', self.model.paged.page(page))
+        # Marks keep the start of every page as the text is edited, text typed at a start goes to that page
+        editor.mark_set(f"page_{page}", start)
+        editor.mark_gravity(f"page_{page}", tk.LEFT)
+        self.loaded_pages.append(page)
+
+    def prepend_page(self, page):
+        editor = self.view.txt_editor
+        # The marks at the top move down with the inserted page
+        for loaded in self.loaded_pages:
+            editor.mark_gravity(f"page_{loaded}", tk.RIGHT)
+        editor.insert('1.0', self.model.paged.page(page))
+        for loaded in self.loaded_pages:
+            editor.mark_gravity(f"page_{loaded}", tk.LEFT)
+        editor.mark_set(f"page_{page}", '1.0')
+        editor.mark_gravity(f"page_{page}", tk.LEFT)
+        self.loaded_pages.insert(0, page)
+
+    def page_text(self, page) -> str:
+        """Get the text of a loaded page from the text editor"""
+        position = self.loaded_pages.index(page)
+        if position + 1 < len(self.loaded_pages):
+            end = f"page_{self.loaded_pages[position + 1]}"
+        else:
+            end = 'end-1c'
+        return self.view.txt_editor.get(f"page_{page}", end)
+
+    def unload_page(self, page):
+        """Keeps the edits of a page and removes it from the text editor"""
+        self.model.paged.set_page(page, self.page_text(page))
+        position = self.loaded_pages.index(page)
+        if position + 1 < len(self.loaded_pages):
+            end = f"page_{self.loaded_pages[position + 1]}"
+        else:
+            end = 'end-1c'
+        self.view.txt_editor.delete(f"page_{page}", end)
+        self.view.txt_editor.mark_unset(f"page_{page}")
+        self.loaded_pages.remove(page)
+
+    def sync_pages(self):
+        """Keeps the edits of the loaded pages in the paged file"""
+        for page in self.loaded_pages:
+            self.model.paged.set_page(page, self.page_text(page))
+
+    def on_paged_scroll(self, first, last):
+        """Scroll command of the text editor in paged mode, loads the next or previous
+        page when the view gets near the end or start of the loaded pages"""
+        self.view.txt_scrollbar.set(first, last)
+        if self.page_swap_pending or not self.loaded_pages:
+            return
+        if float(last) > 0.9 and self.loaded_pages[-1] + 1 < self.model.paged.count:
+            self.page_swap_pending = True
+            self.root.after_idle(self.next_page)
+        elif float(first) < 0.1 and self.loaded_pages[0] > 0:
+            self.page_swap_pending = True
+            self.root.after_idle(self.previous_page)
+
+    def next_page(self):
+        """Loads the page after the loaded ones and drops the first one"""
+        self.page_swap_pending = False
+        if self.model.paged is None:
+            return
+        editor = self.view.txt_editor
+        top = int(editor.index('@0,0').split('.')[0])
+        self.append_page(self.loaded_pages[-1] + 1)
+        if len(self.loaded_pages) > PAGE_WINDOW:
+            # The view stays on the same text once the lines above it are removed
+            removed = int(editor.index(f"page_{self.loaded_pages[1]}").split('.')[0]) - 1
+            self.unload_page(self.loaded_pages[0])
+            editor.yview(f"{max(top - removed, 1)}.0")
+        self.show_pages()
+
+    def previous_page(self):
+        """Loads the page before the loaded ones and drops the last one"""
+        self.page_swap_pending = False
+        if self.model.paged is None:
+            return
+        editor = self.view.txt_editor
+        top = int(editor.index('@0,0').split('.')[0])
+        self.prepend_page(self.loaded_pages[0] - 1)
+        # The view stays on the same text once the lines of the page are inserted above it
+        added = int(editor.index(f"page_{self.loaded_pages[1]}").split('.')[0]) - 1
+        editor.yview(f"{top + added}.0")
+        if len(self.loaded_pages) > PAGE_WINDOW:
+            self.unload_page(self.loaded_pages[-1])
+        self.show_pages()
+
+    def show_pages(self):
+        """Shows the loaded pages of the paged file in the status bar"""
+        self.view.status_bar.config(fg="black")
+        self.view.status_bar.config(
+            text=f"{self.model.paged.filename} (pages {self.loaded_pages[0] + 1}-{self.loaded_pages[-1] + 1} of {self.model.paged.count})       "
+        )
+
+    def save_text(self, filename) -> bool:
+        """Saves the text editor content, merging the edits of every page when a paged file is opened
+
+        Returns:
+            bool: False if the user chose not to save text with undecodable bytes
+        """
+        text_format = self.model.format
+        if text_format is not None and text_format.replaced and not messagebox.askyesno(
+            title="Undecodable bytes",
+            message=f"{text_format.replaced} byte(s) of the file are not valid {text_format.encoding.upper()} "
+                    "and are shown as \ufffd. Saving writes \ufffd in their place.\n\nSave anyway?",
+        ):
+            return False
+        if self.model.paged is not None:
+            self.sync_pages()
+            # The search reads the file that is about to be replaced
+            self.cancel_search()
+            first = self.loaded_pages[0]
+            self.model.save(filename)
+            self.load_pages(min(first, self.model.paged.count - 1))
+        else:
+            self.model.save(filename)
+        return True
 
     def save_file(self):
         # Checks the text editor flag if the file exists in the directory
         if self.open_status_name:
         
             # Save the file
-            self.model.save(self.open_status_name)
+            if not self.save_text(self.open_status_name):
+                return
+            self.reset_journal()
 
             # Updates the status bar
             self.view.status_bar.config(text=f"Saved: {self.open_status_name}       ")
@@ -600,6 +1500,9 @@ class TXT_Controller():
         )
         # Checks if the user opened a file in the file dialog
         if text_file:
+            # Save the file
+            if not self.save_text(text_file):
+                return
             # Updade Status Bars
             name = text_file
             self.view.status_bar.config(fg="black")
@@ -608,8 +1511,7 @@ class TXT_Controller():
             extract_filename = re.search(r"[^/\\]+$", text_file).group(0)
             self.root.title(f"{extract_filename}")
             
-            # Save the file
-            self.model.save(text_file)
+            self.reset_journal()
              # Update flag to current filename
             self.open_status_name = text_file
             self.database.current_fname = False
@@ -645,9 +1547,8 @@ class TXT_Controller():
             self.view.status_bar.config(fg="black")
             self.view.status_bar.config(text=f"Exported: {text_file}       ")
             
-            # Save the file
-            results = self.view.display_text.get(1.0, tk.END)
-            self.model.export_searches(results, text_file)
+            # Save the file, with every match of a folder or database search, shown or not
+            self.model.export_searches(self.display_parts(), text_file)
         else:
             pass
 
@@ -683,6 +1584,13 @@ class TXT_Controller():
     def on_closing(self):
         # checks if the user intends to close the window
         if messagebox.askyesno(title="Close?", message=f"Do you really want to close Text Editor?"):
+            self.db_worker.shutdown()
+            self.search_worker.shutdown()
+            self.file_worker.shutdown()
+            # Closing discards the unsaved edits, their journal goes with them
+            self.journal_worker.shutdown()
+            if self.journal is not None:
+                self.journal.remove()
             self.root.destroy()
             self.view.connect_popup_root.destroy()
             
\ No newline at end of file
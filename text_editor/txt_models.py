@@ -1,31 +1,183 @@
 import os
 import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+
+from text_editor.keyword_matcher import KeywordMatcher
+from text_editor.paged_file import PagedFile
+from text_editor.rope import Rope
+from text_editor.sentence_index import SentenceIndex
+from text_editor.sentence_reader import SentenceReader
+from text_editor.substring_matcher import SubstringMatcher
+from text_editor.text_decoder import TextReader, fallback_encoding
+from text_editor.trigram_index import TrigramIndex, TrigramStore
+from text_editor.word_index import WordIndex
+
+# Keywords with a sentence terminator can match across the end of a sentence, those
+# are searched with the full sentence pattern in the whole text at once
+CROSS_SENTENCE_CHARS = set('.?!')
+# Sentences matched between two reports of a search running in the background
+SEARCH_BATCH = 2000
+# Options of the search that match the keywords anywhere in the words, and with a typo
+SUBSTRING = "Substring"
+FUZZY = "Fuzzy"
+# Edits allowed in a keyword by the fuzzy search
+FUZZY_ERRORS = 1
 
 class Model():
     """Model object which contains all methods for the text editor"""
     def __init__(self):
-        # Ccontains text from the text editor
-        self.text = ''
+        # Contains text from the text editor, every edit makes a new version without copying the text
+        self.rope = Rope()
+        # Sentences of the searched text, kept between searches and updated on edits
+        self.sentence_index = SentenceIndex()
+        # Sentences that contain every word, built in the background when a file is opened
+        self.word_index = WordIndex()
+        # Blocks of sentences that contain every three characters, for the substring searches
+        self.trigram_index = TrigramIndex()
+        self.trigram_store = TrigramStore()
+        # Held while the indexes are built or updated
+        self.index_lock = threading.Lock()
+        # File too large for the text widget, shown a few pages at a time
+        self.paged = None
+        # TextFormat of the opened file, it is saved with the same encoding and line ends
+        self.format = None
+        # [start offset, end offset, parts of the chars, length of the chars] of the edits not yet
+        # written to the autosave journal, the parts are joined by take_edits
+        self.edits = []
+
+    @property
+    def text(self) -> str:
+        """Text of the text editor, joined from the rope when it is read"""
+        return self.rope.text()
+
+    @text.setter
+    def text(self, text: str):
+        self.rope = Rope.from_text(text)
+
+    def snapshot(self) -> Rope:
+        """Current version of the text, it does not change with the later edits"""
+        return self.rope
+
+    def replace_text(self, start: tuple, end: tuple, chars: str):
+        """Applies an edit of the text editor
+
+        Args:
+            start (tuple): (line, column) of the first replaced character
+            end (tuple): (line, column) after the last replaced character
+            chars (str): inserted text
+        """
+        start_offset = self.rope.offset(*start)
+        end_offset = self.rope.offset(*end)
+        self.rope = self.rope.replace(start_offset, end_offset, chars)
+        if self.edits:
+            last = self.edits[-1]
+            # Characters typed one after another are kept as one edit
+            if start_offset == end_offset == last[0] + last[3]:
+                last[2].append(chars)
+                last[3] += len(chars)
+                return
+        self.edits.append([start_offset, end_offset, [chars], len(chars)])
+
+    def take_edits(self) -> list:
+        """Get the edits made since the last call
+
+        Returns:
+            list: (start offset, end offset, chars) of the edits in order
+        """
+        edits = [(start, end, ''.join(parts)) for start, end, parts, _ in self.edits]
+        self.edits = []
+        return edits
 
     def open(self, filename: str):
-        """opens the file in read mode
+        """opens the file in read mode, in the encoding guessed by TextReader
+
+        A file with bytes that are not valid in that encoding is read again in its
+        fallback encoding, so saving it does not replace them.
 
         Args:
             filename (str): file path string of the text that will be opened
         """
-        file = open(filename, 'r') 
-        self.text = file.read()
-        file.close()
+        encoding = None
+        while True:
+            with TextReader(filename, encoding=encoding) as reader:
+                # Decoded block by block into the leaves, the whole text is never joined
+                self.rope = Rope.from_chunks(reader)
+                self.format = reader.format
+            encoding = fallback_encoding(reader.format) if reader.format.replaced else None
+            if encoding is None:
+                return
+
+    def read_file(self, filename: str, task=None, encoding=None) -> TextReader:
+        """Reads a file block by block for the text editor, which inserts every block as it comes
+
+        Args:
+            filename (str): file path string of the text that will be opened
+            task (DBTask, optional): receives (text of the block, fraction of the file read,
+                bytes read per second) after every block and is checked for cancellation
+            encoding (str, optional): encoding of the file instead of the guessed one
+
+        Returns:
+            TextReader: the closed reader with the format of the file and its read rate
+        """
+        with TextReader(filename, encoding=encoding) as reader:
+            for text in reader:
+                if task is not None:
+                    task.check()
+                    task.report((text, reader.progress(), reader.rate()))
+        return reader
 
     def save(self, filename: str):
         """opens the file in write mode for saving
 
+        The text is written to a temporary file next to the target that then
+        replaces it, so a crash while saving never leaves a partial file.
+
         Args:
             filename (_type_): file path string of the text that will be opened
         """
-        file = open(filename, 'w')
-        file.write(self.text)
-        file.close()
+        if self.paged is not None:
+            self.paged.save(filename)
+            self.format = self.paged.format
+            return
+        temp_name = filename + '.tmp'
+        try:
+            if self.format is not None:
+                file = self.format.open(temp_name)
+            else:
+                file = open(temp_name, 'w')
+            with file:
+                # Written leaf by leaf, the whole text is never joined
+                for chunk in self.rope.chunks():
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_name, filename)
+            if self.format is not None:
+                # The replacement characters are now the text of the file
+                self.format.replaced = 0
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+    def open_paged(self, filename: str) -> PagedFile:
+        """Opens a large file without reading it, its pages are read as they are shown
+
+        Args:
+            filename (str): file path string of the text that will be opened
+        """
+        self.close_paged()
+        self.paged = PagedFile(filename)
+        self.format = self.paged.format
+        self.text = ''
+        return self.paged
+
+    def close_paged(self):
+        """Leaves the paged mode, the pages that were not saved are discarded"""
+        if self.paged is not None:
+            self.paged.close()
+            self.paged = None
 
     def delete(self, filename: str):
         """deletes the file from directory
@@ -33,19 +185,23 @@ class Model():
         Args:
             filename (str): file path string of the text that will be opened
         """
+        self.close_paged()
         os.remove(filename)
         self.text = ''
 
-    def export_searches(self, text: str, filename: str):
+    def export_searches(self, text, filename: str):
         """exports the search results
 
         Args:
-            text (str): text in the display widget
+            text (str or iterable): text in the display widget, or its parts in order
             filename (str): file path string of the text that will be opened for writing
         """
-        file = open(filename, 'w')
-        file.write(text)
-        file.close()
+        if isinstance(text, str):
+            text = [text]
+        # Matches of a folder search can have any character, not only those of the system encoding
+        with open(filename, 'w', encoding='utf-8') as file:
+            for part in text:
+                file.write(part)
 
     def str_to_list(self, text: str) -> list:
         """Convert text input to list split on space"""
@@ -58,12 +214,58 @@ class Model():
             text_entry (str): string in the search entry
 
         Returns:
-            list: list of words in the search entry
+            list: list of words in the search entry, without the empty strings left by extra spaces
         """
         clean_entry = re.sub(' +', ' ', text_entry)
-        lst_entry = self.str_to_list(clean_entry)
+        lst_entry = [keyword for keyword in self.str_to_list(clean_entry) if keyword]
         return lst_entry
-    
+
+    def build_index(self, text: str):
+        """Segments the text and indexes its words, run in a background thread when a file is opened
+
+        Args:
+            text (str): content of the opened file
+        """
+        with self.index_lock:
+            self.sentence_index.build(text)
+            self.word_index.build(self.sentence_index)
+            sentences = list(self.sentence_index.sentences)
+            version = self.sentence_index.version
+
+        # Built outside of the lock from a copy of the sentences, it is only used while the version is the same
+        key = self.trigram_store.key(text)
+        trigram_index = self.trigram_store.load(key, version)
+        if trigram_index is None:
+            trigram_index = TrigramIndex()
+            trigram_index.build(sentences, version)
+            try:
+                self.trigram_store.save(key, trigram_index)
+            except OSError:
+                # Kept in memory only, it is built again the next time
+                pass
+        self.trigram_index = trigram_index
+
+    def matcher(self, lst_entry: list, option_value: str):
+        """Get the matcher of the search option
+
+        Args:
+            lst_entry (list): keywords of the search entry
+            option_value (str): value in the option menu
+
+        Returns:
+            KeywordMatcher or SubstringMatcher: both have search and key
+        """
+        if option_value == SUBSTRING:
+            return SubstringMatcher(lst_entry)
+        if option_value == FUZZY:
+            return SubstringMatcher(lst_entry, FUZZY_ERRORS)
+        # Keywords are matched literally, arranged in a single pattern whatever their number
+        return KeywordMatcher(lst_entry, option_value == "Ignore Case")
+
+    def is_cross_sentence(self, matcher, lst_entry: list) -> bool:
+        """Checks if the keywords can match across the end of a sentence"""
+        return isinstance(matcher, KeywordMatcher) and any(CROSS_SENTENCE_CHARS.intersection(keyword) for keyword in lst_entry)
+
     def search_sentence(self, text_input: str, text_entry: str, option_value: str) -> list:
         """Processes the entry text and editor text to search sentences using the keywords
 
@@ -73,23 +275,252 @@ class Model():
             option_value (str): value in the option menu wheter ignore case or case sensitive
 
         Returns:
-            list: list of words in the search entry
-        """   
-        clean_editor = re.sub('[ \n]+', ' ', text_input) # Remove extra lines/spaces
+            list: list of sentence matches
+        """
+        return self.search(text_input, text_entry, option_value)[0]
+
+    def search(self, text_input: str, text_entry: str, option_value: str, task=None, spans: list = None) -> tuple:
+        """Searches the sentences with the keywords and counts every keyword in them
+
+        Args:
+            text_input (str): string in the text editor
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu wheter ignore case or case sensitive
+            task (DBTask, optional): receives (fraction of the sentences searched, matches of the batch)
+                after every batch of sentences and is checked for cancellation
+            spans (list, optional): receives (start, end, [(start, end) of every counted keyword])
+                for every match, offsets of the characters in text_input, in the order of the matches
+
+        Returns:
+            tuple: (list of sentence matches, list of (keyword, count) in the order of the entry)
+        """
         lst_entry = self.entry_list(text_entry) # Creates the list keywords
-        
-        # Adding "|" between each keyword on list to search more than one keyword
+        if not lst_entry:
+            return [], []
+
+        matcher = self.matcher(lst_entry, option_value)
+
+        with self.index_lock:
+            # Segments only the sentences changed since the last search
+            indexed_version = self.sentence_index.version
+            removed, added = self.sentence_index.update(text_input)
+            if self.word_index.version == indexed_version:
+                self.word_index.apply(removed, added, self.sentence_index.version)
+
+            if self.is_cross_sentence(matcher, lst_entry):
+                # Keywords with a terminator can span sentences, execute findall on the whole text
+                found = list(self.sentence_pattern(matcher).finditer(self.sentence_index.normalized_text()))
+                lst_searches = [match.group() for match in found]
+                keyword_spans = None if spans is None else []
+                counts = matcher.count_all(lst_searches, keyword_spans)
+                if spans is not None:
+                    for match, keywords in zip(found, keyword_spans):
+                        spans.append(self.text_span(match.start(), match.end(), keywords))
+                if task is not None:
+                    task.report((1.0, lst_searches))
+            else:
+                sentences = self.sentence_index.sentences
+                positions = range(len(sentences))
+                if isinstance(matcher, SubstringMatcher):
+                    if self.trigram_index.version == self.sentence_index.version:
+                        # Only the sentences of the blocks with every trigram of a keyword can match
+                        found = self.trigram_index.candidates(matcher.keys, matcher.max_errors)
+                        if found is not None:
+                            positions = found
+                            sentences = [sentences[position] for position in positions]
+                elif self.word_index.version == self.sentence_index.version and all(map(self.word_index.is_word, lst_entry)):
+                    # Only the sentences that contain a keyword as a whole word can match
+                    ids = self.word_index.candidates(lst_entry)
+                    positions = self.sentence_index.positions(ids)
+                    sentences = [sentences[position] for position in positions]
+
+                # A match never spans a sentence end, so matching sentence by sentence finds the same matches
+                batch_spans = None if spans is None else []
+                if task is None:
+                    lst_searches, counts = matcher.search(sentences, batch_spans)
+                    self.add_spans(spans, batch_spans, positions, 0)
+                else:
+                    lst_searches = []
+                    counts = {}
+                    for start in range(0, len(sentences), SEARCH_BATCH):
+                        task.check()
+                        matches, batch_counts = matcher.search(sentences[start:start + SEARCH_BATCH], batch_spans)
+                        self.add_spans(spans, batch_spans, positions, start)
+                        lst_searches.extend(matches)
+                        for key, count in batch_counts.items():
+                            counts[key] = counts.get(key, 0) + count
+                        task.report((min((start + SEARCH_BATCH) / len(sentences), 1.0), matches))
+
+        return lst_searches, [(keyword, counts.get(matcher.key(keyword), 0)) for keyword in lst_entry]
+
+    def add_spans(self, spans: list, batch_spans: list, positions, start: int):
+        """Moves the spans of a batch of sentences to "spans" as offsets in the text
+
+        Args:
+            spans (list): spans of the search, see search
+            batch_spans (list): (number in the batch, start, end, keyword spans) from KeywordMatcher.search,
+                emptied
+            positions (list): position of every searched sentence in the sentence index
+            start (int): number of the first sentence of the batch in positions
+        """
+        if spans is None:
+            return
+        for number, match_start, match_end, keywords in batch_spans:
+            position = positions[start + number]
+            # One mapping for the match and its keywords, all of them in the same sentence
+            offsets = [match_start, match_end]
+            for keyword_start, keyword_end in keywords:
+                offsets.extend((keyword_start, keyword_end))
+            offsets = self.sentence_index.text_offsets(position, offsets)
+            spans.append((offsets[0], offsets[1], list(zip(offsets[2::2], offsets[3::2]))))
+        batch_spans.clear()
+
+    def text_span(self, start: int, end: int, keywords: list) -> tuple:
+        """Maps a match of the normalized text and its keywords to offsets in the text
+
+        Args:
+            start (int): start of the match in the normalized text
+            end (int): end of the match in the normalized text
+            keywords (list): (start, end) of the keywords in the match
+
+        Returns:
+            tuple: (start, end, [(start, end) of every keyword]) in the text
+        """
+        def text_offset(offset):
+            position, sentence_offset = self.sentence_index.locate(offset)
+            return self.sentence_index.text_offsets(position, [sentence_offset])[0]
+        return (
+            text_offset(start),
+            text_offset(end),
+            [(text_offset(start + keyword_start), text_offset(start + keyword_end)) for keyword_start, keyword_end in keywords]
+        )
+
+    def search_snapshot(self, snapshot, text_entry: str, option_value: str, spans: list = None, task=None) -> tuple:
+        """Searches a version of the text in the background, the editor keeps its edits meanwhile
+
+        Args:
+            snapshot (Rope): version of the text from Model.snapshot
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu wheter ignore case or case sensitive
+            spans (list, optional): receives the offsets of the matches in the snapshot, see search
+            task (DBTask, optional): receives the matches as they are found, see search
+
+        Returns:
+            tuple: (number of sentence matches, list of (keyword, count) in the order of the entry)
+        """
+        # Same trailing newline as the content of the text widget
+        lst_searches, counts = self.search(snapshot.text() + '\n', text_entry, option_value, task, spans)
+        return len(lst_searches), counts
+
+    def sentence_pattern(self, matcher: KeywordMatcher):
+        """Full search pattern of the keywords, used when they can span sentences"""
         # Regex that allows special char/punctuations before and after keyword but disallows alphanum chars 
-        keywords = r'\b[^.?!\w]*(?:' + '|'.join(lst_entry) + r')(?=[\s@*&^%$#.,;:\/\'-\?!]|$)'
+        keywords = r'\b[^.?!\w]*(?:' + matcher.trie + r')(?=[\s@*&^%$#.,;:\/\'-\?!]|$)'
+        flags = re.IGNORECASE if matcher.ignore_case else 0
+        # Compile keyword pattern with sentence pattern to create main regex pattern 
+        return re.compile(r'\b[^.?!]*\b{0}\b[^.?!]*[ .?!]'.format(keywords), flags)
+
+    def search_file(self, filename: str, text_entry: str, option_value: str, task=None) -> tuple:
+        """Searches a file without opening it in the editor, reading it block by block
+
+        Memory stays bounded whatever the size of the file, only the matches are kept
+        and they are sent to the caller as every block is searched. Keywords with a
+        sentence terminator are matched within each block.
+
+        Args:
+            filename (str): file path string of the text that will be searched
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu wheter ignore case or case sensitive
+            task (DBTask, optional): receives (fraction of the file read, matches of the block)
+                after every block and is checked for cancellation
+
+        Returns:
+            tuple: (number of sentence matches, list of (keyword, count) in the order of the entry)
+        """
+        with TextReader(filename) as reader:
+            return self.search_stream(reader, reader.progress, text_entry, option_value, task)
+
+    def search_records(self, file, text_entry: str, option_value: str):
+        """Searches text read block by block like search_stream and gives every match with its place
+
+        Args:
+            file (file): file opened in text mode or any object with a read method
+            text_entry (str): string in the search entry
+            option_value (str): value in the option menu
+
+        Yields:
+            list: (offset of the match in the text, match, [(keyword, offset in the match)]) for
+                the matches of a block
+        """
+        lst_entry = self.entry_list(text_entry)
+        if not lst_entry:
+            return
+
+        matcher = self.matcher(lst_entry, option_value)
+        # Hits are named by the keyword of the entry, or by the text found for a fuzzy keyword
+        keywords = {}
+        for keyword in lst_entry:
+            keywords.setdefault(matcher.key(keyword), keyword)
+        pattern = None
+        if self.is_cross_sentence(matcher, lst_entry):
+            pattern = self.sentence_pattern(matcher)
+
+        for block in SentenceReader().located_blocks(file):
+            found = []
+            if pattern is not None:
+                starts = list(accumulate((len(sentence) for sentence in block.sentences), initial=0))
+                for match in pattern.finditer(''.join(block.sentences)):
+                    number = bisect_right(starts, match.start()) - 1
+                    keyword_spans = []
+                    matcher.count(match.group(), {}, {}, keyword_spans)
+                    found.append((number, match.start() - starts[number], match.group(), keyword_spans))
+            else:
+                spans = []
+                matches, _ = matcher.search(block.sentences, spans)
+                for match, (number, start, end, keyword_spans) in zip(matches, spans):
+                    found.append((number, start, match, [(a - start, b - start) for a, b in keyword_spans]))
+
+            records = []
+            for number, start, match, keyword_spans in found:
+                hits = []
+                for keyword_start, keyword_end in keyword_spans:
+                    text = match[keyword_start:keyword_end]
+                    hits.append((keywords.get(matcher.key(text), text), keyword_start))
+                records.append((block.file_offsets(number, [start])[0], match, hits))
+            yield records
+
+    def search_stream(self, file, progress, text_entry: str, option_value: str, task=None) -> tuple:
+        """Searches text read block by block from a file-like object, see search_file
+
+        Args:
+            file (file): file opened in text mode or any object with a read method
+            progress (function): returns the fraction of the text read so far
+
+        Returns:
+            tuple: (number of sentence matches, list of (keyword, count) in the order of the entry)
+        """
+        lst_entry = self.entry_list(text_entry)
+        if not lst_entry:
+            return 0, []
 
-        # Change behavior of the search based on ignore case/case sensitive option
-        if option_value == "Ignore Case":
-                # Compile keyword pattern with sentence pattern to create main regex pattern 
-                pattern = re.compile(r'\b[^.?!]*\b{0}\b[^.?!]*[ .?!]'.format(keywords), re.IGNORECASE) # Regex that formats the keywords to be in a sentence/standalone
-        else:
-                pattern = re.compile(r'\b[^.?!]*\b{0}\b[^.?!]*[ .?!]'.format(keywords))
+        matcher = self.matcher(lst_entry, option_value)
+        pattern = None
+        if self.is_cross_sentence(matcher, lst_entry):
+            pattern = self.sentence_pattern(matcher)
 
-        # Execute findall with the main regex pattern
-        lst_searches = pattern.findall(clean_editor)
+        num_matches = 0
+        counts = {}
+        for sentences in SentenceReader().blocks(file):
+            if pattern is not None:
+                matches = pattern.findall(''.join(sentences))
+                block_counts = matcher.count_all(matches)
+            else:
+                matches, block_counts = matcher.search(sentences)
+            num_matches += len(matches)
+            for key, count in block_counts.items():
+                counts[key] = counts.get(key, 0) + count
+            if task is not None:
+                task.check()
+                task.report((progress(), matches))
 
-        return lst_searches
\ No newline at end of file
+        return num_matches, [(keyword, counts.get(matcher.key(keyword), 0)) for keyword in lst_entry]
@@ -1,5 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
+
+from database.content_stats import describe_file
+from text_editor.text_tracker import TextTracker
       
 class ViewPanel():
     """View object which will contain widgets for the text editor"""
@@ -27,17 +30,26 @@ class ViewPanel():
 
         # Scrollbar
         self.txt_scrollbar = tk.Scrollbar(self.top_frame, command=self.txt_editor.yview) 
-        self.txt_editor.config(yscrollcommand=self.txt_scrollbar.set)
+        self.txt_editor.config(yscrollcommand=self.controller.on_editor_scroll)
 
         self.txt_scrollbar.pack(side=tk.RIGHT, fill='y') 
         self.txt_editor.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
                    
-        # Binds to keyboard which triggers function that concatenates string to the string storage 
-        self.txt_editor.bind('<KeyRelease>', self.controller.on_key_release)
+        # Reports every insert and delete so the model follows the edits without copying the text
+        self.txt_tracker = TextTracker(self.txt_editor, self.controller.on_text_change)
         # Binds the keyboard shortcuts for the CRUD
         self.txt_editor.bind("<KeyPress>", self.controller.shortcut)
 
+        # Tags of the search matches, the later ones are drawn over the earlier ones
+        self.txt_editor.tag_configure("match", background="#fff3b0")
+        self.txt_editor.tag_configure("keyword", background="#ffd54f")
+        self.txt_editor.tag_configure("current_match", background="#9ecbff")
+        self.txt_editor.tag_raise("sel")
+        # Jumps between the matches of the last search
+        self.txt_editor.bind("<F3>", self.controller.next_match)
+        self.txt_editor.bind("<Shift-F3>", self.controller.previous_match)
+
         # Enter text label
         self.label_enter = tk.Label(
             self.control_frame, 
@@ -72,6 +84,8 @@ class ViewPanel():
 
         # Binds the entry box to enter key for searching
         self.entry.bind("<Return>", self.controller.on_enter_key)
+        self.entry.bind("<F3>", self.controller.next_match)
+        self.entry.bind("<Shift-F3>", self.controller.previous_match)
 
         # Search button
         self.search_button = tk.Button(
@@ -83,7 +97,7 @@ class ViewPanel():
         self.search_button.place(height=24, y=2, anchor=tk.NW)
 
         # Options list for search bar
-        self.options_list = ["Ignore Case", "Case Sensitive"]
+        self.options_list = ["Ignore Case", "Case Sensitive", "Substring", "Fuzzy"]
         
         # Stringvar to interact with the option menu
         self.value_inside = tk.StringVar(self.display_frame)
@@ -108,6 +122,10 @@ class ViewPanel():
         # Scrollbar for the display text editor
         self.display_scroll = tk.Scrollbar(self.display_frame, command=self.display_text.yview)
         self.display_text.config(yscrollcommand=self.display_scroll.set)
+        # Line that shows the next page of the results of a search
+        self.display_text.tag_configure("load_more", foreground="blue", underline=True)
+        self.display_text.tag_bind("load_more", "<Enter>", lambda event: self.display_text.config(cursor="hand2"))
+        self.display_text.tag_bind("load_more", "<Leave>", lambda event: self.display_text.config(cursor=""))
         
         # Packs the scrollbar and the text editor in the display frame
         self.display_scroll.pack(side=tk.RIGHT, fill='y')
@@ -135,15 +153,19 @@ class ViewPanel():
         self.txt_editor.config(bg="#272727", foreground='white')
         self.txt_scrollbar.config(bg="#272727")
 
-    def open_popup(self, options):
+    def open_popup(self, files):
         """popup window to select filename to be opened from database
 
         Args:
-            options (list): list of filenames in database
+            files (list): (filename, byte_size, row_count, updated_at) of the files in database
         """
+        # Labels with the size and modification time of the files mapped to their filenames
+        self.db_files = {describe_file(info, "lines"): info[0] for info in files}
+        options = list(self.db_files)
+
         self.popup_root = tk.Tk()
         self.popup_root.title("Open from database")
-        self.popup_root.geometry("200x100")
+        self.popup_root.geometry("420x100")
         self.popup_root.wm_attributes("-topmost", True)
         main_frame = tk.Frame(self.popup_root)
         main_frame.pack(fill=tk.BOTH)
@@ -160,15 +182,19 @@ class ViewPanel():
         open_btn = tk.Button(main_frame, text="Open file", font=('Arial', 10), command=self.controller.get_selected_val)
         open_btn.pack()
 
-    def open_popup_EXP(self, options):
+    def open_popup_EXP(self, files):
         """popup window to select filename to be opened from database
 
         Args:
-            options (list): list of filenames in database
+            files (list): (filename, byte_size, row_count, updated_at) of the files in database
         """
+        # Labels with the size and modification time of the files mapped to their filenames
+        self.db_files_EXP = {describe_file(info, "lines"): info[0] for info in files}
+        options = list(self.db_files_EXP)
+
         self.popup_root_EXP = tk.Tk()
         self.popup_root_EXP.title("Open from database")
-        self.popup_root_EXP.geometry("200x100")
+        self.popup_root_EXP.geometry("420x100")
         self.popup_root_EXP.wm_attributes("-topmost", True)
         main_frame = tk.Frame(self.popup_root_EXP)
         main_frame.pack(fill=tk.BOTH)
@@ -0,0 +1,77 @@
+import re
+
+# Words are indexed as the runs of word characters the search keywords must match whole
+WORD = re.compile(r'\w+')
+# Keywords that can be looked up, ignore-case matching of other characters does not follow casefold
+ASCII_WORD = re.compile(r'[A-Za-z0-9_]+')
+
+
+def fold(word: str) -> str:
+    """Key of a word, the same for every spelling an ignore-case search matches with an ASCII keyword"""
+    return word.casefold().replace('i\u0307', 'i').replace('\u0131', 'i')
+
+
+class WordIndex():
+    """Inverted index from word to the ids of the sentences of a SentenceIndex that contain it
+
+    Words are stored folded so that one lookup serves both case-sensitive and
+    ignore-case searches, the sentences found are then matched with the exact
+    search pattern.
+    """
+    def __init__(self):
+        # {folded word: {sentence id: number of occurrences}}
+        self.postings = {}
+        # Version of the SentenceIndex the postings belong to, None until built
+        self.version = None
+
+    def build(self, sentence_index):
+        """Indexes every sentence of the sentence index"""
+        self.postings = {}
+        for sentence_id, sentence in zip(sentence_index.ids, sentence_index.sentences):
+            self.add(sentence_id, sentence)
+        self.version = sentence_index.version
+
+    def add(self, sentence_id: int, sentence: str):
+        for word in map(fold, WORD.findall(sentence)):
+            sentences = self.postings.setdefault(word, {})
+            sentences[sentence_id] = sentences.get(sentence_id, 0) + 1
+
+    def remove(self, sentence_id: int, sentence: str):
+        for word in set(map(fold, WORD.findall(sentence))):
+            sentences = self.postings.get(word)
+            if sentences is not None:
+                sentences.pop(sentence_id, None)
+                if not sentences:
+                    del self.postings[word]
+
+    def apply(self, removed: list, added: list, version: int):
+        """Follows an update of the sentence index
+
+        Args:
+            removed (list): (id, sentence) pairs removed by the update
+            added (list): (id, sentence) pairs added by the update
+            version (int): version of the sentence index after the update
+        """
+        for sentence_id, sentence in removed:
+            self.remove(sentence_id, sentence)
+        for sentence_id, sentence in added:
+            self.add(sentence_id, sentence)
+        self.version = version
+
+    def is_word(self, keyword: str) -> bool:
+        """Checks if the keyword is a single word that can be looked up"""
+        return ASCII_WORD.fullmatch(keyword) is not None
+
+    def candidates(self, keywords: list) -> set:
+        """Get the ids of the sentences that contain any of the keywords as a whole word
+
+        Args:
+            keywords (list): keywords that are single words
+
+        Returns:
+            set: union of the sentence ids of every keyword
+        """
+        ids = set()
+        for keyword in keywords:
+            ids.update(self.postings.get(fold(keyword), ()))
+        return ids